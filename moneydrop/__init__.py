@@ -6,12 +6,13 @@ __all__ = [
     "GameConfig",
     "GameResult",
     "MoneyDropEngine",
+    "GameStepper",
     "Leaderboard",
     "GameSession",
     "SessionManager",
 ]
 
 from .models import Player, Question, GameConfig, GameResult
-from .engine import MoneyDropEngine
+from .engine import GameStepper, MoneyDropEngine
 from .leaderboard import Leaderboard
 from .session import GameSession, SessionManager
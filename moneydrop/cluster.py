@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .offload import RawJSON
+
+try:
+    from socketio import PubSubManager
+except ImportError:  # dépendance optionnelle (web) : le courtier et l'annuaire restent utilisables
+    PubSubManager = object
+
+DEFAULT_BROKER = "127.0.0.1:5070"
+
+
+def parse_address(spec: str, default: str = DEFAULT_BROKER) -> Tuple[str, int]:
+    """`"hôte:port"` → (hôte, port)."""
+    host, _, port = (spec or default).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def owner_of(lobby_id: str, workers: int) -> int:
+    """Processus propriétaire d'un salon : stable d'un processus (et d'un redémarrage) à l'autre."""
+    return zlib.crc32(lobby_id.encode("utf-8")) % max(1, workers)
+
+
+class Broker:
+    """Courtier pub/sub minimal (TCP, une ligne par message), pour plusieurs processus d'une
+    même machine ou des tests ; une file de messages dédiée (Redis…) le remplace en production.
+
+    Client → courtier : `SUB <canal>` ou `PUB <canal> <json>` ; courtier → abonnés :
+    `<canal> <json>`, à tous les abonnés du canal, émetteur compris (Socket.IO y compte pour ses
+    propres sockets). Un abonné trop lent (plus de `max_buffer` octets en attente) est déconnecté
+    plutôt que de faire grossir la mémoire du courtier.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5070, max_buffer: int = 16 << 20):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self._channels: Dict[bytes, set] = {}
+        self.published = 0
+        self.delivered = 0
+
+    def subscribers(self, channel: str) -> int:
+        return len(self._channels.get(channel.encode(), ()))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        joined: List[bytes] = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                verb, _, rest = line.partition(b" ")
+                if verb == b"PUB":
+                    channel, _, payload = rest.partition(b" ")
+                    message = channel + b" " + payload
+                    self.published += 1
+                    for subscriber in list(self._channels.get(channel, ())):
+                        if subscriber.transport.get_write_buffer_size() > self.max_buffer:
+                            subscriber.close()
+                            continue
+                        subscriber.write(message)
+                        self.delivered += 1
+                elif verb == b"SUB":
+                    channel = rest.strip()
+                    self._channels.setdefault(channel, set()).add(writer)
+                    joined.append(channel)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            for channel in joined:
+                self._channels.get(channel, set()).discard(writer)
+            writer.close()
+
+    async def serve(self, ready: Optional[threading.Event] = None) -> None:
+        server = await asyncio.start_server(self._handle, self.host, self.port, limit=1 << 24)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def start(self) -> "Broker":
+        """Courtier dans un thread de fond (tests, mesures) ; `port=0` : port libre, lu après."""
+        ready = threading.Event()
+        threading.Thread(target=lambda: asyncio.run(self.serve(ready)), daemon=True).start()
+        ready.wait(5)
+        return self
+
+
+class BrokerClient:
+    """Connexion d'un processus au courtier : `publish` (une connexion partagée, sous verrou) et
+    `listen` (une connexion par abonnement, reconnectée toutes les `retry` s si le courtier tombe ;
+    les messages publiés pendant la coupure sont perdus)."""
+
+    def __init__(self, host: str, port: int, retry: float = 1.0):
+        self.address = (host, port)
+        self.retry = retry
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+
+    def publish(self, channel: str, message: str) -> None:
+        """`message` : JSON déjà encodé (sans saut de ligne, ce que `json.dumps` garantit)."""
+        data = f"PUB {channel} {message}\n".encode("utf-8")
+        with self._lock:
+            for attempt in (0, 1):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection(self.address)
+                    self._sock.sendall(data)
+                    return
+                except OSError:
+                    if self._sock is not None:
+                        self._sock.close()
+                    self._sock = None
+                    if attempt:
+                        raise
+
+    def listen(self, channel: str) -> Iterator[Any]:
+        """Messages décodés du canal, sans fin."""
+        while True:
+            try:
+                with socket.create_connection(self.address) as sock:
+                    sock.sendall(f"SUB {channel}\n".encode("utf-8"))
+                    for line in sock.makefile("rb"):
+                        yield json.loads(line.partition(b" ")[2])
+            except OSError:
+                pass
+            time.sleep(self.retry)
+
+
+class BrokerManager(PubSubManager):  # type: ignore[misc,valid-type]
+    """File de messages Socket.IO sur le courtier (`SocketIO(client_manager=...)`) : un `emit`
+    de n'importe quel processus atteint les sockets de tous les processus.
+
+    Une charge `RawJSON` (voir `offload.PreEncodedJSON`) est insérée telle quelle dans le message ;
+    le processus destinataire la reçoit décodée.
+    """
+
+    name = "moneydrop"
+
+    def __init__(
+        self,
+        client: BrokerClient,
+        channel: str = "flask-socketio",
+        write_only: bool = False,
+        logger=None,
+    ):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.client = client
+
+    def _publish(self, data: Dict[str, Any]) -> None:
+        payload = data.get("data")
+        if isinstance(payload, RawJSON):
+            head = json.dumps({k: v for k, v in data.items() if k != "data"})
+            message = f'{head[:-1]},"data":{payload}}}'
+        else:
+            message = json.dumps(data)
+        self.client.publish(self.channel, message)
+
+    def _listen(self) -> Iterator[Any]:
+        yield from self.client.listen(self.channel)
+
+
+class LobbyRegistry:
+    """Annuaire partagé des salons joignables de tous les processus.
+
+    Chaque processus publie son annuaire (`manager.joinable()`) sur le courtier quand il change,
+    et au moins toutes les `heartbeat` s (`publish`, à appeler périodiquement) ; il garde le
+    dernier reçu de chacun des autres (`listen`, tâche de fond). Un processus muet depuis
+    3 × `heartbeat` s est oublié. Même interface que le gestionnaire pour `/api/lobbies` :
+    `listing_etag()` et `joinable()`, corps fusionné reconstruit seulement quand un ETag change.
+    """
+
+    CHANNEL = "lobbies"
+
+    def __init__(
+        self,
+        client: BrokerClient,
+        index: int,
+        manager: Any,
+        heartbeat: float = 5.0,
+        clock=time.monotonic,
+    ):
+        self.client = client
+        self.index = index
+        self._manager = manager
+        self.heartbeat = heartbeat
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._remote: Dict[int, Tuple[str, List[Dict[str, Any]], float]] = {}
+        self._merged: Optional[Tuple[str, str]] = None
+        self._sent: Tuple[Optional[str], float] = (None, 0.0)
+
+    def publish(self) -> None:
+        etag, body = self._manager.joinable()
+        now = self._clock()
+        if etag == self._sent[0] and now - self._sent[1] < self.heartbeat:
+            return
+        message = f'{{"worker":{self.index},"etag":{json.dumps(etag)},"listing":{body}}}'
+        try:
+            self.client.publish(self.CHANNEL, message)
+        except OSError:
+            return  # courtier absent : nouvel essai au prochain appel
+        self._sent = (etag, now)
+
+    def listen(self) -> None:
+        for message in self.client.listen(self.CHANNEL):
+            worker = message.get("worker")
+            if worker == self.index:
+                continue
+            with self._lock:
+                lobbies = message["listing"]["lobbies"]
+                self._remote[worker] = (message["etag"], lobbies, self._clock())
+
+    def _live(self) -> List[Tuple[int, str, List[Dict[str, Any]]]]:
+        # Appelé sous self._lock
+        limit = self._clock() - 3 * self.heartbeat
+        for worker in [w for w, (_, _, seen) in self._remote.items() if seen < limit]:
+            del self._remote[worker]
+        return [(w, etag, lobbies) for w, (etag, lobbies, _) in sorted(self._remote.items())]
+
+    def knows(self, lobby_id: str) -> bool:
+        """Salon joignable d'un autre processus."""
+        with self._lock:
+            live = self._live()
+        return any(e.get("lobby_id") == lobby_id for _, _, lobbies in live for e in lobbies)
+
+    def listing_etag(self) -> str:
+        with self._lock:
+            live = self._live()
+        tags = [self._manager.listing_etag()] + [f"{w}:{etag}" for w, etag, _ in live]
+        return f"{zlib.crc32('|'.join(tags).encode()):08x}"
+
+    def joinable(self) -> Tuple[str, str]:
+        local_etag, local_body = self._manager.joinable()
+        with self._lock:
+            live = self._live()
+            tags = [local_etag] + [f"{w}:{etag}" for w, etag, _ in live]
+            etag = f"{zlib.crc32('|'.join(tags).encode()):08x}"
+            if self._merged is not None and self._merged[0] == etag:
+                return self._merged
+        entries = json.loads(local_body)["lobbies"]
+        for _, _, lobbies in live:
+            entries.extend(lobbies)
+        merged = (etag, json.dumps({"ok": True, "lobbies": entries}, ensure_ascii=False))
+        with self._lock:
+            self._merged = merged
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live = self._live()
+        return {"worker": self.index, "remote": {str(w): len(lobbies) for w, _, lobbies in live}}
+
+
+class LeaderboardRelay:
+    """Classement partagé entre processus : chaque amélioration (`Leaderboard.on_update`) et
+    chaque ouverture / fermeture de soirée (`event`) est publiée sur le courtier ; les autres
+    processus l'appliquent (`Leaderboard.replicate`) : mêmes classements glissants, mémos et
+    ETag invalidés, positions poussées à leurs propres joueurs. Une amélioration publiée pendant
+    une coupure du courtier n'atteint que le stockage partagé.
+    """
+
+    CHANNEL = "leaderboard"
+
+    def __init__(self, client: BrokerClient, index: int, leaderboard: Any):
+        self.client = client
+        self.index = index
+        self._leaderboard = leaderboard
+        self.sent = 0
+        self.received = 0
+        leaderboard.on_update(self._updated)
+
+    def _publish(self, message: Dict[str, Any]) -> None:
+        message["worker"] = self.index
+        try:
+            self.client.publish(self.CHANNEL, json.dumps(message, ensure_ascii=False))
+        except OSError:
+            return  # courtier absent : les autres processus ne l'apprendront pas
+        self.sent += 1
+
+    def _updated(
+        self, name: str, chips: int, correct: int, old: Optional[int], new: Optional[int]
+    ) -> None:
+        self._publish({"update": [name, chips, correct, old, new]})
+
+    def event(self, name: Optional[str]) -> None:
+        """Ouvre (`name`) ou ferme (None) la soirée, ici et dans les autres processus."""
+        self._apply_event(name)
+        self._publish({"event": name})
+
+    def _apply_event(self, name: Optional[str]) -> None:
+        windows = self._leaderboard.windows
+        if name:
+            windows.start_event(name)
+        else:
+            windows.end_event()
+
+    def listen(self) -> None:
+        for message in self.client.listen(self.CHANNEL):
+            if message.get("worker") == self.index:
+                continue
+            self.received += 1
+            if "update" in message:
+                self._leaderboard.replicate(*message["update"])
+            elif "event" in message:
+                self._apply_event(message["event"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sent": self.sent, "received": self.received}
+
+
+class Cluster:
+    """Place de ce processus parmi `workers` processus web, sur des ports consécutifs à partir de
+    `base_port` (le processus `index` écoute sur `base_port + index`).
+
+    Les salons sont répartis par `lobby_id` (`owner_of`) : une création est confiée à tour de
+    rôle à chaque processus (`place`, puis redirection vers lui), qui ne tire que des `lobby_id`
+    lui revenant ; une page d'un salon d'un autre processus est redirigée vers lui (`url`) ; ses
+    sockets s'y connectent donc aussi. `from_env` : None hors de ce mode.
+    """
+
+    def __init__(self, index: int, workers: int, base_port: int, broker: Tuple[str, int]):
+        self.index = index
+        self.workers = workers
+        self.base_port = base_port
+        self.client = BrokerClient(*broker)
+        # Décalé par processus : des créations reçues par plusieurs processus ne visent pas toutes
+        # le même au même moment
+        self._placements = itertools.count(index)
+
+    @classmethod
+    def from_env(cls) -> Optional["Cluster"]:
+        workers = int(os.environ.get("MONEYDROP_WORKERS", "1"))
+        if workers <= 1 or "MONEYDROP_WORKER_INDEX" not in os.environ:
+            return None
+        return cls(
+            int(os.environ["MONEYDROP_WORKER_INDEX"]),
+            workers,
+            int(os.environ.get("MONEYDROP_BASE_PORT", os.environ.get("MONEYDROP_PORT", "8000"))),
+            parse_address(os.environ.get("MONEYDROP_BROKER", "")),
+        )
+
+    def owns(self, lobby_id: str) -> bool:
+        return owner_of(lobby_id, self.workers) == self.index
+
+    def place(self) -> int:
+        """Processus qui créera le prochain salon (à tour de rôle)."""
+        return next(self._placements) % self.workers
+
+    def url(self, lobby_id: str, host_url: str, path: str) -> str:
+        """Même adresse (`host_url` de la requête), sur le port du processus propriétaire."""
+        return self.worker_url(owner_of(lobby_id, self.workers), host_url, path)
+
+    def worker_url(self, index: int, host_url: str, path: str) -> str:
+        """Même adresse (`host_url` de la requête), sur le port du processus `index`."""
+        parts = urllib.parse.urlsplit(host_url)
+        host = parts.hostname or "127.0.0.1"
+        if ":" in host:
+            host = f"[{host}]"
+        return f"{parts.scheme}://{host}:{self.base_port + index}{path}"
+
+
+def _wait_listening(address: Tuple[str, int], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(address, timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+
+
+def supervise(argv: List[str], workers: int, base_port: int, broker: Tuple[str, int]) -> int:
+    """Lance le courtier puis `workers` processus `argv` (ports `base_port` à
+    `base_port + workers - 1`) ; tout s'arrête quand l'un d'eux s'arrête (ou sur Ctrl+C)."""
+    host, port = broker
+    cmd = [sys.executable, "-m", "moneydrop.cluster", "--host", host, "--port", str(port)]
+    # Depuis la racine du projet : `-m moneydrop.cluster` doit trouver le paquet d'où qu'on lance
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    procs = [subprocess.Popen(cmd, cwd=root)]
+    _wait_listening(broker)
+    for index in range(workers):
+        env = dict(
+            os.environ,
+            MONEYDROP_WORKERS=str(workers),
+            MONEYDROP_WORKER_INDEX=str(index),
+            MONEYDROP_BASE_PORT=str(base_port),
+            MONEYDROP_PORT=str(base_port + index),
+            MONEYDROP_BROKER=f"{host}:{port}",
+        )
+        procs.append(subprocess.Popen(argv, env=env))
+    try:
+        while all(p.poll() is None for p in procs):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            try:
+                p.wait(5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+    return max((p.returncode or 0) for p in procs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Money Drop - courtier pub/sub (mode multi-processus)"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5070)
+    args = parser.parse_args()
+    try:
+        asyncio.run(Broker(args.host, args.port).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import random
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Optional, Tuple
+from threading import Lock
+from typing import Callable, Dict, Generator, List, Optional, Tuple
 
 from .models import AnswerKey, GameConfig, GameResult, Player, Question
 
@@ -15,20 +16,121 @@ class IO:
     read_line: Callable[[str], str]
 
 
+class IOCounters:
+    """Compteurs d'écritures partagés (thread-safe) : appels `write` vs envois réels."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.writes = 0
+        self.sends = 0
+
+    def add(self, writes: int, sends: int) -> None:
+        with self._lock:
+            self.writes += writes
+            self.sends += sends
+
+    @property
+    def saved(self) -> int:
+        return self.writes - self.sends
+
+
+class BufferedIO:
+    """I/O bufferisée : les écritures sont regroupées et envoyées en une fois.
+
+    Le tampon est vidé quand un prompt est affiché (juste avant la lecture), sur `flush()`
+    (fin de partie) ou dès qu'il dépasse `max_buffer` caractères. Sans `recv_line`
+    (serveur asyncio), seul `write`/`flush` est utilisable et la lecture reste à l'appelant.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], None],
+        recv_line: Optional[Callable[[], str]] = None,
+        max_buffer: int = 16 * 1024,
+        counters: Optional[IOCounters] = None,
+    ):
+        self._send = send
+        self._recv_line = recv_line
+        self._max_buffer = max(1, int(max_buffer))
+        self._counters = counters
+        self._buf: List[str] = []
+        self._size = 0
+        self._reported = False
+        self.writes = 0
+        self.sends = 0
+
+    @property
+    def saved(self) -> int:
+        return self.writes - self.sends
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        self.writes += 1
+        self._buf.append(text)
+        self._size += len(text)
+        if self._size >= self._max_buffer:
+            self.flush()
+
+    def read_line(self, prompt: str) -> str:
+        if self._recv_line is None:
+            raise RuntimeError("lecture synchrone indisponible")
+        self.write(prompt)
+        self.flush()
+        return self._recv_line()
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        data = "".join(self._buf)
+        self._buf.clear()
+        self._size = 0
+        self.sends += 1
+        self._send(data)
+
+    def close(self) -> None:
+        """Vide le tampon et reporte les compteurs de la session dans `counters` (une seule fois ;
+        `writes` / `sends` restent ceux de la session)."""
+        try:
+            self.flush()
+        finally:
+            if self._counters is not None and not self._reported:
+                self._reported = True
+                self._counters.add(self.writes, self.sends)
+
+
 class MoneyDropEngine:
     def __init__(self, questions: List[Question]):
         self._questions = list(questions)
 
+    @property
+    def questions(self) -> List[Question]:
+        """Banque de questions du moteur (ne pas modifier)."""
+        return self._questions
+
     def run_game(self, player_name: str, io: IO, config: GameConfig) -> GameResult:
+        game = GameStepper(self, player_name, io.write, config)
+        while game.result is None:
+            game.feed(io.read_line(game.prompt))
+        return game.result
+
+    def play(
+        self, player_name: str, write: Callable[[str], None], config: GameConfig
+    ) -> Generator[str, str, GameResult]:
+        """Partie pilotable sans bloquer.
+
+        Le générateur produit chaque prompt de saisie et attend la ligne du joueur via
+        `send()`. Le `GameResult` est la valeur de retour (`StopIteration.value`).
+        """
         player = Player(name=player_name, chips=config.starting_chips)
         details: List[str] = []
 
         questions = self._questions[:]
         questions = questions[: config.question_count]
 
-        io.write("\n=== Money Drop ===\n")
-        io.write(f"Joueur: {player.name} | Jetons de départ: {player.chips}\n")
-        io.write(
+        write("\n=== Money Drop ===\n")
+        write(f"Joueur: {player.name} | Jetons de départ: {player.chips}\n")
+        write(
             "Règle: vous répartissez vos jetons sur A/B/C/D. "
             "Les jetons sur les mauvaises réponses sont perdus.\n"
         )
@@ -40,21 +142,21 @@ class MoneyDropEngine:
                 details.append(f"Éliminé avant la question {idx}.")
                 break
 
-            io.write("\n" + ("-" * 60) + "\n")
-            io.write(f"Question {idx}/{len(questions)} [{question.category}]\n")
-            io.write(question.prompt + "\n")
+            write("\n" + ("-" * 60) + "\n")
+            write(f"Question {idx}/{len(questions)} [{question.category}]\n")
+            write(question.prompt + "\n")
             for key in ["A", "B", "C", "D"]:
-                io.write(f"  {key}) {question.answers[key]}\n")
-            io.write(f"Jetons disponibles: {player.chips}\n")
-            io.write("Format mise: A=200 B=300 C=0 D=50 (espaces ou virgules).\n")
+                write(f"  {key}) {question.answers[key]}\n")
+            write(f"Jetons disponibles: {player.chips}\n")
+            write("Format mise: A=200 B=300 C=0 D=50 (espaces ou virgules).\n")
 
-            bets = self._prompt_bets(io, player.chips)
+            bets = yield from self._prompt_bets(write, player.chips)
             bet_total = sum(bets.values())
             unbet = player.chips - bet_total
             if unbet > 0 and not config.allow_unbet_chips:
                 # Contrat: ici, on force l'utilisation de tous les jetons.
-                io.write("Vous devez miser tous vos jetons sur A/B/C/D.\n")
-                bets = self._prompt_bets(io, player.chips, must_use_all=True)
+                write("Vous devez miser tous vos jetons sur A/B/C/D.\n")
+                bets = yield from self._prompt_bets(write, player.chips, must_use_all=True)
                 bet_total = sum(bets.values())
                 unbet = player.chips - bet_total
 
@@ -64,21 +166,21 @@ class MoneyDropEngine:
             if bets[question.correct] > 0:
                 player.correct_answers += 1
 
-            io.write("\nRésultat :\n")
-            io.write(f"Bonne réponse: {question.correct}) {question.answers[question.correct]}\n")
+            write("\nRésultat :\n")
+            write(f"Bonne réponse: {question.correct}) {question.answers[question.correct]}\n")
             if question.explanation:
-                io.write(f"Explication: {question.explanation}\n")
-            io.write(f"Jetons misés: {bet_total} | Non misés: {unbet}\n")
-            io.write(f"Perdus: {lost} | Conservés: {kept}\n")
+                write(f"Explication: {question.explanation}\n")
+            write(f"Jetons misés: {bet_total} | Non misés: {unbet}\n")
+            write(f"Perdus: {lost} | Conservés: {kept}\n")
 
             details.append(
                 f"Q{idx}: correct={question.correct} bet={bet_total} kept={kept} lost={lost}"
             )
 
-        io.write("\n" + ("=" * 60) + "\n")
-        io.write(f"Fin de partie - {player.name}\n")
-        io.write(f"Jetons finaux: {player.chips}\n")
-        io.write(f"Bonnes réponses: {player.correct_answers}/{len(questions)}\n")
+        write("\n" + ("=" * 60) + "\n")
+        write(f"Fin de partie - {player.name}\n")
+        write(f"Jetons finaux: {player.chips}\n")
+        write(f"Bonnes réponses: {player.correct_answers}/{len(questions)}\n")
 
         return GameResult(
             player_name=player.name,
@@ -89,23 +191,23 @@ class MoneyDropEngine:
             details=details,
         )
 
-    def _prompt_bets(self, io: IO, available: int, must_use_all: bool = False) -> Dict[AnswerKey, int]:
+    def _prompt_bets(
+        self, write: Callable[[str], None], available: int, must_use_all: bool = False
+    ) -> Generator[str, str, Dict[AnswerKey, int]]:
         while True:
-            raw = io.read_line(
-                "Entrez vos mises (ex: A=200 B=300 C=0 D=50). Vous pouvez mettre 0.\n> "
-            )
+            raw = yield "Entrez vos mises (ex: A=200 B=300 C=0 D=50). Vous pouvez mettre 0.\n> "
             try:
                 bets = self._parse_bets(raw)
             except ValueError as e:
-                io.write(f"Entrée invalide: {e}\n")
+                write(f"Entrée invalide: {e}\n")
                 continue
 
             total = sum(bets.values())
             if total > available:
-                io.write(f"Somme des mises {total} > jetons disponibles {available}.\n")
+                write(f"Somme des mises {total} > jetons disponibles {available}.\n")
                 continue
             if must_use_all and total != available:
-                io.write(f"Vous devez miser exactement {available} (actuel: {total}).\n")
+                write(f"Vous devez miser exactement {available} (actuel: {total}).\n")
                 continue
             return bets
 
@@ -146,3 +248,43 @@ class MoneyDropEngine:
             bets[key] = value  # dernière occurrence gagne
 
         return bets
+
+
+class GameStepper:
+    """Partie pas à pas, pour multiplexer beaucoup de parties sur une seule boucle.
+
+    - `prompt` : texte de saisie en attente (None une fois la partie finie)
+    - `feed(line)` : transmet la ligne du joueur et avance jusqu'au prompt suivant
+    - `result` : `GameResult` une fois la partie finie
+    """
+
+    __slots__ = ("_game", "prompt", "result")
+
+    def __init__(
+        self,
+        engine: MoneyDropEngine,
+        player_name: str,
+        write: Callable[[str], None],
+        config: GameConfig,
+    ):
+        self._game = engine.play(player_name, write, config)
+        self.prompt: Optional[str] = None
+        self.result: Optional[GameResult] = None
+        self._advance(None)
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None
+
+    def feed(self, line: str) -> Optional[str]:
+        if self.result is not None:
+            raise ValueError("partie terminée")
+        self._advance(line)
+        return self.prompt
+
+    def _advance(self, line: Optional[str]) -> None:
+        try:
+            self.prompt = next(self._game) if line is None else self._game.send(line)
+        except StopIteration as stop:
+            self.prompt = None
+            self.result = stop.value
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO
+
+from .storage import _offload, _write_json
+
+
+def _apply(states: Dict[str, Dict[str, Any]], record: List[Any]) -> None:
+    """Rejoue une ligne `[seq, op, lobby_id, ...]` sur l'état durable de son salon."""
+    seq, op, lobby_id, args = record[0], record[1], record[2], record[3:]
+    if op == "c":
+        if lobby_id in states:
+            return  # déjà dans l'instantané
+        host_sid, host_name, max_players, time_limit, question_total, created_at = args
+        states[lobby_id] = {
+            "seq": seq,
+            "lobby_id": lobby_id,
+            "host_sid": host_sid,
+            "host_name": host_name,
+            "max_players": max_players,
+            "time_limit": time_limit,
+            "question_total": question_total,
+            "created_at": created_at,
+            "phase": "waiting",
+            "question_index": 0,
+            "questions": [],
+            "correct": None,
+            "started": None,
+            "paused": None,
+            "players": {},
+            "banned_sids": [],
+            "banned_ips": [],
+        }
+        return
+    if op == "x":
+        # Sans condition sur `seq` : un salon supprimé pendant une compaction figure dans
+        # l'instantané avec un `seq` au moins égal à celui de sa suppression
+        states.pop(lobby_id, None)
+        return
+    state = states.get(lobby_id)
+    if state is None or seq <= state["seq"]:
+        return  # salon supprimé, ou ligne couverte par l'instantané
+    state["seq"] = seq
+    players = state["players"]
+    if op == "j":  # arrivée (ou nouveau nom / IP)
+        sid, name, ip = args
+        if sid in players:
+            players[sid][0], players[sid][1] = name, ip or players[sid][1]
+        else:
+            players[sid] = [name, ip, 10000, 0]
+    elif op == "r":  # exclusion
+        players.pop(args[0], None)
+    elif op == "s":  # début de partie : jetons de départ pour tous
+        state["questions"] = args[0]
+        state.update(phase="waiting", question_index=0, correct=None, started=None, paused=None)
+        for p in players.values():
+            p[2], p[3] = 10000, 0
+    elif op == "l":  # lancement (ou fin de partie) ; début du chrono en heure murale
+        state.update(phase=args[0], correct=None, started=args[1], paused=None)
+    elif op == "p":
+        state.update(phase="paused", paused=args[0])
+    elif op == "u":
+        state.update(phase="question", started=args[0], paused=None)
+    elif op == "v":  # validation : scores des joueurs encore en jeu, 0 = éliminé et banni
+        state.update(phase=args[0], correct=args[1])
+        banned_sids, banned_ips = set(state["banned_sids"]), set(state["banned_ips"])
+        for sid, score in args[2]:
+            p = players.get(sid)
+            if p is None:
+                continue
+            p[2] = score
+            if score <= 0:
+                p[3] = 1
+                banned_sids.add(sid)
+                if p[1]:
+                    banned_ips.add(p[1])
+        state["banned_sids"], state["banned_ips"] = list(banned_sids), list(banned_ips)
+    elif op == "n":
+        state.update(phase=args[0], question_index=args[1], correct=None, started=None, paused=None)
+
+
+class LobbyJournal:
+    """Reprise après crash des salons temps réel : instantané JSON + journal en ajout seul
+    (même schéma que `JournalStorage`).
+
+    Chaque transition d'un salon (création, arrivée, exclusion, début de partie, lancement,
+    pause, reprise, validation, question suivante, suppression) ajoute une ligne compacte
+    `[seq, op, lobby_id, ...]` portant son résultat (scores après validation, début du chrono en
+    heure murale…) : le rejeu ne recalcule rien. Les lignes de tous les salons partagent un
+    fichier (un descripteur, des écritures séquentielles) ; `seq` compte les lignes de chaque salon.
+
+    `compact(lobbies)` repart d'un journal vide puis écrit l'instantané des salons vivants
+    (`RealtimeLobby.checkpoint`). Au rejeu, une ligne déjà couverte par l'instantané (`seq` au
+    plus celui du salon) est ignorée, sauf une suppression, tout comme une ligne tronquée par un
+    crash. Ni les mises en cours ni les sockets ne sont journalisés : les clients se reconnectent
+    et remisent.
+    Les questions sont notées par leur rang dans `bank` (banque du moteur, dans son ordre).
+    """
+
+    def __init__(self, path: str, bank: list, lock_factory: Callable[[], Any] = threading.Lock):
+        self._path = path
+        self._journal_path = f"{path}.journal"
+        self._bank = list(bank)
+        self._ids = {q.prompt: i for i, q in enumerate(self._bank)}
+        self._lock = lock_factory()
+        self._file: Optional[TextIO] = None
+        self.records = 0  # lignes depuis le dernier instantané
+        self.bytes = 0
+
+    def _question_ids(self, questions: list) -> List[int]:
+        return [self._ids.get(q.prompt, -1) for q in questions]
+
+    def questions(self, state: Dict[str, Any]) -> list:
+        """Questions d'un état durable (rangs inconnus de la banque ignorés)."""
+        return [self._bank[i] for i in state["questions"] if 0 <= i < len(self._bank)]
+
+    def append(self, record: List[Any]) -> None:
+        if record[1] == "s":
+            record[3] = self._question_ids(record[3])
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+            self.records += 1
+            self.bytes += len(line)
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        with open(self._journal_path, "ab+") as raw:
+            if raw.tell():
+                # Dernière ligne tronquée par un crash (au milieu d'un caractère, parfois) : on la
+                # termine pour ne pas coller la suivante ; vérifié en octets
+                raw.seek(-1, os.SEEK_END)
+                if raw.read(1) != b"\n":
+                    raw.write(b"\n")
+        self._file = open(self._journal_path, "a", encoding="utf-8")
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """États durables des salons au moment de l'arrêt : instantané, puis journaux rejoués."""
+        states: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                for state in json.load(f).get("lobbies", []):
+                    states[state["lobby_id"]] = state
+        except (OSError, ValueError):
+            pass
+        # `.old` : journal en cours de compaction lors d'un éventuel crash
+        for path in (f"{self._journal_path}.old", self._journal_path):
+            if not os.path.exists(path):
+                continue
+            # Lecture binaire, décodage ligne par ligne : une ligne coupée au milieu d'un caractère
+            # multi-octets est ignorée comme toute ligne tronquée
+            with open(path, "rb") as f:
+                for raw in f:
+                    try:
+                        _apply(states, json.loads(raw.decode("utf-8")))
+                    except (ValueError, TypeError, IndexError, KeyError, UnicodeDecodeError):
+                        continue
+                    self.records += 1  # à couvrir par le prochain instantané
+        return states
+
+    def compact(
+        self,
+        lobbies: Callable[[], Iterable[Any]],
+        capture: Optional[Callable[[Any], Dict[str, Any]]] = None,
+    ) -> bool:
+        """Instantané des salons vivants (`lobbies()`, lu après la rotation du journal : un salon
+        créé entre-temps y figure), si le journal a changé ; renvoie True s'il est écrit.
+        `capture(lobby)` remplace `lobby.checkpoint()`."""
+        with self._lock:
+            if not self.records and os.path.exists(self._path):
+                return False
+            self._rotate()
+        # Lignes écrites à partir d'ici : dans le nouveau journal, ignorées au rejeu si l'état
+        # capturé ci-dessous les couvre déjà
+        states = []
+        for lobby in lobbies():
+            state = lobby.checkpoint() if capture is None else capture(lobby)
+            state["questions"] = self._question_ids(state["questions"])
+            states.append(state)
+        _offload(_write_json, self._path, {"lobbies": states}, None, True)
+        if os.path.exists(f"{self._journal_path}.old"):
+            os.remove(f"{self._journal_path}.old")
+        return True
+
+    def _rotate(self) -> None:
+        # Appelé sous self._lock : les prochaines lignes partent dans un journal neuf
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.records = self.bytes = 0
+        if not os.path.exists(self._journal_path):
+            return
+        old = f"{self._journal_path}.old"
+        if os.path.exists(old):
+            # Instantané précédent inachevé : on cumule au lieu d'écraser
+            with open(self._journal_path, "rb") as src, open(old, "ab") as dst:
+                dst.write(b"\n")
+                shutil.copyfileobj(src, dst)
+            os.remove(self._journal_path)
+        else:
+            os.replace(self._journal_path, old)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"records": self.records, "bytes": self.bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -1,83 +1,213 @@
 from __future__ import annotations
 
-import json
-import os
-from dataclasses import dataclass
+import secrets
 from threading import Lock
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from .models import LeaderboardEntry
+from .storage import LeaderboardStorage, make_storage
+from .windows import TITLES, WindowedBoards
 
-@dataclass
-class LeaderboardEntry:
-    name: str
-    best_chips: int
-    best_correct: int
+__all__ = ["Leaderboard", "LeaderboardEntry"]
+
+# (nom, jetons, bonnes réponses, ancien rang, nouveau rang) d'une amélioration
+UpdateListener = Callable[[str, int, int, Optional[int], Optional[int]], None]
 
 
 class Leaderboard:
-    """Classement global thread-safe, persistant (JSON)."""
+    """Classement global thread-safe, persistant.
+
+    Stockages (`backend`) : "json" (fichier réécrit à chaque partie), "journal" (ajouts +
+    compaction en arrière-plan) ou "sqlite" (WAL, écritures groupées, migration automatique
+    du JSON existant). Un stockage déjà construit peut être passé via `storage`.
+    `write_behind` (JSON) : sauvegarde différée et regroupée dans un thread de fond.
+
+    À côté du classement global, des classements glissants (`window` = "day", "week" ou
+    "event") sont tenus en mémoire par `WindowedBoards`.
+
+    `version` augmente à chaque changement d'un classement ; le texte (`render`) et la charge
+    JSON (`top_payload`) sont mémorisés par `n` et par fenêtre pour la version courante.
 
-    def __init__(self, path: str):
+    `on_rank_change(callback)` : `callback(name, old, new)` est appelé après chaque amélioration
+    qui fait bouger `name` dans le classement global (old = None pour un nouveau venu).
+    `on_update(callback)` : `callback(name, chips, correct, old, new)` après chaque amélioration
+    (relais vers les autres processus, qui l'appliquent par `replicate`).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        backend: str = "json",
+        storage: Optional[LeaderboardStorage] = None,
+        write_behind: bool = False,
+        windows: Optional[WindowedBoards] = None,
+    ):
         self._path = path
-        self._lock = Lock()
-        self._scores: Dict[str, LeaderboardEntry] = {}
-        self._load()
+        if storage is None:
+            storage = make_storage(backend, path, write_behind=write_behind)
+        self._storage = storage
+        self._windows = windows if windows is not None else WindowedBoards()
+        # L'époque distingue les versions d'un redémarrage à l'autre (ETag)
+        self._epoch = secrets.token_hex(4)
+        self._version = 0
+        self._cache_lock = Lock()
+        self._cache: Dict[Tuple[str, int, str], Tuple[int, Any]] = {}
+        # Rangs avant/après lus sous ce verrou : les mises à jour concurrentes ne s'entremêlent pas
+        self._update_lock = Lock()
+        self._rank_listeners: List[Callable[[str, Optional[int], int], None]] = []
+        self._update_listeners: List[UpdateListener] = []
 
-    def _load(self) -> None:
-        if not os.path.exists(self._path):
-            return
-        try:
-            with open(self._path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            for name, payload in data.items():
-                self._scores[name] = LeaderboardEntry(
-                    name=name,
-                    best_chips=int(payload.get("best_chips", 0)),
-                    best_correct=int(payload.get("best_correct", 0)),
-                )
-        except Exception:
-            # En cas de fichier corrompu, on repart proprement.
-            self._scores = {}
-
-    def _save(self) -> None:
-        os.makedirs(os.path.dirname(self._path), exist_ok=True)
-        data = {
-            name: {"best_chips": e.best_chips, "best_correct": e.best_correct}
-            for name, e in self._scores.items()
-        }
-        tmp = f"{self._path}.tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        os.replace(tmp, self._path)
+    @property
+    def storage(self) -> LeaderboardStorage:
+        return self._storage
+
+    @property
+    def windows(self) -> WindowedBoards:
+        return self._windows
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _scope(self, window: Optional[str], bucket: Optional[str]) -> str:
+        if window is None:
+            return "all"
+        bucket, _ = self._windows.resolve(window, bucket)
+        # Le seau courant fait partie de la clé : un changement de jour invalide le cache
+        return f"{window}:{bucket}"
+
+    def etag(self, window: Optional[str] = None, bucket: Optional[str] = None) -> str:
+        return f"{self._epoch}-{self._version}-{self._scope(window, bucket)}"
+
+    def on_rank_change(self, callback: Callable[[str, Optional[int], int], None]) -> None:
+        self._rank_listeners.append(callback)
+
+    def on_update(self, callback: UpdateListener) -> None:
+        self._update_listeners.append(callback)
 
     def update(self, name: str, final_chips: int, correct_answers: int) -> None:
-        with self._lock:
-            current = self._scores.get(name)
-            if current is None:
-                self._scores[name] = LeaderboardEntry(
-                    name=name, best_chips=final_chips, best_correct=correct_answers
-                )
-            else:
-                # On conserve la meilleure perf en jetons, et à égalité, les bonnes réponses.
-                if (final_chips > current.best_chips) or (
-                    final_chips == current.best_chips
-                    and correct_answers > current.best_correct
-                ):
-                    current.best_chips = final_chips
-                    current.best_correct = correct_answers
-            self._save()
-
-    def top(self, n: int = 10) -> List[LeaderboardEntry]:
-        with self._lock:
-            entries = list(self._scores.values())
-        entries.sort(key=lambda e: (e.best_chips, e.best_correct, e.name.lower()), reverse=True)
-        return entries[:n]
-
-    def render(self, n: int = 10) -> str:
-        entries = self.top(n)
+        if not self._rank_listeners and not self._update_listeners:
+            self._update(name, final_chips, correct_answers)
+            return
+        with self._update_lock:
+            old = self._storage.rank(name)
+            if not self._update(name, final_chips, correct_answers):
+                return
+            new = self._storage.rank(name)
+            for listener in self._update_listeners:
+                listener(name, final_chips, correct_answers, old, new)
+            self._notify(name, old, new)
+
+    def replicate(
+        self,
+        name: str,
+        final_chips: int,
+        correct_answers: int,
+        old: Optional[int],
+        new: Optional[int],
+    ) -> None:
+        """Amélioration enregistrée par un autre processus (`on_update` de son classement) :
+        fenêtres, version (mémos, ETag) et positions poussées aux joueurs de ce processus. Un
+        stockage `shared` l'a déjà ; un stockage propre au processus la reçoit ici."""
+        with self._update_lock:
+            if not self._storage.shared:
+                self._storage.update(name, final_chips, correct_answers)
+            self._windows.update(name, final_chips, correct_answers)
+            with self._cache_lock:
+                self._version += 1
+            self._notify(name, old, new)
+
+    def _notify(self, name: str, old: Optional[int], new: Optional[int]) -> None:
+        # Appelé sous self._update_lock
+        if new is None or new == old:
+            return
+        for callback in self._rank_listeners:
+            callback(name, old, new)
+
+    def _update(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        stored = self._storage.update(name, final_chips, correct_answers)
+        changed = self._windows.update(name, final_chips, correct_answers) or stored
+        if changed:
+            with self._cache_lock:
+                self._version += 1
+        return stored
+
+    def top(
+        self, n: int = 10, window: Optional[str] = None, bucket: Optional[str] = None
+    ) -> List[LeaderboardEntry]:
+        if window is None:
+            return self._storage.top(n)
+        return self._windows.top(window, n, bucket)
+
+    def rank(
+        self, name: str, window: Optional[str] = None, bucket: Optional[str] = None
+    ) -> Optional[int]:
+        """Position du joueur (1 = premier), None s'il n'a pas encore de score."""
+        if window is None:
+            return self._storage.rank(name)
+        return self._windows.rank(window, name, bucket)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._storage.stats()
+
+    def close(self) -> None:
+        """Arrêt propre : écrit ce qui est en attente et libère le stockage."""
+        self._storage.close()
+
+    def memo(
+        self,
+        kind: str,
+        n: int,
+        build: Callable[[], Any],
+        window: Optional[str] = None,
+        bucket: Optional[str] = None,
+    ) -> Any:
+        """Valeur dérivée du top `n` (texte, JSON sérialisé…), recalculée seulement si la version
+        a changé."""
+        # Version lue AVANT de construire : au pire on reconstruit une fois de trop, jamais périmé
+        version = self._version
+        key = (kind, n, self._scope(window, bucket))
+        with self._cache_lock:
+            hit = self._cache.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        value = build()
+        with self._cache_lock:
+            self._cache[key] = (version, value)
+        return value
+
+    def top_payload(
+        self, n: int = 10, window: Optional[str] = None, bucket: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Top N prêt à sérialiser en JSON (liste partagée : ne pas modifier)."""
+        return self.memo(
+            "json",
+            n,
+            lambda: [
+                {"name": e.name, "best_chips": e.best_chips, "best_correct": e.best_correct}
+                for e in self.top(n, window, bucket)
+            ],
+            window,
+            bucket,
+        )
+
+    def render(
+        self, n: int = 10, window: Optional[str] = None, bucket: Optional[str] = None
+    ) -> str:
+        return self.memo("text", n, lambda: self._render(n, window, bucket), window, bucket)
+
+    def _render(self, n: int, window: Optional[str], bucket: Optional[str]) -> str:
+        entries = self.top(n, window, bucket)
         if not entries:
             return "(Classement vide)"
-        lines = ["=== Classement global ==="]
+        event = bucket or self._windows.event
+        if window is None:
+            title = "=== Classement global ==="
+        elif window == "event" and event:
+            title = f"=== Classement : {event} ==="
+        else:
+            title = TITLES[window]
+        lines = [title]
         for i, e in enumerate(entries, start=1):
             lines.append(f"{i:>2}. {e.name:<16} | Jetons: {e.best_chips:<5} | Bonnes réponses: {e.best_correct}")
         return "\n".join(lines)
@@ -39,3 +39,10 @@ class GameResult:
     questions_played: int
     eliminated: bool
     details: List[str] = field(default_factory=list)
+
+
+@dataclass
+class LeaderboardEntry:
+    name: str
+    best_chips: int
+    best_correct: int
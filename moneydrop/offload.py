@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Histogramme de latences à seaux logarithmiques (puissances de 2 en µs) : O(1) par mesure."""
+
+    BUCKETS = 32  # jusqu'à 2^31 µs (~36 min)
+
+    def __init__(self) -> None:
+        self.counts = [0] * self.BUCKETS
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1e6)
+        self.counts[min(us.bit_length(), self.BUCKETS - 1)] += 1
+        self.total += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Borne haute (ms) du seau qui contient le quantile `q` (0 à 1)."""
+        if not self.total:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return (1 << bucket) / 1000.0
+        return self.max * 1000.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max * 1000.0, 3),
+        }
+
+
+class RawJSON(str):
+    """Argument d'événement déjà encodé en JSON (voir `PreEncodedJSON`)."""
+
+
+def encode(payload: Any, chunk: int = 500) -> RawJSON:
+    """JSON compact de `payload` par tranches : une longue liste (les joueurs d'un état) est encodée
+    `chunk` éléments à la fois. Un seul `json.dumps` garderait le GIL tout le long (~70 ms pour
+    20 000 joueurs) ; entre deux tranches, la boucle reprend la main."""
+    if isinstance(payload, dict):
+        items = (f"{json.dumps(str(k))}:{encode(v, chunk)}" for k, v in payload.items())
+        return RawJSON("{" + ",".join(items) + "}")
+    if isinstance(payload, list) and len(payload) > chunk:
+        parts = (
+            json.dumps(payload[i : i + chunk], separators=(",", ":"))[1:-1]
+            for i in range(0, len(payload), chunk)
+        )
+        return RawJSON("[" + ",".join(parts) + "]")
+    return RawJSON(json.dumps(payload, separators=(",", ":")))
+
+
+class PreEncodedJSON:
+    """Module `json` pour Socket.IO (`SocketIO(json=PreEncodedJSON)`) : un argument `RawJSON` est
+    inséré tel quel dans le paquet, l'encodage ayant été fait hors de la boucle."""
+
+    @staticmethod
+    def dumps(obj: Any, **kwargs: Any) -> str:
+        if isinstance(obj, list) and any(isinstance(item, RawJSON) for item in obj):
+            parts = [
+                item if isinstance(item, RawJSON) else json.dumps(item, **kwargs) for item in obj
+            ]
+            return "[" + ",".join(parts) + "]"
+        return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(s: Any, **kwargs: Any) -> Any:
+        return json.loads(s, **kwargs)
+
+
+class _Queue:
+    __slots__ = ("jobs", "busy", "forgotten", "latency")
+
+    def __init__(self) -> None:
+        self.jobs: Deque[Tuple[Callable[[], Any], Optional[Callable[[Any], None]], bool, float]]
+        self.jobs = deque()
+        self.busy = False
+        self.forgotten = False
+        self.latency = LatencyHistogram()
+
+
+class LobbyWorkers:
+    """Travail des salons, dans l'ordre par salon ; le travail lourd des grands salons hors boucle.
+
+    `submit(lobby, work, done, heavy)` : `work()` modifie ou encode le salon, `done(résultat)` émet.
+    - Salon sans travail en attente et travail léger (ou salon sous `min_players`) : tout s'exécute
+      tout de suite, comme un appel direct.
+    - Travail lourd d'un salon d'au moins `min_players` joueurs : `work` part sur le pool
+      (`run_blocking(fn)`, p. ex. `eventlet.tpool.execute`, qui rend la main à la boucle pendant le
+      calcul) ; les travaux suivants du même salon attendent derrière lui, dans une file vidée par
+      une tâche (`spawn`). `done` s'exécute toujours dans cette tâche, donc sur la boucle, dans
+      l'ordre de soumission.
+    Le verrou d'un salon qui a du travail sur le pool n'est pas disputé par la boucle tant que tout
+    ce qui le touche passe par `submit` : échéance de la question, retrait par le balayage et
+    instantané du journal compris (`RealtimeLobbyManager(dispatch=...)`,
+    `checkpoint(capture)`) ; sinon la boucle entière attendrait ce verrou. Il doit être un vrai
+    verrou système, pas un verrou vert.
+
+    Latences soumission → `done` par salon (`LatencyHistogram`), et retard de la boucle elle-même
+    (`hub_lag`, mesuré par `probe`) : un grand salon qui calcule ne doit retarder que lui-même.
+    `min_players` <= 0 ou `run_blocking` None : rien ne quitte la boucle.
+    """
+
+    def __init__(
+        self,
+        run_blocking: Optional[Callable[[Callable[[], Any]], Any]] = None,
+        spawn: Optional[Callable[..., Any]] = None,
+        min_players: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._run_blocking = run_blocking
+        self._spawn = spawn
+        self.min_players = int(min_players) if run_blocking is not None and spawn is not None else 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queues: Dict[str, _Queue] = {}
+        self.hub_lag = LatencyHistogram()
+        self.inline = 0
+        self.offloaded = 0
+        self.failed = 0
+
+    def _offload(self, lobby: Any, heavy: bool) -> bool:
+        return heavy and self.min_players > 0 and len(lobby.players) >= self.min_players
+
+    def submit(
+        self,
+        lobby: Any,
+        work: Callable[[], Any],
+        done: Optional[Callable[[Any], None]] = None,
+        heavy: bool = False,
+        since: Optional[float] = None,
+    ) -> None:
+        """`since` : arrivée de la demande (horloge `clock`), par défaut maintenant."""
+        since = self._clock() if since is None else since
+        key = lobby.lobby_id
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = _Queue()
+            if queue.busy or self._offload(lobby, heavy):
+                queue.jobs.append((work, done, heavy, since))
+                if queue.busy:
+                    return
+                queue.busy = True
+                drain = True
+            else:
+                drain = False
+        if drain:
+            self._spawn(self._drain, lobby, queue)
+            return
+        self.inline += 1
+        self._finish(queue, work(), done, since)
+
+    def _finish(
+        self, queue: _Queue, result: Any, done: Optional[Callable[[Any], None]], since: float
+    ) -> None:
+        try:
+            if done is not None:
+                done(result)
+        finally:
+            queue.latency.record(self._clock() - since)
+
+    def _drain(self, lobby: Any, queue: _Queue) -> None:
+        while True:
+            with self._lock:
+                if not queue.jobs:
+                    queue.busy = False
+                    if queue.forgotten and self._queues.get(lobby.lobby_id) is queue:
+                        del self._queues[lobby.lobby_id]
+                    return
+                work, done, heavy, since = queue.jobs.popleft()
+            try:
+                if self._offload(lobby, heavy):
+                    self.offloaded += 1
+                    result = self._run_blocking(work)
+                else:
+                    self.inline += 1
+                    result = work()
+                self._finish(queue, result, done, since)
+            except Exception:
+                # La file continue (les travaux suivants du salon ne sont pas perdus), mais l'erreur
+                # ne passe pas inaperçue
+                self.failed += 1
+                log.exception("travail du salon %s en échec", lobby.lobby_id)
+
+    def forget(self, lobby_id: str) -> None:
+        with self._lock:
+            queue = self._queues.get(lobby_id)
+            if queue is None:
+                return
+            if queue.busy:
+                # Salon retiré depuis sa propre file : `_drain` la supprime une fois vidée
+                queue.forgotten = True
+            else:
+                del self._queues[lobby_id]
+
+    def probe(self, sleep: Callable[[float], Any], interval: float = 0.05) -> None:
+        """Tâche de fond : retard de réveil de la boucle, au-delà de `interval`, dans `hub_lag`."""
+        while True:
+            started = self._clock()
+            sleep(interval)
+            self.hub_lag.record(max(0.0, self._clock() - started - interval))
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        """Compteurs, retard de la boucle et latences des `top` salons les plus lents (p99)."""
+        with self._lock:
+            items: List[Tuple[str, LatencyHistogram]] = [
+                (k, q.latency) for k, q in self._queues.items()
+            ]
+        lobbies = sorted(
+            ((k, h.summary()) for k, h in items), key=lambda kv: kv[1]["p99_ms"], reverse=True
+        )
+        return {
+            "min_players": self.min_players,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "failed": self.failed,
+            "hub_lag": self.hub_lag.summary(),
+            "lobbies": dict(lobbies[:top]),
+        }
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class RankIndex:
+    """Liste triée (croissante) découpée en blocs, pour classer des clés comparables.
+
+    - insertion / suppression : O(log N + taille de bloc)
+    - position d'une clé : O(log N) (bisect sur les maxima des blocs + arbre de Fenwick
+      sur la taille des blocs + bisect dans le bloc)
+    - k plus grandes clés : O(k + log N)
+    """
+
+    def __init__(self, keys: Iterable[Any] = (), load: int = 512):
+        self._load = load
+        self._blocks: List[List[Any]] = []
+        self._maxes: List[Any] = []
+        self._tree: List[int] = []
+        self._len = 0
+        ordered = sorted(keys)
+        if ordered:
+            # Construction en bloc : O(N log N) une fois, au lieu de N insertions
+            self._blocks = [ordered[i : i + load] for i in range(0, len(ordered), load)]
+            self._maxes = [b[-1] for b in self._blocks]
+            self._len = len(ordered)
+            self._rebuild_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    # --- Fenwick sur la taille des blocs ---
+
+    def _rebuild_tree(self) -> None:
+        tree = [len(b) for b in self._blocks]
+        for i in range(len(tree)):
+            j = i | (i + 1)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i: int, delta: int) -> None:
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i |= i + 1
+
+    def _tree_prefix(self, i: int) -> int:
+        """Nombre de clés dans les blocs [0, i)."""
+        total = 0
+        tree = self._tree
+        i -= 1
+        while i >= 0:
+            total += tree[i]
+            i = (i & (i + 1)) - 1
+        return total
+
+    # --- Mutations ---
+
+    def add(self, key: Any) -> None:
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            self._len = 1
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            i -= 1
+        block = self._blocks[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        self._len += 1
+        if len(block) > 2 * self._load:
+            self._blocks[i : i + 1] = [block[: self._load], block[self._load :]]
+            self._maxes[i : i + 1] = [self._blocks[i][-1], self._blocks[i + 1][-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key: Any) -> None:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            raise KeyError(key)
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        if j == len(block) or block[j] != key:
+            raise KeyError(key)
+        del block[j]
+        self._len -= 1
+        if block:
+            self._maxes[i] = block[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+    def pop_smallest(self) -> Any:
+        if not self._blocks:
+            raise KeyError("index vide")
+        key = self._blocks[0][0]
+        self.remove(key)
+        return key
+
+    # --- Lectures ---
+
+    def position(self, key: Any) -> int:
+        """Nombre de clés strictement inférieures à `key`."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return self._len
+        return self._tree_prefix(i) + bisect_left(self._blocks[i], key)
+
+    def count_above(self, key: Any) -> int:
+        """Nombre de clés strictement supérieures à `key`."""
+        i = bisect_right(self._maxes, key)
+        if i == len(self._blocks):
+            return 0
+        below = self._tree_prefix(i) + bisect_right(self._blocks[i], key)
+        return self._len - below
+
+    def largest(self, k: int) -> List[Any]:
+        """Les `k` plus grandes clés, de la plus grande à la plus petite."""
+        out: List[Any] = []
+        for block in reversed(self._blocks):
+            if len(out) >= k:
+                break
+            out.extend(reversed(block[-(k - len(out)) :]))
+        return out
+
+    def __iter__(self) -> Iterator[Any]:
+        for block in self._blocks:
+            yield from block
+
+
+class RankWatchers:
+    """Positions en cache des joueurs suivis (sockets connectés), décalées à chaque amélioration.
+
+    Quand un joueur passe de la place `old` (None : nouveau venu) à la place `new`, seuls les
+    joueurs classés dans [new, old) reculent d'une place : on retrouve cette plage par bisect
+    sur les joueurs suivis triés par position, sans recalculer aucun rang.
+    Coût d'un `apply` : O(log W + joueurs touchés), W = nombre de joueurs suivis.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._sockets: Dict[str, Set[str]] = {}
+        self._names: Dict[str, str] = {}
+        self._ranks: Dict[str, int] = {}
+        self._order: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def watch(self, name: str, socket_id: str, rank: Optional[int]) -> None:
+        """Suit `name` pour `socket_id` ; `rank` (position actuelle) réinitialise le cache."""
+        with self._lock:
+            self._unwatch(socket_id)
+            self._names[socket_id] = name
+            self._sockets.setdefault(name, set()).add(socket_id)
+            self._set_rank(name, rank)
+
+    def unwatch(self, socket_id: str) -> None:
+        with self._lock:
+            self._unwatch(socket_id)
+
+    def _unwatch(self, socket_id: str) -> None:
+        name = self._names.pop(socket_id, None)
+        if name is None:
+            return
+        sockets = self._sockets[name]
+        sockets.discard(socket_id)
+        if not sockets:
+            del self._sockets[name]
+            self._set_rank(name, None)
+
+    def _set_rank(self, name: str, rank: Optional[int]) -> None:
+        old = self._ranks.pop(name, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (old, name))]
+        if rank is not None:
+            self._ranks[name] = rank
+            insort(self._order, (rank, name))
+
+    def apply(
+        self, name: str, old: Optional[int], new: int
+    ) -> List[Tuple[List[str], int, Optional[int]]]:
+        """Applique le passage de `name` de `old` à `new` ; renvoie (sockets, rang, ancien rang)
+        par joueur touché."""
+        out: List[Tuple[List[str], int, Optional[int]]] = []
+        with self._lock:
+            if name in self._sockets:
+                self._set_rank(name, None)
+            order = self._order
+            lo = bisect_left(order, (new, ""))
+            hi = len(order) if old is None else bisect_left(order, (old, ""))
+            for i in range(lo, hi):
+                rank, other = order[i]
+                # Décalage uniforme : l'ordre de la liste est préservé
+                order[i] = (rank + 1, other)
+                self._ranks[other] = rank + 1
+                out.append((list(self._sockets[other]), rank + 1, rank))
+            if name in self._sockets:
+                self._set_rank(name, new)
+                if old != new:
+                    out.append((list(self._sockets[name]), new, old))
+        return out
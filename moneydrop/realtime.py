@@ -0,0 +1,1114 @@
+from __future__ import annotations
+
+import gc
+import json
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .journal import LobbyJournal
+from .reaper import Reaper
+from .resolution import KEY_INDEX, KEYS, UNSET, PlayerRow, PlayerTable
+from .timers import DeadlineScheduler, Timer
+
+# Champs d'un joueur dans l'état diffusé (clé `sid` exclue : elle identifie le joueur dans les
+# patchs)
+PLAYER_FIELDS = ("name", "score", "eliminated", "choice", "is_correct", "socket_id")
+
+
+def server_time_ms() -> float:
+    """Horloge des échéances diffusées (monotone, en ms) ; les clients s'y recalent par
+    `clock_sync`."""
+    return time.monotonic() * 1000.0
+
+
+class RTPlayer(PlayerRow):
+    """Joueur d'un salon temps réel : identité en attributs, score, mises et drapeaux dans les
+    colonnes du salon (`PlayerTable`)."""
+
+    __slots__ = ("sid", "name", "socket_id", "ip")
+    _fields = (
+        "sid", "name", "score", "choice", "is_correct", "eliminated", "bets", "socket_id", "ip"
+    )
+
+    def __init__(
+        self,
+        sid: str,
+        name: str,
+        score: int = 10000,  # capital à miser (jetons)
+        choice: Optional[str] = None,
+        is_correct: Optional[bool] = None,
+        eliminated: bool = False,  # Défaite totale (capital=0)
+        bets: Optional[Dict[str, int]] = None,
+        socket_id: Optional[str] = None,  # SocketIO session ID
+        ip: Optional[str] = None,  # last known IP address
+        *,
+        table: Optional[PlayerTable] = None,
+    ):
+        super().__init__(table)
+        self.sid = sid
+        self.name = name
+        self.socket_id = socket_id
+        self.ip = ip
+        self.score = score
+        self.choice = choice
+        self.is_correct = is_correct
+        self.eliminated = eliminated
+        if bets:
+            self.bets = bets
+
+    @property
+    def score(self) -> int:
+        return self._table.score[self._row]
+
+    @score.setter
+    def score(self, value: int) -> None:
+        self._table.score[self._row] = value
+
+    @property
+    def eliminated(self) -> bool:
+        return self._table.eliminated[self._row] == 1
+
+    @eliminated.setter
+    def eliminated(self, value: bool) -> None:
+        self._table.eliminated[self._row] = 1 if value else 0
+
+    @property
+    def is_correct(self) -> Optional[bool]:
+        value = self._table.correct[self._row]
+        return None if value == UNSET else value == 1
+
+    @is_correct.setter
+    def is_correct(self, value: Optional[bool]) -> None:
+        self._table.correct[self._row] = UNSET if value is None else int(bool(value))
+
+    @property
+    def choice(self) -> Optional[str]:
+        value = self._table.choice[self._row]
+        return None if value == UNSET else KEYS[value]
+
+    @choice.setter
+    def choice(self, value: Optional[str]) -> None:
+        self._table.choice[self._row] = UNSET if value is None else KEY_INDEX[value]
+
+
+@dataclass
+class RealtimeLobby:
+    """Salon temps réel (autorité serveur).
+
+    Chaque méthode qui modifie l'état incrémente `version` et note les joueurs touchés.
+    `publish()` renvoie l'état complet et le patch depuis la dernière diffusion : seuls les
+    champs modifiés circulent, les clients qui détectent un trou de version redemandent l'état
+    complet (`current_state`).
+
+    Les vues joueur ne sont recalculées que pour les joueurs touchés, et `snapshot()` est
+    mémorisé par version : des envois répétés sans changement ne reconstruisent rien.
+
+    Index secondaires (socket, nom, IP → sid), tenus à jour avec `players` par chaque méthode
+    qui ajoute, renomme, rattache ou retire un joueur : recherches en O(1).
+
+    Avec un `scheduler`, l'échéance de la question est armée par `launch_question` / `resume`,
+    désarmée par `pause` / `validate` / `next_question` ; à l'échéance, `on_expire(lobby)` est
+    appelé (validation + diffusion côté serveur web). Avec `dispatch(lobby, work)`, le rappel du
+    tas passe par lui (côté web `LobbyWorkers.submit`) au lieu de prendre le verrou du salon sur
+    place : la boucle n'attend pas un travail en cours sur le pool.
+
+    L'état diffusé porte l'échéance absolue de la question (`question_deadline`, horloge
+    `server_time_ms`) plutôt qu'un temps restant : il ne change qu'aux transitions et chaque client
+    affiche le compte à rebours localement. En pause, l'échéance est None et `time_remaining` fige
+    le temps restant.
+
+    Reconnexion : les derniers patchs diffusés et événements (`record`) restent dans une fenêtre
+    bornée (`history` entrées, et pas plus de joueurs touchés que le salon n'en compte, au-delà
+    l'état complet coûte moins cher) ; `since(v, epoch)` renvoie ce qu'un client à la version `v`
+    a manqué, ou None s'il est sorti de la fenêtre. `epoch` distingue les versions de ce salon de
+    celles d'un processus précédent (salon repris du journal).
+    """
+
+    lobby_id: str
+    host_sid: str
+    host_name: str
+    max_players: int = 50
+    time_limit: int = 30
+    question_total: int = 10
+    created_at: float = field(default_factory=time.time)
+    last_activity: float = field(default_factory=time.time)  # dernier changement d'état
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    phase: str = "waiting"  # waiting|question|paused|results|finished
+    question_index: int = 0
+    question_started_at: Optional[float] = None  # time.monotonic()
+    paused_remaining: Optional[int] = None
+
+    questions: list = field(default_factory=list)
+    correct: Optional[str] = None
+    players: Dict[str, RTPlayer] = field(default_factory=dict)
+    # SIDs / IPs of players who were eliminated and must not rejoin as active players
+    banned_sids: set = field(default_factory=set)
+    banned_ips: set = field(default_factory=set)
+
+    version: int = 0
+    epoch: str = field(default_factory=lambda: secrets.token_hex(4))
+    # Dernier état diffusé : base des patchs
+    _sent: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    # Vues joueur diffusées, joueurs à recalculer (dict ordonné) et champs modifiés depuis `_sent`
+    _views: Dict[str, Dict[str, Any]] = field(default_factory=dict, repr=False)
+    _dirty: Dict[str, None] = field(default_factory=dict, repr=False)
+    _all_dirty: bool = field(default=False, repr=False)
+    _pending: Dict[str, Dict[str, Any]] = field(default_factory=dict, repr=False)
+    _removed: Dict[str, None] = field(default_factory=dict, repr=False)
+    _snap: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    # Index secondaires ; nom et IP peuvent être partagés : sids par ordre d'arrivée
+    _by_socket: Dict[str, str] = field(default_factory=dict, repr=False)
+    _by_name: Dict[str, Dict[str, None]] = field(default_factory=dict, repr=False)
+    _by_ip: Dict[str, Dict[str, None]] = field(default_factory=dict, repr=False)
+
+    scheduler: Optional[DeadlineScheduler] = field(default=None, repr=False)
+    on_expire: Optional[Callable[["RealtimeLobby"], None]] = field(default=None, repr=False)
+    dispatch: Optional[Callable[["RealtimeLobby", Callable[[], Any]], None]] = field(
+        default=None, repr=False
+    )
+    _deadline: Optional[Timer] = field(default=None, repr=False)
+    _armed: int = field(default=0, repr=False)
+
+    # Score, mises et drapeaux des joueurs, en colonnes ; `vectorize` : validation NumPy à partir
+    # de VECTOR_MIN_PLAYERS joueurs (voir `scripts/bench.py resolve`)
+    vectorize: bool = field(default=True, repr=False)
+    _table: Optional[PlayerTable] = field(default=None, repr=False)
+
+    # Annuaire des salons joignables : `on_listing(lobby_id, entrée | None)` quand l'entrée change
+    on_listing: Optional[Callable[[str, Optional[Dict[str, Any]]], None]] = field(
+        default=None, repr=False
+    )
+    _listed: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+    # Reprise après crash : `on_journal([seq, op, lobby_id, ...])` à chaque transition (voir
+    # `journal.LobbyJournal`) ; `seq` compte les lignes du salon
+    on_journal: Optional[Callable[[List[Any]], None]] = field(default=None, repr=False)
+    _journal_seq: int = field(default=0, repr=False)
+
+    # Fenêtre de reconnexion : (événement, données, poids) dans l'ordre d'émission ; poids = joueurs
+    # touchés par un patch (1 pour un événement)
+    history: int = field(default=64, repr=False)
+    _history: Deque[Tuple[str, Any, int]] = field(default_factory=deque, repr=False)
+    _history_weight: int = field(default=0, repr=False)
+
+    # Durée de la cinématique côté client avant affichage du plateau (voir web/static/cinematic.js)
+    CINEMATIC_DELAY_SECONDS = 4.5  # 4s animation + 0.5s transition
+
+    def __post_init__(self) -> None:
+        if self._table is None:
+            self._table = PlayerTable(vectorize=self.vectorize)
+
+    def add_player(
+        self, sid: str, name: str, socket_sid: str = None, ip: Optional[str] = None
+    ) -> None:
+        with self.lock:
+            if sid in self.players:
+                p = self.players[sid]
+                self._unindex(p)
+                p.name = name
+                if socket_sid:
+                    p.socket_id = socket_sid
+                if ip:
+                    p.ip = ip
+                self._index(p)
+                self._touch(sid)
+                self._log("j", sid, name, ip)
+                return
+            if len(self.players) >= self.max_players:
+                raise ValueError("Lobby plein")
+            p = self.players[sid] = RTPlayer(
+                sid=sid, name=name, score=10000, socket_id=socket_sid, ip=ip, table=self._table
+            )
+            self._index(p)
+            self._touch(sid)
+            self._relist()
+            self._log("j", sid, name, ip)
+
+    def set_socket(self, sid: str, socket_sid: Optional[str]) -> None:
+        with self.lock:
+            p = self.players.get(sid)
+            if p is None or p.socket_id == socket_sid:
+                return
+            self._unindex(p)
+            p.socket_id = socket_sid
+            self._index(p)
+            self._touch(sid)
+
+    def detach_socket(self, socket_sid: str) -> Optional[str]:
+        """Déconnexion : le joueur reste dans le salon, sans socket ; renvoie son sid."""
+        with self.lock:
+            sid = self._by_socket.get(socket_sid)
+            if sid is None:
+                return None
+            p = self.players[sid]
+            self._unindex(p)
+            p.socket_id = None
+            self._index(p)
+            self._touch(sid)
+            return sid
+
+    def remove_player(self, sid: str) -> bool:
+        with self.lock:
+            p = self.players.pop(sid, None)
+            if p is None:
+                return False
+            self._unindex(p)
+            p._detach()  # sa ligne sera réutilisée ; l'objet garde ses valeurs
+            self.version += 1
+            self.last_activity = time.time()
+            self._views.pop(sid, None)
+            self._dirty.pop(sid, None)
+            self._pending.pop(sid, None)
+            self._removed[sid] = None
+            self._relist()
+            self._log("r", sid)
+            return True
+
+    def time_remaining(self) -> Optional[int]:
+        if self.phase == "question" and self.question_started_at is not None:
+            elapsed = max(0.0, time.monotonic() - self.question_started_at)
+            return max(0, int(self.time_limit - elapsed))
+        if self.phase == "paused" and self.paused_remaining is not None:
+            return int(self.paused_remaining)
+        return None
+
+    def current_question(self) -> Optional[Dict[str, Any]]:
+        if not self.questions or self.question_index >= len(self.questions):
+            return None
+        q = self.questions[self.question_index]
+        return {
+            "category": q.category,
+            "prompt": q.prompt,
+            "answers": q.answers,
+        }
+
+    def start_game(self, questions: list) -> None:
+        with self.lock:
+            if self.phase != "waiting":
+                # idempotent: on n'écrase pas une partie en cours
+                return
+            self.questions = list(questions)[: self.question_total]
+            self.question_index = 0
+            self.correct = None
+            self.question_started_at = None
+            self.paused_remaining = None
+            # Reset jetons, statut éliminé, choix et mises : colonnes remplacées en bloc
+            self._table.reset(10000)
+            # Le host déclenche explicitement le lancement de question
+            self.phase = "waiting"
+            self._touch(everyone=True)
+            self._relist()
+            self._log("s", self.questions)
+
+    def launch_question(self) -> None:
+        with self.lock:
+            if self.phase not in ("waiting", "results"):
+                return
+            self._touch(everyone=True)
+            if self.question_index >= len(self.questions):
+                self.phase = "finished"
+                self._relist()
+                self._log("l", self.phase, None)
+                return
+            self.correct = None
+            # Choix, verdicts et mises effacés en bloc (les éliminés n'ont déjà plus de mise)
+            self._table.new_round()
+            self.phase = "question"
+            # Le chrono démarre après la cinématique (plateau visible)
+            self.question_started_at = time.monotonic() + self.CINEMATIC_DELAY_SECONDS
+            self.paused_remaining = None
+            self._arm()
+            self._relist()
+            self._log("l", self.phase, self._wall_started())
+
+    def pause(self) -> None:
+        with self.lock:
+            if self.phase != "question":
+                return
+            self.paused_remaining = self.time_remaining()
+            self.phase = "paused"
+            self._disarm()
+            self._touch()
+            self._log("p", self.paused_remaining)
+
+    def resume(self) -> None:
+        with self.lock:
+            if self.phase != "paused":
+                return
+            remaining = int(self.paused_remaining or 0)
+            self.question_started_at = time.monotonic() - (self.time_limit - remaining)
+            self.paused_remaining = None
+            self.phase = "question"
+            self._arm()
+            self._touch()
+            self._log("u", self._wall_started())
+
+    def answer(self, sid: str, choice: str) -> None:
+        with self.lock:
+            if self.phase != "question":
+                return
+            if sid not in self.players:
+                return
+            c = (choice or "").strip().upper()[:1]
+            if c not in ("A", "B", "C", "D"):
+                return
+            self.players[sid].choice = c
+            self._touch(sid)
+
+    def place_bets(self, sid: str, bets: Dict[str, int]) -> None:
+        """Place les mises d'un joueur"""
+        with self.lock:
+            if self.phase != "question":
+                return
+            if sid not in self.players:
+                return
+            p = self.players[sid]
+            # Valider les mises jetons (entiers positifs : une mise négative gonflerait les autres)
+            try:
+                placed = {k: int(bets.get(k, 0)) for k in ["A", "B", "C", "D"]}
+            except (TypeError, ValueError):
+                return  # Mise invalide
+            total_bet = sum(placed.values())
+            if total_bet > p.score or min(placed.values()) < 0:
+                return  # Mise invalide
+
+            p.bets = placed
+            # Les mises ne font pas partie de l'état diffusé : aucune vue joueur à recalculer
+            self._touch()
+
+    def all_players_bet(self) -> bool:
+        """Vérifie si tous les joueurs ont misé"""
+        with self.lock:
+            if self.phase != "question":
+                return False
+            # Au moins un joueur et tous ont misé (toutes les mises à 0 : le joueur n'a pas misé)
+            return self._table.all_bet()
+
+    def validate(self) -> None:
+        with self.lock:
+            if self.phase not in ("question", "paused"):
+                return
+            self._disarm()
+            self._touch(everyone=True)
+            if self.question_index >= len(self.questions):
+                self.phase = "finished"
+                self._log("v", self.phase, None, [])
+                return
+            q = self.questions[self.question_index]
+            self.correct = q.correct
+
+            # Chaque joueur actif garde UNIQUEMENT sa mise correcte (les jetons non misés sont
+            # perdus ; sans mise, il perd tout) ; capital = 0 → défaite totale. Colonnes mises à
+            # jour en place, en une passe NumPy au-delà de VECTOR_MIN_PLAYERS joueurs
+            owners = self._table.owners
+            out = [owners[row] for row in self._table.resolve_all_or_nothing(self.correct)]
+            # Prevent the eliminated player from re-joining as an active player (ban sid and ip if
+            # available)
+            self.banned_sids.update(p.sid for p in out if p.sid)
+            self.banned_ips.update(p.ip for p in out if p.ip)
+
+            self.phase = "results"
+            if self.on_journal is not None:
+                # Scores des joueurs restés en jeu et des nouveaux éliminés (0)
+                gone = {p.sid for p in out}
+                scores = [
+                    [sid, p.score]
+                    for sid, p in self.players.items()
+                    if not p.eliminated or sid in gone
+                ]
+                self._log("v", self.phase, self.correct, scores)
+
+    def next_question(self) -> None:
+        with self.lock:
+            if self.phase != "results":
+                return
+            self._disarm()
+            self._touch(everyone=True)
+            self.question_index += 1
+            if self.question_index >= len(self.questions):
+                self.phase = "finished"
+                self._log("n", self.phase, self.question_index)
+                return
+            self.correct = None
+            self.question_started_at = None
+            self.paused_remaining = None
+            # Choix, verdicts et mises effacés en bloc (les éliminés n'ont déjà plus de mise)
+            self._table.new_round()
+            self.phase = "waiting"
+            self._relist()
+            self._log("n", self.phase, self.question_index)
+
+    # --- Échéance de la question ---
+
+    def deadline(self) -> Optional[float]:
+        """Fin de la question en cours (time.monotonic()), None hors phase « question »."""
+        if self.phase != "question" or self.question_started_at is None:
+            return None
+        return self.question_started_at + self.time_limit
+
+    def _arm(self) -> None:
+        # Appelé sous self.lock
+        self._disarm()
+        deadline = self.deadline()
+        if self.scheduler is None or self.on_expire is None or deadline is None:
+            return
+        self._armed += 1
+        self._deadline = self.scheduler.call_later(
+            deadline - time.monotonic(), self._due, self._armed
+        )
+
+    def _disarm(self) -> None:
+        # Appelé sous self.lock
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+
+    def _due(self, armed: int) -> None:
+        # Rappel du tas de minuteries
+        if self.dispatch is None:
+            self._expire(armed)
+        else:
+            self.dispatch(self, lambda: self._expire(armed))
+
+    def _expire(self, armed: int) -> None:
+        with self.lock:
+            # Échéance remplacée (pause/reprise) entre son déclenchement et ce rappel
+            if armed != self._armed or self._deadline is None or self.phase != "question":
+                return
+            self._deadline = None
+        self.on_expire(self)
+
+    # --- Reprise après crash ---
+
+    def _log(self, op: str, *args: Any) -> None:
+        # Appelé sous self.lock, après la transition
+        if self.on_journal is not None:
+            self._journal_seq += 1
+            self.on_journal([self._journal_seq, op, self.lobby_id, *args])
+
+    def _wall_started(self) -> Optional[float]:
+        # Début du chrono en heure murale : l'horloge monotone ne survit pas à un redémarrage
+        if self.question_started_at is None:
+            return None
+        return round(time.time() + (self.question_started_at - time.monotonic()), 3)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """État durable du salon (instantané de `LobbyJournal`) : ni sockets, ni mises, ni choix."""
+        with self.lock:
+            return {
+                "seq": self._journal_seq,
+                "lobby_id": self.lobby_id,
+                "host_sid": self.host_sid,
+                "host_name": self.host_name,
+                "max_players": self.max_players,
+                "time_limit": self.time_limit,
+                "question_total": self.question_total,
+                "created_at": self.created_at,
+                "phase": self.phase,
+                "question_index": self.question_index,
+                "questions": list(self.questions),
+                "correct": self.correct,
+                "started": self._wall_started() if self.phase == "question" else None,
+                "paused": self.paused_remaining,
+                "players": {
+                    sid: [p.name, p.ip, p.score, int(p.eliminated)]
+                    for sid, p in self.players.items()
+                },
+                "banned_sids": list(self.banned_sids),
+                "banned_ips": list(self.banned_ips),
+            }
+
+    def _restore(self, state: Dict[str, Any], questions: list) -> None:
+        # Appelé sous self.lock, sur un salon neuf : état durable rejoué par `LobbyJournal.load`
+        self._journal_seq = state["seq"]
+        self.phase = state["phase"]
+        self.question_index = state["question_index"]
+        self.questions = questions
+        self.correct = state["correct"]
+        self.paused_remaining = state["paused"]
+        started = state["started"]
+        if self.phase == "question" and started is not None:
+            self.question_started_at = time.monotonic() - (time.time() - started)
+        # Vues créées sans `__init__` et colonnes remplies en bloc : pas de ligne ajoutée par joueur
+        restored = []
+        for sid, (name, ip, _, _) in state["players"].items():
+            p = self.players[sid] = RTPlayer.__new__(RTPlayer)
+            p.sid, p.name, p.socket_id, p.ip = sid, name, None, ip
+            restored.append(p)
+        rows = state["players"].values()
+        self._table.extend(restored, [r[2] for r in rows], [r[3] for r in rows])
+        for p in restored:
+            self._index(p)
+        self.banned_sids.update(state["banned_sids"])
+        self.banned_ips.update(state["banned_ips"])
+        self._touch(everyone=True)
+        self._relist()
+        # Question en cours : échéance réarmée (échue pendant l'arrêt : validée tout de suite)
+        self._arm()
+
+    # --- Annuaire ---
+
+    def _relist(self) -> None:
+        # Appelé sous self.lock (ordre des verrous : salon puis gestionnaire), après un changement
+        # de phase ou de nombre de joueurs ; ne prévient le gestionnaire que si l'entrée a changé
+        if self.phase == "waiting" and len(self.players) < self.max_players:
+            entry: Optional[Dict[str, Any]] = {
+                "lobby_id": self.lobby_id,
+                "host_name": self.host_name,
+                "players": len(self.players),
+                "max_players": self.max_players,
+                "time_limit": self.time_limit,
+                "question_total": self.question_total,
+            }
+        else:
+            entry = None
+        if entry == self._listed:
+            return
+        self._listed = entry
+        if self.on_listing is not None:
+            self.on_listing(self.lobby_id, entry)
+
+    # --- Index secondaires ---
+
+    def _index(self, p: RTPlayer) -> None:
+        # Appelé sous self.lock
+        if p.socket_id:
+            other = self._by_socket.get(p.socket_id)
+            if other is not None and other != p.sid:
+                # Socket repris par un autre joueur : l'ancien propriétaire le perd
+                self.players[other].socket_id = None
+                self._touch(other)
+            self._by_socket[p.socket_id] = p.sid
+        if p.name:
+            self._by_name.setdefault(p.name, {})[p.sid] = None
+        if p.ip:
+            self._by_ip.setdefault(p.ip, {})[p.sid] = None
+
+    def _unindex(self, p: RTPlayer) -> None:
+        # Appelé sous self.lock
+        if p.socket_id and self._by_socket.get(p.socket_id) == p.sid:
+            del self._by_socket[p.socket_id]
+        for index, key in ((self._by_name, p.name), (self._by_ip, p.ip)):
+            sids = index.get(key) if key else None
+            if sids is not None:
+                sids.pop(p.sid, None)
+                if not sids:
+                    del index[key]
+
+    def player_by_socket(self, socket_sid: str) -> Optional[str]:
+        with self.lock:
+            return self._by_socket.get(socket_sid)
+
+    def player_by_name(self, name: str) -> Optional[str]:
+        """Sid du premier joueur arrivé sous ce nom."""
+        with self.lock:
+            sids = self._by_name.get(name)
+            return next(iter(sids)) if sids else None
+
+    def players_by_ip(self, ip: str) -> List[str]:
+        with self.lock:
+            return list(self._by_ip.get(ip, ()))
+
+    def is_banned(self, sid: Optional[str], ip: Optional[str]) -> bool:
+        return (sid is not None and sid in self.banned_sids) or (
+            ip is not None and ip in self.banned_ips
+        )
+
+    def _check_indexes(self) -> List[str]:
+        """Écarts entre les index et `players` (liste vide si tout est cohérent)."""
+        errors: List[str] = []
+        with self.lock:
+            by_socket = {p.socket_id: sid for sid, p in self.players.items() if p.socket_id}
+            if by_socket != self._by_socket:
+                errors.append(f"socket: {self._by_socket} != {by_socket}")
+            if len(by_socket) != sum(1 for p in self.players.values() if p.socket_id):
+                errors.append("socket partagé par deux joueurs")
+            for attr, index in (("name", self._by_name), ("ip", self._by_ip)):
+                expected: Dict[str, set] = {}
+                for sid, p in self.players.items():
+                    key = getattr(p, attr)
+                    if key:
+                        expected.setdefault(key, set()).add(sid)
+                actual = {k: set(v) for k, v in index.items()}
+                if actual != expected:
+                    errors.append(f"{attr}: {actual} != {expected}")
+        return errors
+
+    # --- État diffusé ---
+
+    def _touch(self, sid: Optional[str] = None, everyone: bool = False) -> None:
+        # Appelé sous self.lock : nouvelle version, vues à recalculer
+        self.version += 1
+        self.last_activity = time.time()
+        if everyone:
+            self._all_dirty = True
+        elif sid is not None:
+            self._dirty[sid] = None
+
+    def _view(self, p: RTPlayer) -> Dict[str, Any]:
+        return {
+            "sid": p.sid,
+            "name": p.name,
+            "score": p.score,
+            "eliminated": p.eliminated,
+            "choice": p.choice,
+            "is_correct": p.is_correct if self.phase == "results" else None,
+            "socket_id": p.socket_id,
+        }
+
+    def _refresh(self) -> None:
+        # Recalcule les vues des joueurs touchés et cumule leurs champs modifiés pour le prochain
+        # patch. Une vue n'est jamais modifiée en place : les états déjà diffusés restent intacts.
+        if self._all_dirty:
+            sids = list(self.players)
+            self._all_dirty = False
+        elif self._dirty:
+            sids = list(self._dirty)
+        else:
+            return
+        self._dirty.clear()
+        for sid in sids:
+            p = self.players.get(sid)
+            if p is None:
+                continue
+            view = self._view(p)
+            old = self._views.get(sid)
+            if old is None:
+                self._pending[sid] = {k: view[k] for k in PLAYER_FIELDS}
+            else:
+                diff = {k: view[k] for k in PLAYER_FIELDS if old[k] != view[k]}
+                if not diff:
+                    continue
+                self._pending.setdefault(sid, {}).update(diff)
+            self._views[sid] = view
+
+    def _snapshot(self) -> Dict[str, Any]:
+        # Appelé sous self.lock
+        snap = self._snap
+        if snap is None or snap["v"] != self.version:
+            self._refresh()
+            deadline = self.deadline()
+            snap = {
+                "v": self.version,
+                "epoch": self.epoch,
+                "lobby_id": self.lobby_id,
+                "phase": self.phase,
+                "time_limit": self.time_limit,
+                # Échéance absolue (ms, horloge serveur) : le chrono ne change pas l'état
+                "question_deadline": round(deadline * 1000.0) if deadline is not None else None,
+                # Temps restant figé, seulement en pause
+                "time_remaining": self.time_remaining() if self.phase == "paused" else None,
+                "question_index": self.question_index,
+                "question_total": len(self.questions) if self.questions else self.question_total,
+                "question": (
+                    self.current_question()
+                    if self.phase in ("question", "paused", "results")
+                    else None
+                ),
+                "correct": self.correct if self.phase == "results" else None,
+                "host_sid": self.host_sid,
+                "host_name": self.host_name,
+                "players": list(self._views.values()),
+            }
+        self._snap = snap
+        return snap
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État complet (partagé, mémorisé par version : ne pas modifier)."""
+        with self.lock:
+            return self._snapshot()
+
+    def _rebase(
+        self,
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any], Dict[str, Dict[str, Any]], List[str]]:
+        # Appelé sous self.lock : l'état courant devient la base des prochains patchs
+        prev = self._sent
+        state = self._sent = self._snapshot()
+        players, self._pending = self._pending, {}
+        removed, self._removed = list(self._removed), {}
+        return prev, state, players, removed
+
+    def current_state(self) -> Dict[str, Any]:
+        """Dernier état diffusé (celui sur lequel s'appliquera le prochain patch)."""
+        with self.lock:
+            if self._sent is None:
+                self._rebase()
+            return self._sent
+
+    def publish(self) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Nouvel état de référence et patch depuis la diffusion précédente.
+
+        patch None : rien n'a encore été diffusé, envoyer l'état complet ;
+        patch {} : version inchangée, rien à envoyer.
+        """
+        with self.lock:
+            if self._sent is not None and self._sent["v"] == self.version:
+                return self._sent, {}
+            prev, state, players, removed = self._rebase()
+        if prev is None:
+            return state, None
+        # Patch en O(joueurs touchés) : champs de tête modifiés, champs joueur cumulés, joueurs
+        # partis
+        patch: Dict[str, Any] = {"v": state["v"], "base": prev["v"]}
+        changed = {k: v for k, v in state.items() if k not in ("v", "players") and prev[k] != v}
+        if changed:
+            patch["set"] = changed
+        if players:
+            patch["players"] = players
+        if removed:
+            patch["removed"] = removed
+        with self.lock:
+            self._remember("state_delta", patch, 1 + len(players) + len(removed))
+        return state, patch
+
+    # --- Fenêtre de reconnexion ---
+
+    def record(self, event: str, payload: Any) -> None:
+        """Note un événement diffusé au salon (`new_question`, `reveal_answer`…) pour les
+        clients qui se reconnectent."""
+        with self.lock:
+            self._remember(event, payload, 1)
+
+    def _remember(self, event: str, payload: Any, weight: int) -> None:
+        # Appelé sous self.lock ; la dernière entrée reste, quel que soit son poids
+        history = self._history
+        history.append((event, payload, weight))
+        self._history_weight += weight
+        budget = len(self.players) + self.history
+        while len(history) > 1 and (len(history) > self.history or self._history_weight > budget):
+            self._history_weight -= history.popleft()[2]
+
+    def since(self, version: int, epoch: Optional[str]) -> Optional[List[Tuple[str, Any]]]:
+        """Patchs et événements diffusés après la version `version` (dans l'ordre d'émission), ou
+        None si elle est hors de la fenêtre : le client doit recevoir l'état complet.
+
+        Un événement émis à la version même du client n'est pas rejoué (il peut l'avoir reçu)."""
+        with self.lock:
+            if epoch != self.epoch or self._sent is None:
+                return None
+            if version == self._sent["v"]:
+                return []
+            missed: Optional[List[Tuple[str, Any]]] = None
+            for event, payload, _ in self._history:
+                if missed is not None:
+                    missed.append((event, payload))
+                elif event == "state_delta" and payload["base"] == version:
+                    missed = [(event, payload)]
+            return missed
+
+
+class RealtimeLobbyManager:
+    """Salons temps réel, et annuaire des salons joignables (phase « waiting », pas pleins).
+
+    L'annuaire est tenu à jour par les salons eux-mêmes (`RealtimeLobby._relist`) à chaque
+    changement de phase ou de nombre de joueurs ; `joinable()` renvoie un corps JSON mémorisé
+    par version, avec son ETag : lister ne parcourt pas les salons.
+
+    `reaper` retire les salons inactifs (durée par phase) et évince les parties terminées
+    au-delà de `max_live` ; `on_remove(lobby)` est appelé pour chaque salon retiré.
+
+    `max_players` plafonne la taille demandée à la création ; `lock_factory` fournit le verrou de
+    chaque salon (un vrai verrou système si le salon est travaillé hors de la boucle, voir
+    `LobbyWorkers`). `owns(lobby_id)` (plusieurs processus, voir `cluster.Cluster`) : seuls les
+    identifiants qui reviennent à ce processus sont attribués.
+
+    Avec un `journal` (`LobbyJournal`), chaque salon y note ses transitions ; `recover()`
+    reconstruit les salons au démarrage et `checkpoint()` écrit un instantané (compaction).
+    `history` : taille de la fenêtre de reconnexion de chaque salon (`RealtimeLobby.since`).
+
+    `dispatch(lobby, work)` (côté web `LobbyWorkers.submit`) : échéances des questions et retraits
+    passent par lui plutôt que de prendre le verrou du salon depuis le tas de minuteries ou le
+    balayage ; sans, appel direct.
+    """
+
+    def __init__(
+        self,
+        scheduler: Optional[DeadlineScheduler] = None,
+        on_expire: Optional[Callable[[RealtimeLobby], None]] = None,
+        ttls: Optional[Dict[str, float]] = None,
+        max_live: int = 0,
+        on_remove: Optional[Callable[[RealtimeLobby], None]] = None,
+        max_players: int = 50,
+        lock_factory: Callable[[], Any] = threading.Lock,
+        owns: Optional[Callable[[str], bool]] = None,
+        journal: Optional[LobbyJournal] = None,
+        history: int = 64,
+        dispatch: Optional[Callable[[RealtimeLobby, Callable[[], Any]], None]] = None,
+    ):
+        self._lock = threading.Lock()
+        self._dispatch = dispatch
+        self._owns = owns
+        self._journal = journal
+        self._lobbies: Dict[str, RealtimeLobby] = {}
+        self.max_players = max(2, int(max_players))
+        self._lock_factory = lock_factory
+        self.history = max(1, int(history))
+        self._scheduler = scheduler
+        self._on_expire = on_expire
+        self._on_remove = on_remove
+        self.reaper = Reaper(lambda lobby: lobby.phase, self._remove, ttls, max_live)
+        self._joinable: Dict[str, Dict[str, Any]] = {}
+        self._epoch = secrets.token_hex(4)
+        self._listing_version = 0
+        self._listing: Optional[Tuple[int, str]] = None
+
+    def create(
+        self, host_sid: str, host_name: str, max_players: int, time_limit: int
+    ) -> RealtimeLobby:
+        self.reaper.admit()  # CapacityError si le plafond est atteint
+        lobby_id = secrets.token_urlsafe(8)
+        while self._owns is not None and not self._owns(lobby_id):
+            lobby_id = secrets.token_urlsafe(8)
+        lobby = RealtimeLobby(
+            lobby_id=lobby_id,
+            host_sid=host_sid,
+            host_name=host_name,
+            max_players=max(2, min(int(max_players), self.max_players)),
+            time_limit=max(5, min(int(time_limit), 120)),
+            question_total=10,
+            scheduler=self._scheduler,
+            on_expire=self._on_expire,
+            dispatch=self._dispatch,
+            on_listing=self._on_listing,
+            lock=self._lock_factory(),
+            on_journal=self._journal.append if self._journal is not None else None,
+            history=self.history,
+        )
+        # Ne pas ajouter automatiquement le host comme joueur
+        # lobby.add_player(host_sid, host_name)
+        with self._lock:
+            self._lobbies[lobby_id] = lobby
+        with lobby.lock:
+            lobby._log(
+                "c", host_sid, host_name, lobby.max_players, lobby.time_limit, lobby.question_total,
+                lobby.created_at,
+            )
+            lobby._relist()
+        self.reaper.add(lobby_id, lobby)
+        return lobby
+
+    def recover(self) -> int:
+        """Reconstruit les salons du journal (redémarrage) ; renvoie leur nombre."""
+        if self._journal is None:
+            return 0
+        # Des centaines de milliers d'objets, tous vivants : le ramasse-miettes, qui les
+        # parcourrait à chaque génération pleine, doublerait la durée de la reprise
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._recover()
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _recover(self) -> int:
+        states = self._journal.load()
+        for lobby_id, state in states.items():
+            lobby = RealtimeLobby(
+                lobby_id=lobby_id,
+                host_sid=state["host_sid"],
+                host_name=state["host_name"],
+                max_players=state["max_players"],
+                time_limit=state["time_limit"],
+                question_total=state["question_total"],
+                created_at=state["created_at"],
+                scheduler=self._scheduler,
+                on_expire=self._on_expire,
+                dispatch=self._dispatch,
+                on_listing=self._on_listing,
+                lock=self._lock_factory(),
+                on_journal=self._journal.append,
+                history=self.history,
+            )
+            with self._lock:
+                self._lobbies[lobby_id] = lobby
+            with lobby.lock:
+                lobby._restore(state, self._journal.questions(state))
+            self.reaper.add(lobby_id, lobby)
+        return len(states)
+
+    def checkpoint(
+        self, capture: Optional[Callable[[RealtimeLobby], Dict[str, Any]]] = None
+    ) -> bool:
+        """Instantané des salons dans le journal, s'il a changé depuis le précédent.
+
+        `capture(lobby)` : état d'un salon, par défaut `lobby.checkpoint()` (qui prend son verrou
+        sur place ; côté web, pris dans l'ordre du salon par une tâche qui l'attend)."""
+        if self._journal is None:
+            return False
+        return self._journal.compact(lambda: list(self.all().values()), capture)
+
+    def get(self, lobby_id: str) -> Optional[RealtimeLobby]:
+        with self._lock:
+            return self._lobbies.get(lobby_id)
+
+    def all(self) -> Dict[str, RealtimeLobby]:
+        with self._lock:
+            return dict(self._lobbies)
+
+    def delete(self, lobby_id: str) -> Optional[RealtimeLobby]:
+        lobby = self.get(lobby_id)
+        if lobby is not None:
+            self.reaper.discard(lobby_id)
+            self._remove(lobby_id, lobby)
+        return lobby
+
+    def _remove(self, lobby_id: str, lobby: RealtimeLobby) -> None:
+        if self._dispatch is None:
+            self._reap(lobby_id, lobby)
+        else:
+            self._dispatch(lobby, lambda: self._reap(lobby_id, lobby))
+
+    def _reap(self, lobby_id: str, lobby: RealtimeLobby) -> None:
+        # Verrou du salon d'abord (même ordre que `_relist`) : plus d'échéance ni d'entrée
+        # d'annuaire
+        with lobby.lock:
+            lobby._disarm()
+            lobby.on_listing = None
+            lobby._log("x")
+            lobby.on_journal = None
+            with self._lock:
+                if self._lobbies.get(lobby_id) is not lobby:
+                    return
+                del self._lobbies[lobby_id]
+                if self._joinable.pop(lobby_id, None) is not None:
+                    self._listing_version += 1
+        if self._on_remove is not None:
+            self._on_remove(lobby)
+
+    def _on_listing(self, lobby_id: str, entry: Optional[Dict[str, Any]]) -> None:
+        # Appelé sous le verrou du salon
+        with self._lock:
+            if entry is None:
+                if self._joinable.pop(lobby_id, None) is None:
+                    return
+            else:
+                self._joinable[lobby_id] = entry
+            self._listing_version += 1
+
+    def listing_etag(self) -> str:
+        with self._lock:
+            return f"{self._epoch}-{self._listing_version}"
+
+    def joinable(self) -> Tuple[str, str]:
+        """(ETag, corps JSON) de l'annuaire, reconstruit seulement quand sa version a changé."""
+        with self._lock:
+            version = self._listing_version
+            if self._listing is not None and self._listing[0] == version:
+                return f"{self._epoch}-{version}", self._listing[1]
+            # Entrées jamais modifiées en place : la copie de la liste suffit, sérialisation hors
+            # verrou
+            entries = list(self._joinable.values())
+        body = json.dumps({"ok": True, "lobbies": entries}, ensure_ascii=False)
+        with self._lock:
+            if self._listing is None or self._listing[0] < version:
+                self._listing = (version, body)
+        return f"{self._epoch}-{version}", body
+
+
+class BroadcastScheduler:
+    """Regroupe les diffusions d'état d'un salon : au plus `rate` envois par seconde et par salon.
+
+    - `mark(lobby)` : changement fréquent (mises, réponses). Envoi immédiat si le dernier date
+      d'au moins 1/`rate` s, sinon le salon est marqué « sale » et `tick()` l'enverra plus tard.
+    - `now(lobby)` : action de l'hôte (révélation, question suivante, exclusion…). Envoi immédiat,
+      qui absorbe l'envoi en attente.
+    - Avec un `scheduler` (`DeadlineScheduler`, même horloge), l'envoi différé d'un salon sale
+      est une échéance posée quand il le devient : aucun réveil sans salon sale. Sans, `tick()`
+      est appelé toutes les `period` secondes par une tâche de fond.
+    `rate` <= 0 : aucun regroupement, chaque `mark` envoie tout de suite.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[..., Any],
+        rate: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        scheduler: Optional[DeadlineScheduler] = None,
+    ):
+        self._flush = flush
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._clock = clock
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._dirty: Dict[str, RealtimeLobby] = {}
+        self._last: Dict[str, float] = {}
+        self._timers: Dict[str, Timer] = {}
+        self.flushes = 0
+        self.coalesced = 0
+
+    @property
+    def period(self) -> float:
+        # Demi-intervalle : un salon sale attend au plus 1,5 intervalle
+        return self._interval / 2 if self._interval else 0.5
+
+    def mark(self, lobby: RealtimeLobby) -> None:
+        now = self._clock()
+        with self._lock:
+            lobby_id = lobby.lobby_id
+            if lobby_id in self._dirty:
+                self.coalesced += 1
+                return
+            last = self._last.get(lobby_id, float("-inf"))
+            if now - last < self._interval:
+                self._dirty[lobby_id] = lobby
+                if self._scheduler is not None:
+                    self._timers[lobby_id] = self._scheduler.call_at(
+                        last + self._interval, self._due, lobby_id
+                    )
+                return
+            self._last[lobby_id] = now
+            self.flushes += 1
+        self._flush(lobby)
+
+    def now(self, lobby: RealtimeLobby, skip_sid: Optional[str] = None) -> Any:
+        with self._lock:
+            self._dirty.pop(lobby.lobby_id, None)
+            self._cancel(lobby.lobby_id)
+            self._last[lobby.lobby_id] = self._clock()
+            self.flushes += 1
+        return self._flush(lobby, skip_sid)
+
+    def _cancel(self, lobby_id: str) -> None:
+        # Appelé sous self._lock
+        timer = self._timers.pop(lobby_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _due(self, lobby_id: str) -> None:
+        # Échéance d'un salon sale (`scheduler`) : envoi, sauf si `now` l'a déjà absorbé
+        with self._lock:
+            self._timers.pop(lobby_id, None)
+            lobby = self._dirty.pop(lobby_id, None)
+            if lobby is None:
+                return
+            self._last[lobby_id] = self._clock()
+            self.flushes += 1
+        self._flush(lobby)
+
+    def tick(self) -> int:
+        """Envoie les salons sales dont l'intervalle est écoulé ; renvoie leur nombre."""
+        now = self._clock()
+        due: List[RealtimeLobby] = []
+        with self._lock:
+            for lobby_id, lobby in list(self._dirty.items()):
+                if now - self._last.get(lobby_id, float("-inf")) >= self._interval:
+                    del self._dirty[lobby_id]
+                    self._cancel(lobby_id)
+                    self._last[lobby_id] = now
+                    due.append(lobby)
+            self.flushes += len(due)
+        for lobby in due:
+            self._flush(lobby)
+        return len(due)
+
+    def forget(self, lobby_id: str) -> None:
+        with self._lock:
+            self._dirty.pop(lobby_id, None)
+            self._last.pop(lobby_id, None)
+            self._cancel(lobby_id)
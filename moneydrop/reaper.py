@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .timers import DeadlineScheduler
+
+# Durée de vie sans activité (secondes) selon la phase de l'objet (session, salon)
+DEFAULT_TTLS: Dict[str, float] = {
+    "waiting": 3600.0,
+    "playing": 3600.0,
+    "question": 3600.0,
+    "paused": 3600.0,
+    "results": 3600.0,
+    "finished": 600.0,
+}
+
+
+class CapacityError(RuntimeError):
+    """Plafond d'objets vivants atteint sans partie terminée à évincer."""
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """`"finished=300,waiting=900"` → durées par phase, complétées par `DEFAULT_TTLS`."""
+    ttls = dict(DEFAULT_TTLS)
+    for item in (spec or "").split(","):
+        phase, sep, seconds = item.partition("=")
+        if not sep:
+            continue
+        try:
+            ttls[phase.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return ttls
+
+
+class Reaper:
+    """Expiration des objets vivants d'un gestionnaire (sessions, salons).
+
+    - Tas d'échéances `last_activity + ttl[phase]`, une entrée par objet : un balayage ne
+      regarde que les échéances passées. L'activité ne touche pas le tas : à son passage, une
+      entrée dont l'objet a servi entre-temps est replacée à sa vraie échéance, jamais à plus de
+      la plus courte durée : un changement de phase (qui compte comme une activité) vers une
+      durée plus courte est ainsi pris en compte à temps.
+    - Plafond `max_live` : `admit()` avant chaque création évince les parties terminées (ou
+      échues) les moins récemment actives (avec 10 % de marge), lues sur un second tas
+      `(last_activity, …)` remis à jour à son passage comme le premier. Une partie en cours
+      n'est jamais évincée : sans place, `admit` lève `CapacityError` et la création est
+      refusée.
+    `remove(key, obj)` est appelé hors verrou pour chaque objet expiré ou évincé.
+    """
+
+    def __init__(
+        self,
+        phase_of: Callable[[Any], str],
+        remove: Callable[[str, Any], None],
+        ttls: Optional[Dict[str, float]] = None,
+        max_live: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._phase_of = phase_of
+        self._remove = remove
+        self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._min_ttl = min(self._ttls.values(), default=DEFAULT_TTLS["finished"])
+        self.max_live = int(max_live)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._idle: List[Tuple[float, int, str]] = []
+        self._live: Dict[str, Tuple[Any, int]] = {}
+        self._seq = itertools.count()
+        self._retry_at = float("-inf")
+        self.expired = 0
+        self.evicted = 0
+        self.refused = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def _due(self, obj: Any) -> float:
+        return obj.last_activity + self._ttls.get(self._phase_of(obj), DEFAULT_TTLS["playing"])
+
+    def _next(self, obj: Any, now: float) -> float:
+        # Prochain passage : l'échéance, ou plus tôt si la phase peut encore raccourcir la durée
+        return min(self._due(obj), now + self._min_ttl)
+
+    def add(self, key: str, obj: Any) -> None:
+        with self._lock:
+            gen = next(self._seq)
+            self._live[key] = (obj, gen)
+            heapq.heappush(self._heap, (self._next(obj, self._clock()), gen, key))
+            heapq.heappush(self._idle, (obj.last_activity, gen, key))
+            victims = self._over_cap()
+        self._drop(victims)
+
+    def discard(self, key: str) -> None:
+        # L'entrée du tas est ignorée à son passage
+        with self._lock:
+            self._live.pop(key, None)
+
+    def admit(self) -> None:
+        """Place pour un objet de plus, avant sa création : évince au besoin des parties terminées
+        (ou échues) ; lève `CapacityError` si le plafond reste atteint. Une partie en cours n'est
+        jamais évincée : la création est refusée à sa place."""
+        if self.max_live <= 0:
+            return
+        with self._lock:
+            victims = self._over_cap(1)
+            full = len(self._live) >= self.max_live
+            if full:
+                self.refused += 1
+        self._drop(victims)
+        if full:
+            raise CapacityError(f"plafond de {self.max_live} objets vivants atteint")
+
+    def _over_cap(self, incoming: int = 0) -> List[Tuple[str, Any]]:
+        # Appelé sous self._lock
+        excess = len(self._live) + incoming - self.max_live
+        if self.max_live <= 0 or excess <= 0:
+            return []
+        now = self._clock()
+        if now < self._retry_at:
+            return []  # parcours récent sans rien à évincer : pas de nouveau parcours complet
+        # Marge : l'éviction n'est pas refaite à chaque création
+        count = excess + self.max_live // 10
+        idle = self._idle
+        victims: List[Tuple[str, Any]] = []
+        spared: List[Tuple[float, int, str]] = []
+        while idle and len(victims) < count:
+            seen, gen, key = heapq.heappop(idle)
+            entry = self._live.get(key)
+            if entry is None or entry[1] != gen:
+                continue  # objet déjà retiré (ou remplacé)
+            obj = entry[0]
+            if obj.last_activity != seen:
+                # Actif depuis son entrée : replacé à sa vraie ancienneté
+                heapq.heappush(idle, (obj.last_activity, gen, key))
+                continue
+            if self._phase_of(obj) != "finished" and self._due(obj) > now:
+                spared.append((seen, gen, key))
+                continue
+            del self._live[key]
+            victims.append((key, obj))
+        for item in spared:
+            heapq.heappush(idle, item)
+        if len(victims) < excess:
+            # Tout le reste est en cours : au plus un parcours complet par seconde
+            self._retry_at = now + 1.0
+        self.evicted += len(victims)
+        return victims
+
+    def sweep(self) -> int:
+        """Retire les objets expirés ; renvoie leur nombre."""
+        now = self._clock()
+        victims: List[Tuple[str, Any]] = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                _, gen, key = heapq.heappop(heap)
+                entry = self._live.get(key)
+                if entry is None or entry[1] != gen:
+                    continue  # objet déjà retiré (ou remplacé)
+                if self._due(entry[0]) > now:
+                    heapq.heappush(heap, (self._next(entry[0], now), gen, key))
+                    continue
+                del self._live[key]
+                victims.append((key, entry[0]))
+            self.expired += len(victims)
+            # Entrées orphelines (objets retirés par `discard`) : compactage quand elles dominent
+            live = self._live.items()
+            if len(heap) > 2 * len(self._live) + 64:
+                self._heap = [(self._next(obj, now), gen, key) for key, (obj, gen) in live]
+                heapq.heapify(self._heap)
+            if len(self._idle) > 2 * len(self._live) + 64:
+                self._idle = [(obj.last_activity, gen, key) for key, (obj, gen) in live]
+                heapq.heapify(self._idle)
+        self._drop(victims)
+        return len(victims)
+
+    def _drop(self, victims: List[Tuple[str, Any]]) -> None:
+        for key, obj in victims:
+            try:
+                self._remove(key, obj)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            phases: Dict[str, int] = {}
+            for obj, _ in self._live.values():
+                phase = self._phase_of(obj)
+                phases[phase] = phases.get(phase, 0) + 1
+            return {
+                "live": len(self._live),
+                "phases": phases,
+                "max_live": self.max_live,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "refused": self.refused,
+            }
+
+    def start(self, scheduler: DeadlineScheduler, interval: float = 30.0) -> None:
+        """Balayage périodique sur le tas de minuteries du serveur."""
+
+        def run() -> None:
+            self.sweep()
+            scheduler.call_later(interval, run)
+
+        scheduler.call_later(interval, run)
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import os
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle : sans NumPy, résolution joueur par joueur
+    np = None
+
+KEYS = ("A", "B", "C", "D")
+KEY_INDEX = {k: i for i, k in enumerate(KEYS)}
+
+# Résolution vectorisée : NumPy présent et non désactivée (MONEYDROP_VECTORIZE=0)
+VECTORIZE = np is not None and os.environ.get("MONEYDROP_VECTORIZE", "1") != "0"
+# En dessous, la boucle Python reste plus rapide
+VECTOR_MIN_PLAYERS = int(os.environ.get("MONEYDROP_VECTOR_MIN_PLAYERS", "256"))
+
+UNSET = -1  # choix / bonne réponse inconnus (colonnes `choice`, `correct`)
+_NO_BETS = array("q", (0, 0, 0, 0))
+
+
+class PlayerTable:
+    """Joueurs d'un salon en colonnes (`array`) : score, mises (4 par ligne), drapeaux.
+
+    Une ligne par joueur, réutilisée après `remove` ; `owners[row]` est la vue du joueur
+    (`PlayerRow`). Une ligne libre est marquée éliminée, sans mise : les calculs l'ignorent.
+    Les transitions de manche remplacent des colonnes entières (aucune allocation par joueur) et
+    la résolution travaille sur des vues NumPy des colonnes, sans copie, ou ligne par ligne sous
+    `VECTOR_MIN_PLAYERS` joueurs (ou sans NumPy). Les vues NumPy ne survivent pas à l'appel :
+    une colonne exportée ne peut plus grandir.
+    """
+
+    def __init__(self, vectorize: bool = True):
+        self.vectorize = vectorize
+        self.score = array("q")
+        self.hits = array("q")  # bonnes réponses (salons HTTP)
+        self.bets = array("q")  # A, B, C, D de la ligne r en [4r, 4r + 4)
+        self.eliminated = array("b")
+        self.correct = array("b")  # 1 / 0 / UNSET
+        self.choice = array("b")  # indice dans KEYS / UNSET
+        self.live = array("b")
+        self.owners: List[Any] = []
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.owners) - len(self._free)
+
+    def nbytes(self) -> int:
+        """Octets des colonnes (hors vues joueur)."""
+        columns = (
+            self.score, self.hits, self.bets, self.eliminated, self.correct, self.choice, self.live
+        )
+        return sum(c.itemsize * len(c) for c in columns) + 8 * len(self.owners)
+
+    def add(self, owner: Any) -> int:
+        if self._free:
+            row = self._free.pop()
+            self.owners[row] = owner
+            self.eliminated[row] = 0
+            self.live[row] = 1
+            return row
+        row = len(self.owners)
+        self.owners.append(owner)
+        self.score.append(0)
+        self.hits.append(0)
+        self.bets.extend((0, 0, 0, 0))
+        self.eliminated.append(0)
+        self.correct.append(UNSET)
+        self.choice.append(UNSET)
+        self.live.append(1)
+        return row
+
+    def extend(self, owners: List[Any], score: List[int], eliminated: List[int]) -> None:
+        """Lignes ajoutées en bloc (reprise d'un salon) : `owners[i]`, vue sans ligne, reçoit la
+        sienne ; aucune mise, aucun choix."""
+        n = len(owners)
+        for row, owner in enumerate(owners, len(self.owners)):
+            owner._table, owner._row = self, row
+        self.owners.extend(owners)
+        self.score.extend(score)
+        self.hits.frombytes(bytes(8 * n))
+        self.bets.frombytes(bytes(32 * n))
+        self.eliminated.extend(eliminated)
+        self.correct.extend(array("b", (UNSET,)) * n)
+        self.choice.extend(array("b", (UNSET,)) * n)
+        self.live.extend(array("b", (1,)) * n)
+
+    def remove(self, row: int) -> None:
+        self.owners[row] = None
+        self.score[row] = 0
+        self.hits[row] = 0
+        self.bets[4 * row : 4 * row + 4] = _NO_BETS
+        self.eliminated[row] = 1
+        self.correct[row] = UNSET
+        self.choice[row] = UNSET
+        self.live[row] = 0
+        self._free.append(row)
+
+    def copy_row(self, row: int, other: "PlayerTable", src: int) -> None:
+        self.score[row] = other.score[src]
+        self.hits[row] = other.hits[src]
+        self.bets[4 * row : 4 * row + 4] = other.bets[4 * src : 4 * src + 4]
+        self.eliminated[row] = other.eliminated[src]
+        self.correct[row] = other.correct[src]
+        self.choice[row] = other.choice[src]
+
+    # --- Transitions en bloc ---
+
+    def reset(self, score: int) -> None:
+        """Nouvelle partie : score de départ, personne d'éliminé, aucune mise ni réponse."""
+        n = len(self.owners)
+        self.score = array("q", (score,)) * n
+        self.hits = array("q", bytes(8 * n))
+        self.eliminated = array("b", bytes(n))
+        for row in self._free:
+            self.score[row] = 0
+            self.eliminated[row] = 1
+        self.new_round()
+
+    def new_round(self) -> None:
+        """Nouvelle manche : ni choix, ni bonne réponse, ni mise.
+
+        Les mises d'un joueur éliminé sont déjà nulles (effacées à l'élimination, et une mise
+        positive dépasse son score de 0) : tout effacer revient à n'effacer que les actifs.
+        """
+        n = len(self.owners)
+        self.bets = array("q", bytes(32 * n))
+        self.correct = array("b", (UNSET,)) * n
+        self.choice = array("b", (UNSET,)) * n
+
+    def all_bet(self) -> bool:
+        """Tous les joueurs (éliminés compris) ont une mise non nulle."""
+        it = iter(self.bets)
+        for owner, bets in zip(self.owners, zip(it, it, it, it)):
+            if owner is not None and sum(bets) == 0:
+                return False
+        return len(self) > 0
+
+    def _use_numpy(self) -> bool:
+        return self.vectorize and VECTORIZE and len(self) >= max(1, VECTOR_MIN_PLAYERS)
+
+    # --- Résolution d'une manche ---
+
+    def resolve_all_or_nothing(self, correct: str) -> List[int]:
+        """Règle des salons temps réel (voir `RealtimeLobby.validate`), colonnes modifiées en place.
+
+        Un joueur actif garde uniquement sa mise sur la bonne réponse (0 s'il n'a rien misé) ;
+        à 0, il est éliminé et ses mises effacées. Un joueur déjà éliminé n'a pas de bonne réponse.
+        Renvoie les lignes nouvellement éliminées.
+        """
+        k = KEY_INDEX[correct]
+        if self._use_numpy():
+            return self._all_or_nothing_numpy(k)
+        score, eliminated, verdict = self.score, self.eliminated, self.correct
+        out: List[int] = []
+        it = iter(self.bets)
+        for row, (gone, bets) in enumerate(zip(eliminated, zip(it, it, it, it))):
+            if gone:
+                verdict[row] = UNSET
+                continue
+            kept = bets[k] if sum(bets) != 0 else 0
+            if kept > 0:
+                score[row] = kept
+                verdict[row] = 1
+            else:
+                verdict[row] = 0
+                out.append(row)
+        for row in out:
+            score[row] = 0
+            eliminated[row] = 1
+            self.bets[4 * row : 4 * row + 4] = _NO_BETS
+        return out
+
+    def _all_or_nothing_numpy(self, k: int) -> List[int]:
+        n = len(self.owners)
+        score = np.frombuffer(self.score, dtype=np.int64)
+        bets = np.frombuffer(self.bets, dtype=np.int64).reshape(n, len(KEYS))
+        eliminated = np.frombuffer(self.eliminated, dtype=np.int8)
+        verdict = np.frombuffer(self.correct, dtype=np.int8)
+        active = eliminated == 0
+        kept = np.where(bets.sum(axis=1) != 0, bets[:, k], 0)
+        verdict.fill(UNSET)
+        verdict[active] = kept[active] > 0
+        score[active] = kept[active]
+        out = active & (score <= 0)
+        score[out] = 0
+        eliminated[out] = 1
+        bets[out] = 0
+        return np.flatnonzero(out).tolist()
+
+    def resolve_keep_unbet(self, correct: str) -> Tuple[List[int], List[List[int]]]:
+        """Règle des salons HTTP (voir `Lobby._resolve_round`), colonnes mises à jour en place.
+
+        Les jetons non misés sont conservés avec la mise sur la bonne réponse ; les mises sont
+        ensuite effacées. Renvoie (lignes, colonnes conservés / perdus / total / non misé / mise
+        correcte).
+        """
+        k = KEY_INDEX[correct]
+        if self._use_numpy():
+            result = self._keep_unbet_numpy(k)
+        else:
+            score, hits = self.score, self.hits
+            rows: List[int] = []
+            columns: List[List[int]] = [[], [], [], [], []]
+            kept_c, lost_c, total_c, unbet_c, correct_c = columns
+            it = iter(self.bets)
+            for row, (owner, bets) in enumerate(zip(self.owners, zip(it, it, it, it))):
+                if owner is None:
+                    continue
+                bet_total = sum(bets)
+                correct_bet = bets[k]
+                unbet = max(0, score[row] - bet_total)
+                kept = correct_bet + unbet
+                score[row] = kept
+                if correct_bet > 0:
+                    hits[row] += 1
+                rows.append(row)
+                kept_c.append(kept)
+                lost_c.append(bet_total - correct_bet)
+                total_c.append(bet_total)
+                unbet_c.append(unbet)
+                correct_c.append(correct_bet)
+            result = rows, columns
+        self.bets = array("q", bytes(32 * len(self.owners)))
+        return result
+
+    def _keep_unbet_numpy(self, k: int) -> Tuple[List[int], List[List[int]]]:
+        n = len(self.owners)
+        score = np.frombuffer(self.score, dtype=np.int64)
+        hits = np.frombuffer(self.hits, dtype=np.int64)
+        bets = np.frombuffer(self.bets, dtype=np.int64).reshape(n, len(KEYS))
+        rows = np.flatnonzero(np.frombuffer(self.live, dtype=np.int8))
+        placed = bets[rows]
+        correct_bet = placed[:, k]
+        bet_total = placed.sum(axis=1)
+        unbet = np.maximum(0, score[rows] - bet_total)
+        kept = correct_bet + unbet
+        score[rows] = kept
+        hits[rows] += correct_bet > 0
+        columns = (kept, bet_total - correct_bet, bet_total, unbet, correct_bet)
+        return rows.tolist(), [c.tolist() for c in columns]
+
+
+class PlayerRow:
+    """Vue d'un joueur sur une ligne de `PlayerTable` : les attributs numériques sont des colonnes.
+
+    Sans table, le joueur a la sienne (une ligne) ; `_move` le recopie dans une autre table
+    (arrivée dans un salon, départ). `_fields` liste les attributs affichés et comparés.
+    """
+
+    __slots__ = ("_table", "_row")
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, table: Optional[PlayerTable] = None):
+        self._table = table if table is not None else PlayerTable(vectorize=False)
+        self._row = self._table.add(self)
+
+    def _move(self, table: PlayerTable) -> None:
+        old, src = self._table, self._row
+        row = table.add(self)
+        table.copy_row(row, old, src)
+        old.remove(src)
+        self._table, self._row = table, row
+
+    def _detach(self) -> None:
+        """Retire le joueur de sa table en gardant ses valeurs (table privée)."""
+        self._move(PlayerTable(vectorize=False))
+
+    @property
+    def bets(self) -> Dict[str, int]:
+        b = 4 * self._row
+        return dict(zip(KEYS, self._table.bets[b : b + 4]))
+
+    @bets.setter
+    def bets(self, bets: Dict[str, int]) -> None:
+        b = 4 * self._row
+        # Entiers 64 bits : TypeError / OverflowError sinon, avant toute écriture
+        self._table.bets[b : b + 4] = array("q", [bets.get(k, 0) for k in KEYS])
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None  # type: ignore[assignment]
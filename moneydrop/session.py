@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import platform
 import secrets
 import time
 from dataclasses import dataclass
@@ -8,6 +9,9 @@ from typing import Dict, Optional
 
 from .engine import MoneyDropEngine
 from .models import AnswerKey, GameConfig, GameResult, Player, Question
+from .reaper import Reaper
+from .resolution import PlayerRow, PlayerTable
+from .timers import DeadlineScheduler, Timer
 
 
 @dataclass
@@ -114,44 +118,109 @@ class GameSession:
         )
 
 
+def _session_phase(session: GameSession) -> str:
+    return "finished" if session.finished or session.eliminated else "playing"
+
+
 class SessionManager:
-    """Gestionnaire thread-safe de sessions de jeu."""
+    """Gestionnaire thread-safe de sessions de jeu.
 
-    def __init__(self):
-        self._lock = Lock()
-        self._sessions: Dict[str, GameSession] = {}
+    Sessions réparties sur `stripes` tranches (hachage de l'identifiant), chacune avec son
+    verrou : créations et suppressions concurrentes ne se bloquent que sur la même tranche.
+    `get` lit sans verrou quand l'interpréteur garantit l'atomicité de `dict.get` (CPython,
+    avec ou sans GIL, et PyPy) ; ailleurs, la lecture passe par le verrou de la tranche.
+
+    `reaper` expire les sessions inactives (durées par phase « playing » / « finished ») et
+    plafonne leur nombre à `max_live` ; balayage lancé par `reaper.start(scheduler)`.
+    """
+
+    lock_free_reads = platform.python_implementation() in ("CPython", "PyPy")
+
+    def __init__(
+        self, ttls: Optional[Dict[str, float]] = None, max_live: int = 0, stripes: int = 16
+    ):
+        self._stripes = max(1, int(stripes))
+        self._locks = [Lock() for _ in range(self._stripes)]
+        self._shards: list[Dict[str, GameSession]] = [{} for _ in range(self._stripes)]
+        self.reaper = Reaper(_session_phase, self._reap, ttls, max_live)
+
+    def _stripe(self, session_id: str) -> int:
+        return hash(session_id) % self._stripes
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
 
     def create(self, session: GameSession) -> str:
+        self.reaper.admit()  # CapacityError si le plafond est atteint
         session_id = secrets.token_urlsafe(24)
-        with self._lock:
-            self._sessions[session_id] = session
+        i = self._stripe(session_id)
+        with self._locks[i]:
+            self._shards[i][session_id] = session
+        self.reaper.add(session_id, session)
         return session_id
 
     def get(self, session_id: str) -> Optional[GameSession]:
-        with self._lock:
-            return self._sessions.get(session_id)
+        i = self._stripe(session_id)
+        if self.lock_free_reads:
+            return self._shards[i].get(session_id)
+        with self._locks[i]:
+            return self._shards[i].get(session_id)
 
     def delete(self, session_id: str) -> None:
-        with self._lock:
-            self._sessions.pop(session_id, None)
+        i = self._stripe(session_id)
+        with self._locks[i]:
+            self._shards[i].pop(session_id, None)
+        self.reaper.discard(session_id)
+
+    def _reap(self, session_id: str, session: GameSession) -> None:
+        i = self._stripe(session_id)
+        with self._locks[i]:
+            if self._shards[i].get(session_id) is session:
+                del self._shards[i][session_id]
 
     def cleanup_inactive(self, ttl_seconds: int = 3600) -> int:
         now = time.time()
         removed = 0
-        with self._lock:
-            to_delete = [sid for sid, s in self._sessions.items() if now - s.last_activity > ttl_seconds]
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                to_delete = [sid for sid, s in shard.items() if now - s.last_activity > ttl_seconds]
+                for sid in to_delete:
+                    shard.pop(sid, None)
             for sid in to_delete:
-                self._sessions.pop(sid, None)
-                removed += 1
+                self.reaper.discard(sid)
+            removed += len(to_delete)
         return removed
 
 
-@dataclass
-class LobbyPlayer:
-    session_id: str
-    name: str
-    chips: int
-    correct_answers: int = 0
+class LobbyPlayer(PlayerRow):
+    """Joueur d'un salon HTTP ; jetons, bonnes réponses et mises sont des colonnes du salon
+    (`PlayerTable`) une fois qu'il l'a rejoint."""
+
+    __slots__ = ("session_id", "name")
+    _fields = ("session_id", "name", "chips", "correct_answers")
+
+    def __init__(self, session_id: str, name: str, chips: int, correct_answers: int = 0):
+        super().__init__()
+        self.session_id = session_id
+        self.name = name
+        self.chips = chips
+        self.correct_answers = correct_answers
+
+    @property
+    def chips(self) -> int:
+        return self._table.score[self._row]
+
+    @chips.setter
+    def chips(self, value: int) -> None:
+        self._table.score[self._row] = value
+
+    @property
+    def correct_answers(self) -> int:
+        return self._table.hits[self._row]
+
+    @correct_answers.setter
+    def correct_answers(self, value: int) -> None:
+        self._table.hits[self._row] = value
 
 
 class Lobby:
@@ -160,18 +229,35 @@ class Lobby:
     - Tous les joueurs partagent la même liste de questions (mélangée selon le moteur).
     - Pour chaque question, on collecte les mises dans `submissions`.
     - Quand tous ont soumis ou que le timeout est dépassé, on résout la manche.
+    - Avec un `scheduler`, le timeout résout la manche à l'échéance, même sans nouvelle soumission.
     """
 
-    def __init__(self, lobby_id: str, engine: MoneyDropEngine, config: GameConfig, size: int, creator: LobbyPlayer, time_limit: int = 30):
+    def __init__(
+        self,
+        lobby_id: str,
+        engine: MoneyDropEngine,
+        config: GameConfig,
+        size: int,
+        creator: LobbyPlayer,
+        time_limit: int = 30,
+        scheduler: Optional[DeadlineScheduler] = None,
+        vectorize: bool = True,
+    ):
         self.id = lobby_id
         self.engine = engine
         self.config = config
         self.size = int(size)
         self.time_limit = int(time_limit)
 
+        # Jetons, bonnes réponses et mises des joueurs, en colonnes ; `vectorize` : résolution NumPy
+        # à partir de VECTOR_MIN_PLAYERS joueurs
+        self._table = PlayerTable(vectorize=vectorize)
+        creator._move(self._table)
+
         # players: list of LobbyPlayer
         self.players: list[LobbyPlayer] = [creator]
         self.creator = creator.session_id
+        self._members: Dict[str, LobbyPlayer] = {creator.session_id: creator}
 
         # prepare questions once per lobby
         qs = engine._questions[:]  # noqa: SLF001
@@ -184,17 +270,27 @@ class Lobby:
         # submissions: session_id -> bets dict
         self.submissions: Dict[str, Dict[AnswerKey, int]] = {}
 
-        # last round results: session_id -> resolution dict
-        self.last_results: Dict[str, dict] = {}
+        # last round results: session_id -> resolution dict (voir `last_results`)
+        self._last_results: Dict[str, dict] = {}
+        self._pending_results: Optional[tuple] = None
 
         self.question_start = 0.0
+        self.last_activity = time.time()
+
+        # Soumissions (requêtes HTTP) et échéance (thread du scheduler) résolvent sous ce verrou
+        self._lock = Lock()
+        self._scheduler = scheduler
+        self._timer: Optional[Timer] = None
 
     def join(self, player: LobbyPlayer) -> None:
-        if any(p.session_id == player.session_id for p in self.players):
+        if player.session_id in self._members:
             return
         if len(self.players) >= self.size:
             raise ValueError("lobby plein")
+        player._move(self._table)
         self.players.append(player)
+        self._members[player.session_id] = player
+        self.last_activity = time.time()
 
     def start(self) -> None:
         if self.started:
@@ -205,7 +301,22 @@ class Lobby:
         self.index = 0
         self.submissions = {}
         self.last_results = {}
-        self.question_start = time.time()
+        self.question_start = self.last_activity = time.time()
+        self._arm()
+
+    def _arm(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._scheduler is not None and self.started and not self.is_finished():
+            self._timer = self._scheduler.call_later(self.time_limit, self._on_timeout, self.index)
+
+    def _on_timeout(self, index: int) -> None:
+        with self._lock:
+            # Manche déjà résolue par la dernière soumission
+            if index != self.index:
+                return
+            self._resolve_round()
 
     def current_question(self) -> Optional[Question]:
         if not self.started:
@@ -217,14 +328,22 @@ class Lobby:
     def submit(self, session_id: str, bets: Dict[AnswerKey, int]) -> None:
         if not self.started:
             raise ValueError("partie non démarrée")
-        if session_id in self.submissions:
-            # override allowed
-            pass
-        self.submissions[session_id] = bets
-
-        # maybe resolve
-        if self._should_resolve():
-            self._resolve_round()
+        with self._lock:
+            if session_id in self.submissions:
+                # override allowed
+                pass
+            player = self._members.get(session_id)
+            if player is not None:
+                try:
+                    player.bets = bets
+                except (TypeError, OverflowError):
+                    raise ValueError("mise invalide") from None
+            self.submissions[session_id] = bets
+            self.last_activity = time.time()
+
+            # maybe resolve
+            if self._should_resolve():
+                self._resolve_round()
 
     def _should_resolve(self) -> bool:
         if not self.started:
@@ -240,37 +359,55 @@ class Lobby:
         if q is None:
             return
 
-        for p in self.players:
-            bets = self.submissions.get(p.session_id, {"A": 0, "B": 0, "C": 0, "D": 0})
-            bet_total = sum(bets.values())
-            unbet = max(0, p.chips - bet_total)
-            kept = bets.get(q.correct, 0) + unbet
-            lost = bet_total - bets.get(q.correct, 0)
-            correct_bet = bets.get(q.correct, 0)
-
-            p.chips = kept
-            if correct_bet > 0:
-                p.correct_answers += 1
-
-            self.last_results[p.session_id] = {
-                "correct": q.correct,
-                "correct_label": q.answers[q.correct],
-                "kept": kept,
-                "lost": lost,
-                "bet_total": bet_total,
-                "unbet": unbet,
-                "explanation": q.explanation,
-                "correct_bet": correct_bet,
-            }
+        # Jetons non misés conservés avec la mise correcte : colonnes mises à jour en place, en
+        # une passe NumPy au-delà de VECTOR_MIN_PLAYERS joueurs. Le détail par joueur est gardé en
+        # colonnes, mis en forme à la première lecture de `last_results`
+        self._pending_results = (q, *self._table.resolve_keep_unbet(q.correct))
 
         # advance
         self.index += 1
         self.submissions = {}
-        self.question_start = time.time()
+        self.question_start = self.last_activity = time.time()
+        self._arm()
+
+    @property
+    def last_results(self) -> Dict[str, dict]:
+        with self._lock:
+            if self._pending_results is not None:
+                q, rows, columns = self._pending_results
+                owners = self._table.owners
+                # Tous les joueurs sont résolus à chaque manche : le dictionnaire est remplacé
+                self._last_results = {
+                    owners[row].session_id: {
+                        "correct": q.correct,
+                        "correct_label": q.answers[q.correct],
+                        "kept": kept,
+                        "lost": lost,
+                        "bet_total": bet_total,
+                        "unbet": unbet,
+                        "explanation": q.explanation,
+                        "correct_bet": correct_bet,
+                    }
+                    for row, kept, lost, bet_total, unbet, correct_bet in zip(rows, *columns)
+                }
+                self._pending_results = None
+            return self._last_results
+
+    @last_results.setter
+    def last_results(self, value: Dict[str, dict]) -> None:
+        self._pending_results = None
+        self._last_results = value
 
     def is_finished(self) -> bool:
         return self.index >= len(self.questions)
 
+    def close(self) -> None:
+        """Salon retiré : plus d'échéance en attente."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
     def player_view(self, session_id: str) -> dict:
         # returns view for a player
         q = self.current_question()
@@ -296,18 +433,41 @@ class Lobby:
         }
 
 
+def _lobby_phase(lobby: Lobby) -> str:
+    if not lobby.started:
+        return "waiting"
+    return "finished" if lobby.is_finished() else "playing"
+
+
 class LobbyManager:
-    def __init__(self):
+    def __init__(
+        self,
+        scheduler: Optional[DeadlineScheduler] = None,
+        ttls: Optional[Dict[str, float]] = None,
+        max_live: int = 0,
+    ):
         self._lock = Lock()
         self._lobbies: Dict[str, Lobby] = {}
+        self._scheduler = scheduler
+        self.reaper = Reaper(_lobby_phase, self._reap, ttls, max_live)
 
     def create(self, lobby_id: str, engine: MoneyDropEngine, config: GameConfig, size: int, creator: LobbyPlayer, time_limit: int = 30) -> Lobby:
+        self.reaper.admit()  # CapacityError si le plafond est atteint
         with self._lock:
             if lobby_id in self._lobbies:
                 raise ValueError("lobby exists")
-            l = Lobby(lobby_id, engine, config, size, creator, time_limit=time_limit)
+            l = Lobby(
+                lobby_id,
+                engine,
+                config,
+                size,
+                creator,
+                time_limit=time_limit,
+                scheduler=self._scheduler,
+            )
             self._lobbies[lobby_id] = l
-            return l
+        self.reaper.add(lobby_id, l)
+        return l
 
     def get(self, lobby_id: str) -> Optional[Lobby]:
         with self._lock:
@@ -315,5 +475,15 @@ class LobbyManager:
 
     def delete(self, lobby_id: str) -> None:
         with self._lock:
-            self._lobbies.pop(lobby_id, None)
+            lobby = self._lobbies.pop(lobby_id, None)
+        self.reaper.discard(lobby_id)
+        if lobby is not None:
+            lobby.close()
+
+    def _reap(self, lobby_id: str, lobby: Lobby) -> None:
+        with self._lock:
+            if self._lobbies.get(lobby_id) is not lobby:
+                return
+            del self._lobbies[lobby_id]
+        lobby.close()
 
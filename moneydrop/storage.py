@@ -0,0 +1,608 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+from .models import LeaderboardEntry
+from .ranking import RankIndex
+
+
+def _offload(fn: Callable[..., Any], *args: Any) -> Any:
+    """Exécute `fn` dans un vrai thread si l'application tourne sous eventlet (monkey-patch).
+
+    Sans cela, l'écriture disque et `json.dump` bloqueraient le hub qui sert tous les sockets.
+    """
+    try:
+        from eventlet import patcher, tpool
+    except ImportError:
+        return fn(*args)
+    if patcher.is_monkey_patched("thread"):
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+
+def _write_json(path: str, data: Dict[str, Any], indent: Optional[int], sync: bool = False) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        if indent is None:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _is_better(final_chips: int, correct_answers: int, current: LeaderboardEntry) -> bool:
+    # On conserve la meilleure perf en jetons, et à égalité, les bonnes réponses.
+    return (final_chips > current.best_chips) or (
+        final_chips == current.best_chips and correct_answers > current.best_correct
+    )
+
+
+# Clé de classement croissante : (jetons, bonnes réponses, nom en minuscules, -ordre d'arrivée,
+# nom). Parcourue à l'envers, elle reproduit le tri historique (décroissant et stable à égalité).
+RankKey = Tuple[int, int, str, int, str]
+
+
+class LeaderboardStorage:
+    """Stockage d'un classement : meilleur score par joueur, lecture du top N.
+
+    `shared` : les écritures d'autres processus y sont visibles (base commune).
+    """
+
+    shared = False
+
+    def update(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        """Enregistre un score ; renvoie False si le classement est certainement inchangé."""
+        raise NotImplementedError
+
+    def top(self, n: int) -> List[LeaderboardEntry]:
+        raise NotImplementedError
+
+    def rank(self, name: str) -> Optional[int]:
+        """Position (1 = premier) du joueur, None s'il n'est pas classé."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques de persistance (vide si le stockage n'en publie pas)."""
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStorage(LeaderboardStorage):
+    """Classement en mémoire, sans persistance.
+
+    Un index trié (`RankIndex`) est tenu à jour à chaque amélioration : `top(n)` et `rank(name)`
+    ne trient jamais tout le classement. Avec `max_entries`, les plus faibles scores sont
+    oubliés au-delà de cette taille (le haut du classement reste exact).
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self._lock = Lock()
+        self._scores: Dict[str, LeaderboardEntry] = {}
+        self._keys: Dict[str, RankKey] = {}
+        self._index = RankIndex()
+        self._seq = 0
+        self._max_entries = max_entries
+
+    def _key(self, e: LeaderboardEntry, seq: int) -> RankKey:
+        return (e.best_chips, e.best_correct, e.name.lower(), -seq, e.name)
+
+    def _reindex(self) -> None:
+        self._keys = {name: self._key(e, seq) for seq, (name, e) in enumerate(self._scores.items())}
+        self._index = RankIndex(self._keys.values())
+        self._seq = len(self._keys)
+
+    def _merge(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        """Applique un score ; renvoie True si le meilleur score du joueur a changé."""
+        current = self._scores.get(name)
+        if current is None:
+            entry = LeaderboardEntry(
+                name=name, best_chips=final_chips, best_correct=correct_answers
+            )
+            self._scores[name] = entry
+            key = self._key(entry, self._seq)
+            self._seq += 1
+            self._keys[name] = key
+            self._index.add(key)
+            if self._max_entries is not None and len(self._scores) > self._max_entries:
+                weakest = self._index.pop_smallest()
+                del self._scores[weakest[4]]
+                del self._keys[weakest[4]]
+                return weakest is not key
+            return True
+        if _is_better(final_chips, correct_answers, current):
+            old = self._keys[name]
+            current.best_chips = final_chips
+            current.best_correct = correct_answers
+            key = (final_chips, correct_answers) + old[2:]
+            self._index.remove(old)
+            self._index.add(key)
+            self._keys[name] = key
+            return True
+        return False
+
+    def entries(self) -> List[LeaderboardEntry]:
+        """Copie des entrées, dans l'ordre d'insertion."""
+        with self._lock:
+            return [
+                LeaderboardEntry(e.name, e.best_chips, e.best_correct)
+                for e in self._scores.values()
+            ]
+
+    def update(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        with self._lock:
+            return self._merge(name, final_chips, correct_answers)
+
+    def top(self, n: int) -> List[LeaderboardEntry]:
+        with self._lock:
+            return [self._scores[key[4]] for key in self._index.largest(n)]
+
+    def rank(self, name: str) -> Optional[int]:
+        with self._lock:
+            key = self._keys.get(name)
+            if key is None:
+                return None
+            return self._index.count_above(key) + 1
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class JsonFileStorage(MemoryStorage):
+    """Classement en mémoire, réécrit entièrement dans un fichier JSON à chaque amélioration.
+
+    Écriture différée (`write_behind=True`) : `update` marque le classement « sale » et rend la
+    main ; un thread de fond regroupe les améliorations reçues pendant `flush_delay` secondes en
+    une seule sauvegarde, faite hors du hub eventlet. `close()` écrit ce qui reste.
+    """
+
+    def __init__(self, path: str, write_behind: bool = False, flush_delay: float = 0.05):
+        super().__init__()
+        self._path = path
+        self._load()
+
+        self._write_behind = write_behind
+        self._flush_delay = flush_delay
+        self._dirty_since: Optional[float] = None
+        self._dirty_updates = 0
+        self._saves = 0
+        self._coalesced = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        # Sauvegardes une à une (même `path.tmp`) ; numéro d'instantané pris sous `_lock` : un
+        # instantané plus ancien que le dernier écrit n'est jamais écrit par-dessus
+        self._save_lock = Lock()
+        self._snapshots = 0
+        self._written = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._worker: Optional[threading.Thread] = None
+        if write_behind:
+            self._worker = threading.Thread(target=self._write_loop, daemon=True)
+            self._worker.start()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for name, payload in data.items():
+                self._scores[name] = LeaderboardEntry(
+                    name=name,
+                    best_chips=int(payload.get("best_chips", 0)),
+                    best_correct=int(payload.get("best_correct", 0)),
+                )
+        except Exception:
+            # En cas de fichier corrompu, on repart proprement.
+            self._scores = {}
+        self._reindex()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {
+            name: {"best_chips": e.best_chips, "best_correct": e.best_correct}
+            for name, e in self._scores.items()
+        }
+
+    def _save(self) -> None:
+        _write_json(self._path, self._snapshot(), indent=2)
+
+    # --- Écriture différée ---
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            if self._flush_delay > 0 and not self._stopping:
+                # Laisse la rafale en cours s'accumuler dans la même sauvegarde
+                time.sleep(self._flush_delay)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Disque plein, droits… : on retentera à la prochaine amélioration
+                time.sleep(1.0)
+            if self._stopping:
+                return
+
+    def flush(self) -> None:
+        """Écrit maintenant les améliorations en attente (mode écriture différée)."""
+        with self._lock:
+            if self._dirty_since is None:
+                return
+            data = self._snapshot()
+            self._snapshots += 1
+            snapshot = self._snapshots
+            dirty_since, updates = self._dirty_since, self._dirty_updates
+            self._dirty_since, self._dirty_updates = None, 0
+        try:
+            with self._save_lock:
+                if snapshot > self._written:
+                    _offload(_write_json, self._path, data, 2)
+                    self._written = snapshot
+        except Exception:
+            with self._lock:
+                if self._dirty_since is None or dirty_since < self._dirty_since:
+                    self._dirty_since = dirty_since
+                self._dirty_updates += updates
+            raise
+        lag = time.monotonic() - dirty_since
+        with self._lock:
+            self._saves += 1
+            self._coalesced += updates
+            self._last_lag = lag
+            self._max_lag = max(self._max_lag, lag)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending_for = 0.0 if self._dirty_since is None else time.monotonic() - self._dirty_since
+            return {
+                "write_behind": self._write_behind,
+                "saves": self._saves,
+                "updates_saved": self._coalesced,
+                "pending_updates": self._dirty_updates,
+                "dirty_for_s": round(pending_for, 4),
+                "last_lag_s": round(self._last_lag, 4),
+                "max_lag_s": round(self._max_lag, 4),
+            }
+
+    def close(self) -> None:
+        if self._worker is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            self._worker.join(timeout=5)
+        except Exception:
+            pass
+        self._worker = None
+        # Si le thread n'a pas pu finir (arrêt de l'interpréteur), on écrit ici
+        self.flush()
+
+    def update(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        if self._write_behind:
+            with self._lock:
+                changed = self._merge(name, final_chips, correct_answers)
+                if changed:
+                    if self._dirty_since is None:
+                        self._dirty_since = time.monotonic()
+                    self._dirty_updates += 1
+            if changed:
+                self._wake.set()
+            return changed
+        with self._lock:
+            changed = self._merge(name, final_chips, correct_answers)
+            self._save()
+        return changed
+
+class JournalStorage(JsonFileStorage):
+    """Instantané JSON + journal en ajout seul.
+
+    Chaque amélioration ajoute une ligne compacte dans `<path>.journal` au lieu de réécrire
+    tout le fichier. Au-delà de `compact_bytes`, un thread de fond réécrit l'instantané `<path>`
+    et repart d'un journal vide. Au démarrage, on rejoue instantané + journaux ; une ligne
+    tronquée ou illisible (crash en cours d'écriture) est ignorée.
+
+    `update` ne rend la main qu'une fois sa ligne sur disque (`os.fsync`), avec un `fsync`
+    groupé : le premier thread qui synchronise couvre aussi les lignes écrites entre-temps.
+    """
+
+    def __init__(self, path: str, compact_bytes: int = 4 * 1024 * 1024):
+        self._journal_path = f"{path}.journal"
+        self._compact_bytes = int(compact_bytes)
+        self._journal_lock = Lock()
+        self._journal_file: Optional[TextIO] = None
+        self._journal_size = 0
+        self._compacting = False
+        self._sync_lock = Lock()
+        self._appended = 0
+        self._synced = 0
+        self._rotated_at = 0
+        super().__init__(path)
+
+    def _load(self) -> None:
+        super()._load()
+        # `.old` : journal en cours de compaction lors d'un éventuel crash
+        for path in (f"{self._journal_path}.old", self._journal_path):
+            self._replay(path)
+
+    def _replay(self, path: str) -> None:
+        if not os.path.exists(path):
+            return
+        # Lecture binaire, décodage ligne par ligne : un caractère multi-octets coupé par un crash
+        # n'invalide que sa ligne
+        with open(path, "rb") as f:
+            for raw in f:
+                try:
+                    name, chips, correct = json.loads(raw.decode("utf-8"))
+                    chips, correct = int(chips), int(correct)
+                except (ValueError, TypeError, UnicodeDecodeError):
+                    continue
+                self._merge(name, chips, correct)
+
+    def update(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        with self._lock:
+            changed = self._merge(name, final_chips, correct_answers)
+        if changed:
+            # Le rejeu garde le meilleur score : l'ordre des lignes entre threads est sans effet
+            self._append(name, final_chips, correct_answers)
+        return changed
+
+    def _append(self, name: str, final_chips: int, correct_answers: int) -> None:
+        line = json.dumps([name, final_chips, correct_answers], ensure_ascii=False) + "\n"
+        with self._journal_lock:
+            if self._journal_file is None:
+                self._open_journal()
+            self._journal_file.write(line)
+            self._journal_file.flush()
+            self._journal_size += len(line)
+            self._appended += 1
+            ticket = self._appended
+            # Copie du descripteur : le fichier peut être fermé par une rotation avant le fsync
+            fd = os.dup(self._journal_file.fileno())
+            compact = self._journal_size >= self._compact_bytes and not self._compacting
+            if compact:
+                self._compacting = True
+                self._rotate_journal()
+        try:
+            self._sync(fd, ticket)
+        finally:
+            os.close(fd)
+        if compact:
+            threading.Thread(target=self._compact, daemon=True).start()
+
+    def _sync(self, fd: int, ticket: int) -> None:
+        with self._sync_lock:
+            if self._synced >= ticket:
+                # Déjà couvert par le fsync d'un autre thread
+                return
+            with self._journal_lock:
+                if ticket <= self._rotated_at:
+                    # Synchronisée par la rotation qui a fermé son fichier
+                    return
+                # Le journal courant est celui de `ticket` : il contient toutes les lignes écrites
+                upto = self._appended
+            os.fsync(fd)
+            self._synced = max(self._synced, upto)
+
+    def _open_journal(self) -> None:
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        with open(self._journal_path, "ab+") as raw:
+            if raw.tell():
+                # Dernière ligne tronquée par un crash (au milieu d'un caractère, parfois) : on la
+                # termine pour ne pas coller la suivante ; vérifié en octets
+                raw.seek(-1, os.SEEK_END)
+                if raw.read(1) != b"\n":
+                    raw.write(b"\n")
+        f = open(self._journal_path, "a", encoding="utf-8")
+        self._journal_file = f
+        self._journal_size = f.tell()
+
+    def _rotate_journal(self) -> None:
+        # Appelé sous `_journal_lock` : les prochains ajouts partent dans un journal neuf
+        if self._journal_file is not None:
+            os.fsync(self._journal_file.fileno())
+            self._journal_file.close()
+            self._journal_file = None
+        self._journal_size = 0
+        self._rotated_at = self._appended
+        if not os.path.exists(self._journal_path):
+            return
+        old = f"{self._journal_path}.old"
+        if os.path.exists(old):
+            # Compaction précédente inachevée : on cumule au lieu d'écraser
+            with open(self._journal_path, "rb") as src, open(old, "ab") as dst:
+                dst.write(b"\n")
+                shutil.copyfileobj(src, dst)
+            os.remove(self._journal_path)
+        else:
+            os.replace(self._journal_path, old)
+
+    def _compact(self) -> None:
+        try:
+            # Tout ce qui est dans `.old` est déjà en mémoire : l'instantané le couvre
+            with self._lock:
+                entries: List[Tuple[str, int, int]] = [
+                    (e.name, e.best_chips, e.best_correct) for e in self._scores.values()
+                ]
+            data = {name: {"best_chips": c, "best_correct": k} for name, c, k in entries}
+            _offload(_write_json, self._path, data, None, True)
+            if os.path.exists(f"{self._journal_path}.old"):
+                os.remove(f"{self._journal_path}.old")
+        finally:
+            with self._journal_lock:
+                self._compacting = False
+
+    def compact(self) -> None:
+        """Compaction synchrone du journal (arrêt propre, tests, outils)."""
+        with self._journal_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+            self._rotate_journal()
+        self._compact()
+
+    def close(self) -> None:
+        with self._journal_lock:
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+
+
+class SqliteStorage(LeaderboardStorage):
+    """Classement SQLite (WAL), pour les gros volumes.
+
+    - `top(n)` lit l'index `(best_chips DESC, best_correct DESC, name_key DESC)` ; `name_key`
+      est le `name.lower()` Python, pour un ordre identique au stockage JSON.
+    - Écritures groupées : les `update` concurrents sont appliqués dans une seule transaction
+      par le premier thread qui prend le verrou d'écriture (« group commit »).
+    - À la création de la base, le classement JSON `migrate_from` (et son journal) est importé.
+    """
+
+    shared = True
+
+    _UPSERT = (
+        "INSERT INTO leaderboard (name, name_key, best_chips, best_correct) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET "
+        "best_chips = excluded.best_chips, best_correct = excluded.best_correct "
+        "WHERE excluded.best_chips > leaderboard.best_chips "
+        "OR (excluded.best_chips = leaderboard.best_chips "
+        "AND excluded.best_correct > leaderboard.best_correct)"
+    )
+
+    def __init__(self, db_path: str, migrate_from: Optional[str] = None):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db_path = db_path
+        self._write = self._connect()
+        self._write.execute("PRAGMA journal_mode=WAL")
+        exists = self._write.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leaderboard'"
+        ).fetchone()
+        rows = []
+        if not exists and migrate_from and os.path.exists(migrate_from):
+            rows = self._load_json(migrate_from)
+        # Table, index et import dans une seule transaction : un import interrompu ne laisse pas
+        # de table, il est donc retenté au démarrage suivant
+        with self._write:
+            self._write.execute("BEGIN IMMEDIATE")
+            self._write.execute(
+                """
+                CREATE TABLE IF NOT EXISTS leaderboard (
+                    name TEXT PRIMARY KEY,
+                    name_key TEXT NOT NULL,
+                    best_chips INTEGER NOT NULL,
+                    best_correct INTEGER NOT NULL
+                )
+                """
+            )
+            self._write.execute(
+                "CREATE INDEX IF NOT EXISTS leaderboard_rank"
+                " ON leaderboard (best_chips DESC, best_correct DESC, name_key DESC)"
+            )
+            self._write.executemany(self._UPSERT, rows)
+
+        self._read = self._connect()
+        self._read_lock = Lock()
+
+        self._commit_lock = Lock()
+        self._pending_lock = Lock()
+        self._pending: List[Tuple[str, str, int, int]] = []
+        self._enqueued = 0
+        self._committed = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _load_json(json_path: str) -> List[Tuple[str, str, int, int]]:
+        # L'ordre d'insertion est conservé (rowid) : départage identique au JSON à égalité stricte
+        return [
+            (e.name, e.name.lower(), e.best_chips, e.best_correct)
+            for e in JournalStorage(json_path).entries()
+        ]
+
+    def update(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        # L'upsert groupé ne dit pas quelle ligne a changé : on suppose que oui
+        with self._pending_lock:
+            self._pending.append((name, name.lower(), int(final_chips), int(correct_answers)))
+            self._enqueued += 1
+            ticket = self._enqueued
+        with self._commit_lock:
+            if self._committed >= ticket:
+                # Déjà écrit par le lot d'un autre thread
+                return True
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+                upto = self._enqueued
+            try:
+                with self._write:
+                    self._write.execute("BEGIN")
+                    self._write.executemany(self._UPSERT, batch)
+            except Exception:
+                # Le lot est remis en tête : le prochain thread en attente le retentera
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+            self._committed = upto
+        return True
+
+    def top(self, n: int) -> List[LeaderboardEntry]:
+        with self._read_lock:
+            rows = self._read.execute(
+                "SELECT name, best_chips, best_correct FROM leaderboard "
+                "ORDER BY best_chips DESC, best_correct DESC, name_key DESC, rowid LIMIT ?",
+                (int(n),),
+            ).fetchall()
+        return [LeaderboardEntry(name=r[0], best_chips=r[1], best_correct=r[2]) for r in rows]
+
+    # Joueurs devant : une plage de l'index de classement par niveau de départage (une condition
+    # OR sur toute la clé ne se lit pas sur l'index et parcourt la table) ; ordre identique à `top`
+    _RANK = (
+        "SELECT (SELECT COUNT(*) FROM leaderboard WHERE best_chips > p.best_chips)"
+        " + (SELECT COUNT(*) FROM leaderboard WHERE best_chips = p.best_chips"
+        " AND best_correct > p.best_correct)"
+        " + (SELECT COUNT(*) FROM leaderboard WHERE best_chips = p.best_chips"
+        " AND best_correct = p.best_correct AND name_key > p.name_key)"
+        " + (SELECT COUNT(*) FROM leaderboard WHERE best_chips = p.best_chips"
+        " AND best_correct = p.best_correct AND name_key = p.name_key AND rowid < p.rowid)"
+        " FROM leaderboard p WHERE p.name = ?"
+    )
+
+    def rank(self, name: str) -> Optional[int]:
+        with self._read_lock:
+            row = self._read.execute(self._RANK, (name,)).fetchone()
+        return None if row is None else row[0] + 1
+
+    def close(self) -> None:
+        with self._commit_lock:
+            self._write.close()
+        with self._read_lock:
+            self._read.close()
+
+
+def make_storage(backend: str, path: str, write_behind: bool = False) -> LeaderboardStorage:
+    """Construit le stockage `backend` ("json", "journal" ou "sqlite") pour le fichier `path`.
+
+    En SQLite, la base est `path` avec l'extension `.sqlite3` et `path` sert de source de migration.
+    `write_behind` ne concerne que "json" (les autres n'écrivent pas tout le fichier).
+    """
+    if backend == "json":
+        return JsonFileStorage(path, write_behind=write_behind)
+    if backend == "journal":
+        return JournalStorage(path)
+    if backend == "sqlite":
+        return SqliteStorage(os.path.splitext(path)[0] + ".sqlite3", migrate_from=path)
+    raise ValueError(f"stockage inconnu '{backend}' (json, journal ou sqlite)")
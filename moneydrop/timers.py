@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, List, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class Timer:
+    """Échéance programmée ; `cancel()` la désactive (retirée du tas à son passage)."""
+
+    __slots__ = ("deadline", "callback", "args", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[..., Any], args: Tuple[Any, ...]):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """Tas de minuteries : `run()` dort jusqu'à la prochaine échéance, sans sonder.
+
+    - `call_later(delay, fn, *args)` / `call_at(deadline, fn, *args)` : O(log n)
+    - `Timer.cancel()` : O(1) (suppression paresseuse)
+    Sans échéance en attente, la boucle ne se réveille pas : des milliers de salons inactifs
+    ne coûtent rien. Les rappels s'exécutent dans le thread (ou la tâche) qui appelle `run()`.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, Timer]] = []
+        self._seq = itertools.count()
+        self._closed = False
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def call_at(self, deadline: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        timer = Timer(deadline, callback, args)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), timer))
+            if self._heap[0][2] is timer:
+                # Nouvelle échéance la plus proche : la boucle doit raccourcir son attente
+                self._cond.notify()
+        return timer
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        return self.call_at(self._clock() + max(0.0, delay), callback, *args)
+
+    def _pop_due(self, now: float) -> List[Timer]:
+        # Appelé sous self._cond
+        due: List[Timer] = []
+        heap = self._heap
+        while heap and (heap[0][2].cancelled or heap[0][0] <= now):
+            timer = heapq.heappop(heap)[2]
+            if not timer.cancelled:
+                due.append(timer)
+        return due
+
+    def run_due(self) -> int:
+        """Exécute les échéances passées ; renvoie leur nombre."""
+        with self._cond:
+            due = self._pop_due(self._clock())
+        for timer in due:
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                # Les échéances suivantes partent quand même, mais l'erreur ne passe pas inaperçue
+                log.exception("échéance %r en échec", timer.callback)
+        self.fired += len(due)
+        return len(due)
+
+    def run(self) -> None:
+        """Boucle de service (thread ou tâche de fond) jusqu'à `close()`."""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    # Tête annulée : on la jette sans se réveiller pour elle
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - self._clock()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._closed:
+                    return
+            self.run_due()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name="deadline-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .models import LeaderboardEntry
+from .storage import MemoryStorage
+
+WINDOWS = ("day", "week", "event")
+
+TITLES = {
+    "day": "=== Classement du jour ===",
+    "week": "=== Classement de la semaine ===",
+    "event": "=== Classement de la soirée ===",
+}
+
+
+class WindowedBoards:
+    """Classements glissants (jour, semaine, soirée) tenus à jour à chaque partie.
+
+    - Chaque fenêtre est un `MemoryStorage` borné à `max_entries` joueurs.
+    - Une fenêtre est identifiée par son « seau » : date locale, semaine ISO, nom de soirée.
+    - On garde les `keep` derniers seaux par type ; les plus anciens sont supprimés d'un bloc
+      à l'ouverture d'un nouveau seau (pas de balayage joueur par joueur).
+    - La fenêtre « event » n'existe que pendant une soirée ouverte par `start_event`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        keep: int = 2,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._lock = Lock()
+        self._max_entries = max_entries
+        self._keep = max(1, keep)
+        self._clock = clock
+        self._boards: Dict[str, "OrderedDict[str, MemoryStorage]"] = {
+            w: OrderedDict() for w in WINDOWS
+        }
+        self._event: Optional[str] = None
+
+    def _bucket(self, window: str, now: float) -> Optional[str]:
+        if window == "day":
+            return time.strftime("%Y-%m-%d", time.localtime(now))
+        if window == "week":
+            return time.strftime("%G-W%V", time.localtime(now))
+        if window == "event":
+            return self._event
+        raise ValueError(f"fenêtre inconnue '{window}' (day, week ou event)")
+
+    def _open(self, window: str, bucket: str) -> MemoryStorage:
+        boards = self._boards[window]
+        board = boards.get(bucket)
+        if board is None:
+            board = boards[bucket] = MemoryStorage(max_entries=self._max_entries)
+            while len(boards) > self._keep:
+                boards.popitem(last=False)
+        return board
+
+    def start_event(self, name: str) -> None:
+        with self._lock:
+            self._event = name
+            self._open("event", name)
+
+    def end_event(self) -> None:
+        with self._lock:
+            self._event = None
+
+    @property
+    def event(self) -> Optional[str]:
+        return self._event
+
+    def update(self, name: str, final_chips: int, correct_answers: int) -> bool:
+        now = self._clock()
+        with self._lock:
+            boards = []
+            for window in WINDOWS:
+                bucket = self._bucket(window, now)
+                if bucket is not None:
+                    boards.append(self._open(window, bucket))
+        changed = False
+        for board in boards:
+            changed = board.update(name, final_chips, correct_answers) or changed
+        return changed
+
+    def resolve(
+        self, window: str, bucket: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[MemoryStorage]]:
+        """Seau demandé (par défaut le seau courant) et son classement, s'il est encore gardé."""
+        with self._lock:
+            if bucket is None:
+                bucket = self._bucket(window, self._clock())
+            if bucket is None:
+                return None, None
+            return bucket, self._boards[window].get(bucket)
+
+    def buckets(self, window: str) -> List[str]:
+        with self._lock:
+            return list(self._boards[window])
+
+    def top(self, window: str, n: int, bucket: Optional[str] = None) -> List[LeaderboardEntry]:
+        _, board = self.resolve(window, bucket)
+        return [] if board is None else board.top(n)
+
+    def rank(self, window: str, name: str, bucket: Optional[str] = None) -> Optional[int]:
+        _, board = self.resolve(window, bucket)
+        return None if board is None else board.rank(name)
@@ -0,0 +1,1976 @@
+"""Benchmarks Money Drop.
+
+Usage: python3 scripts/bench.py <scénario> [options]
+Chaque scénario affiche ses mesures sur la sortie standard.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+# --- server : serveur console threads vs asyncio ---
+
+async def _console_player(
+    port: int, name: str, arrived: list, all_in: asyncio.Event, done: asyncio.Event
+) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        await reader.readuntil(b"nom: ")
+        writer.write(name.encode() + b"\n")
+        await reader.readuntil(b"> ")
+        # Le joueur reste connecté, en attente devant sa première question
+        arrived[0] += 1
+        if arrived[0] == arrived[1]:
+            all_in.set()
+        await done.wait()
+    finally:
+        writer.close()
+
+
+def bench_server(args: argparse.Namespace) -> None:
+    for mode in args.modes:
+        port = _free_port()
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = subprocess.Popen(
+                [
+                    sys.executable, str(ROOT / "server.py"),
+                    "--port", str(port), "--mode", mode,
+                    "--leaderboard", os.path.join(tmp, "lb.json"),
+                ],
+                stdout=subprocess.DEVNULL,
+            )
+            try:
+                for _ in range(100):
+                    try:
+                        socket.create_connection(("127.0.0.1", port)).close()
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+                time.sleep(0.2)
+                base = _rss_kib(proc.pid)
+
+                async def run() -> tuple[float, int, int]:
+                    arrived = [0, args.players]
+                    all_in, done = asyncio.Event(), asyncio.Event()
+                    started = time.perf_counter()
+                    tasks = [
+                        asyncio.create_task(_console_player(port, f"p{i}", arrived, all_in, done))
+                        for i in range(args.players)
+                    ]
+                    try:
+                        await asyncio.wait_for(all_in.wait(), timeout=args.timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    elapsed = time.perf_counter() - started
+                    rss = _rss_kib(proc.pid)
+                    done.set()
+                    for t in tasks:
+                        t.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    return elapsed, rss, arrived[0]
+
+                elapsed, rss, served = asyncio.run(run())
+                print(
+                    f"server mode={mode:<8} joueurs={served:>6}/{args.players:<6} "
+                    f"connexions/s={served / elapsed:>9.1f} "
+                    f"mémoire/joueur={(rss - base) / max(1, served):>7.1f} KiB"
+                )
+            finally:
+                proc.terminate()
+                proc.wait()
+
+
+# --- engine : parties pas à pas multiplexées ---
+
+_SCRIPT = ["", "Z=5", "A=x", "A=-1", "A=999999", "A 10 B", "A=100 B=200 C=300 D=400", "ALL"]
+_CHIPS_RE = re.compile(r"(?:disponibles:|exactement) (\d+)")
+
+
+def _scripted_reply(step: int, transcript: list[str]) -> str:
+    # Mélange d'entrées invalides (relances) et de mises valides ; "ALL" mise tout sur B
+    line = _SCRIPT[step % len(_SCRIPT)]
+    if line == "ALL":
+        chips = _CHIPS_RE.findall("".join(transcript[-12:]))[-1]
+        return f"B={chips}"
+    return line
+
+
+def bench_engine(args: argparse.Namespace) -> None:
+    from moneydrop.engine import GameStepper, MoneyDropEngine
+    from moneydrop.models import GameConfig
+    from moneydrop.questions import build_question_bank
+
+    engine = MoneyDropEngine(build_question_bank())
+    configs = [GameConfig(), GameConfig(allow_unbet_chips=False, starting_chips=1000)]
+
+    # Débit : N parties en vol, avancées à tour de rôle (transcripts : tests/test_engine.py)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = []
+    outputs: list[list[str]] = []
+    for i in range(args.games):
+        out = []
+        games.append(GameStepper(engine, f"p{i}", out.append, configs[i % 2]))
+        outputs.append(out)
+    per_game = (tracemalloc.get_traced_memory()[0] - before) / args.games
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    steps = 0
+    live = list(range(args.games))
+    turn = 0
+    while live:
+        turn += 1
+        still = []
+        for i in live:
+            out = outputs[i]
+            del out[:-12]
+            games[i].feed(_scripted_reply(i + turn, out))
+            steps += 1
+            if not games[i].finished:
+                still.append(i)
+        live = still
+    elapsed = time.perf_counter() - started
+    print(
+        f"engine parties={args.games:<7} étapes/s={steps / elapsed:>10.0f} "
+        f"mémoire/partie={per_game / 1024:>6.1f} KiB"
+    )
+
+
+# --- leaderboard : mises à jour/s selon la taille du classement ---
+
+def _seed_leaderboard(path: str, entries: int) -> None:
+    import json
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                f"joueur{i}": {"best_chips": i % 10000, "best_correct": i % 8}
+                for i in range(entries)
+            },
+            f,
+        )
+
+
+def bench_leaderboard(args: argparse.Namespace) -> None:
+    from moneydrop.leaderboard import Leaderboard
+
+    for entries in args.entries:
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "leaderboard.json")
+                _seed_leaderboard(path, entries)
+                started = time.perf_counter()
+                lb = Leaderboard(path, backend=mode)
+                load = time.perf_counter() - started
+
+                done = 0
+                started = time.perf_counter()
+                deadline = started + args.seconds
+                while done < args.updates and time.perf_counter() < deadline:
+                    # Une partie sur deux améliore un score existant, l'autre crée un joueur
+                    name = f"joueur{done * 7919 % entries}" if done % 2 else f"nouveau{done}"
+                    lb.update(name, 10000 + done, 7)
+                    done += 1
+                elapsed = time.perf_counter() - started
+                lb.close()
+                print(
+                    f"leaderboard mode={mode:<8} entrées={entries:<8} "
+                    f"chargement={load * 1000:>8.1f} ms mises à jour/s={done / elapsed:>10.1f}"
+                )
+
+
+# --- ranking : top(10) + rank() en sondage continu sur un grand classement ---
+
+def bench_ranking(args: argparse.Namespace) -> None:
+    import random
+
+    from moneydrop.leaderboard import Leaderboard
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "leaderboard.json")
+        _seed_leaderboard(path, args.entries)
+        lb = Leaderboard(path, backend="journal")
+        names = [f"joueur{i}" for i in range(0, args.entries, 97)]
+        rng = random.Random(1)
+
+        def full_sort_top(n: int):
+            # Comportement d'origine : copie + tri complet à chaque appel
+            entries = list(lb.storage._scores.values())  # noqa: SLF001
+            entries.sort(key=lambda e: (e.best_chips, e.best_correct, e.name.lower()), reverse=True)
+            return entries[:n]
+
+        for label, top in (("index", lb.top), ("tri complet", full_sort_top)):
+            polls = 0
+            started = time.perf_counter()
+            while time.perf_counter() - started < args.seconds:
+                top(10)
+                if label == "index":
+                    lb.rank(rng.choice(names))
+                if polls % args.update_every == 0:
+                    lb.update(rng.choice(names), rng.randint(0, 20000), rng.randint(0, 7))
+                polls += 1
+            elapsed = time.perf_counter() - started
+            print(
+                f"ranking {label:<12} entrées={args.entries:<8} "
+                f"sondages/s={polls / elapsed:>10.1f} "
+                f"(1 mise à jour tous les {args.update_every} sondages)"
+            )
+        lb.close()
+
+
+def _lobby_round(
+    players: int, bets_per_player: int, send, mark=None, advance=None, bet_window: float = 20.0
+) -> None:
+    """Une manche complète d'un salon de `players` joueurs ; `send(lobby)` à chaque diffusion.
+
+    `mark(lobby)` (défaut : `send`) reçoit les mises ; `advance(dt)` fait avancer l'horloge
+    simulée entre deux mises, réparties uniformément sur `bet_window` secondes.
+    """
+    import random
+
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby
+
+    rng = random.Random(players)
+    lobby = RealtimeLobby(lobby_id="bench", host_sid="host", host_name="Hôte", max_players=players)
+    for i in range(players):
+        lobby.add_player(f"sid{i}", f"joueur{i}", f"sock{i}")
+    lobby.start_game(build_question_bank())
+    lobby.launch_question()
+    # Le chrono démarre après la cinématique : on le démarre tout de suite
+    lobby.question_started_at = time.monotonic()
+    send(lobby)
+    mark = mark or send
+    dt = bet_window / max(1, players * bets_per_player)
+    for _ in range(bets_per_player):
+        for i in range(players):
+            if advance is not None:
+                advance(dt)
+            a = rng.randrange(0, 10001, 100)
+            lobby.place_bets(f"sid{i}", {"A": a, "B": 10000 - a, "C": 0, "D": 0})
+            mark(lobby)
+    lobby.validate()
+    send(lobby)
+    lobby.next_question()
+    send(lobby)
+
+
+def bench_lobby(args: argparse.Namespace) -> None:
+    import json
+
+    from moneydrop.realtime import BroadcastScheduler, RealtimeLobby
+
+    for players in args.players:
+        recipients = players + 1  # joueurs + hôte
+        sent = [0, 0]  # octets, diffusions
+
+        def full(lobby, skip_sid=None) -> None:
+            sent[0] += len(json.dumps(lobby.snapshot())) * recipients
+            sent[1] += 1
+
+        def delta(lobby, skip_sid=None) -> None:
+            state, patch = lobby.publish()
+            payload = state if patch is None else patch
+            if payload:
+                sent[0] += len(json.dumps(payload)) * recipients
+                sent[1] += 1
+
+        # Regroupement : horloge simulée, la tâche de fond passe toutes les `period` secondes
+        clock = [0.0]
+        sched = BroadcastScheduler(delta, rate=args.hz, clock=lambda: clock[0])
+        next_tick = [sched.period]
+
+        def advance(dt: float) -> None:
+            target = clock[0] + dt
+            while next_tick[0] <= target:
+                clock[0] = next_tick[0]
+                sched.tick()
+                next_tick[0] += sched.period
+            clock[0] = target
+
+        runs = (
+            ("complet", full, None, None),
+            ("patch", delta, None, None),
+            (f"patch {args.hz:g} Hz", sched.now, sched.mark, advance),
+        )
+        for label, send, mark, adv in runs:
+            sent[:] = [0, 0]
+            started = time.perf_counter()
+            _lobby_round(players, args.bets, send, mark, adv, args.bet_window)
+            elapsed = time.perf_counter() - started
+            print(
+                f"lobby {label:<12} joueurs={players:<5} diffusions={sent[1]:<6} "
+                f"octets/manche={sent[0]:>14,} "
+                f"({elapsed * 1000:.0f} ms)"
+            )
+        print(f"lobby {'':<12} {args.hz:g} Hz : {sched.coalesced} mises absorbées")
+        # Compte à rebours local (échéance absolue dans l'état) : plus de `tick` chaque seconde
+        ticks = recipients * RealtimeLobby.time_limit
+        tick_bytes = ticks * len(json.dumps({"time_remaining": RealtimeLobby.time_limit}))
+        print(
+            f"lobby {'':<12} `tick` supprimés : {ticks} messages "
+            f"({tick_bytes:,} octets) par question"
+        )
+
+
+def _rebuilt_snapshot(lobby) -> dict:
+    # Comportement d'origine : dictionnaire complet reconstruit sous le verrou à chaque appel
+    with lobby.lock:
+        return {
+            "lobby_id": lobby.lobby_id,
+            "phase": lobby.phase,
+            "time_remaining": lobby.time_remaining(),
+            "question_index": lobby.question_index,
+            "question_total": len(lobby.questions) if lobby.questions else lobby.question_total,
+            "question": (
+                lobby.current_question()
+                if lobby.phase in ("question", "paused", "results")
+                else None
+            ),
+            "correct": lobby.correct if lobby.phase == "results" else None,
+            "host_sid": lobby.host_sid,
+            "host_name": lobby.host_name,
+            "players": [
+                {
+                    "sid": p.sid,
+                    "name": p.name,
+                    "score": p.score,
+                    "eliminated": p.eliminated,
+                    "choice": p.choice,
+                    "is_correct": p.is_correct if lobby.phase == "results" else None,
+                    "socket_id": p.socket_id,
+                }
+                for p in lobby.players.values()
+            ],
+        }
+
+
+def bench_snapshot(args: argparse.Namespace) -> None:
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby
+
+    for players in args.players:
+        lobby = RealtimeLobby(
+            lobby_id="bench", host_sid="host", host_name="Hôte", max_players=players
+        )
+        for i in range(players):
+            lobby.add_player(f"sid{i}", f"joueur{i}", f"sock{i}")
+        lobby.start_game(build_question_bank())
+        lobby.launch_question()
+        lobby.question_started_at = time.monotonic()
+        lobby.publish()
+        counter = [0]
+
+        def answer_then(fn):
+            def run():
+                counter[0] += 1
+                lobby.answer(f"sid{counter[0] % players}", "ABCD"[counter[0] % 4])
+                return fn()
+            return run
+
+        cases = (
+            ("reconstruit", lambda: _rebuilt_snapshot(lobby)),
+            ("mémorisé", lobby.snapshot),
+            ("1 réponse+snapshot", answer_then(lobby.snapshot)),
+            ("1 réponse+publish", answer_then(lobby.publish)),
+        )
+        for label, fn in cases:
+            calls = 0
+            started = time.perf_counter()
+            while time.perf_counter() - started < args.seconds:
+                for _ in range(100):
+                    fn()
+                calls += 100
+            elapsed = time.perf_counter() - started
+            print(
+                f"snapshot {label:<20} joueurs={players:<6} µs/appel={elapsed / calls * 1e6:>10.2f}"
+            )
+
+
+def bench_lobby_index(args: argparse.Namespace) -> None:
+    import random
+
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby
+
+    # Traitement d'une mise : recherche du joueur par socket puis place_bets (cohérence des index :
+    # tests/test_lobby_index.py)
+    rng = random.Random(7)
+    lobby = RealtimeLobby(
+        lobby_id="bench", host_sid="host", host_name="Hôte", max_players=args.players
+    )
+    for i in range(args.players):
+        lobby.add_player(f"sid{i}", f"joueur{i}", f"sock{i}")
+    lobby.start_game(build_question_bank())
+    lobby.launch_question()
+
+    def scan(socket_sid: str):
+        # Comportement d'origine : parcours de tous les joueurs
+        for pid, p in lobby.players.items():
+            if p.socket_id == socket_sid:
+                return pid
+        return None
+
+    for label, lookup in (("balayage", scan), ("index", lobby.player_by_socket)):
+        bets = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.seconds:
+            for _ in range(100):
+                i = rng.randrange(args.players)
+                lobby.place_bets(lookup(f"sock{i}"), {"A": 100, "B": 0, "C": 0, "D": 0})
+            bets += 100
+        elapsed = time.perf_counter() - started
+        print(f"lobby-index {label:<9} joueurs={args.players:<6} mises/s={bets / elapsed:>12.0f}")
+
+
+def bench_timers(args: argparse.Namespace) -> None:
+    import json
+    import threading
+
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby, RealtimeLobbyManager
+    from moneydrop.timers import DeadlineScheduler
+
+    # 1) CPU consommé par des salons inactifs : ticker d'origine (sondage chaque seconde) vs
+    # échéances
+    polled = RealtimeLobbyManager()
+    for i in range(args.lobbies):
+        polled.create(f"host{i}", "Hôte", 10, 30)
+    stop = threading.Event()
+
+    def ticker() -> None:
+        # Comportement d'origine : copie du dict, parcours de tous les salons, un tick par salon
+        while not stop.is_set():
+            for lobby in polled.all().values():
+                if lobby.phase == "question" and (lobby.time_remaining() or 0) <= 0:
+                    lobby.validate()
+                json.dumps({"time_remaining": lobby.time_remaining()})
+            stop.wait(1.0)
+
+    scheduler = DeadlineScheduler()
+    scheduled = RealtimeLobbyManager(scheduler=scheduler, on_expire=lambda lobby: lobby.validate())
+    for i in range(args.lobbies):
+        scheduled.create(f"host{i}", "Hôte", 10, 30)
+
+    for label, target, halt in (
+        ("ticker 1 s", ticker, stop.set),
+        ("échéances", scheduler.run, scheduler.close),
+    ):
+        thread = threading.Thread(target=target, daemon=True)
+        cpu = time.process_time()
+        thread.start()
+        time.sleep(args.seconds)
+        used = time.process_time() - cpu
+        halt()
+        thread.join()
+        print(
+            f"timers {label:<10} salons inactifs={args.lobbies:<6} "
+            f"CPU={used / args.seconds * 100:>6.2f} % "
+            f"({used * 1000:.0f} ms en {args.seconds:g} s)"
+        )
+
+    # 2) Précision : retard entre l'échéance d'une question et sa validation
+    scheduler = DeadlineScheduler()
+    scheduler.start()
+    delays = []
+    deadlines = {}
+    done = threading.Event()
+
+    def on_expire(lobby) -> None:
+        delays.append(time.monotonic() - deadlines[lobby.lobby_id])
+        lobby.validate()
+        if len(delays) == args.active:
+            done.set()
+
+    questions = build_question_bank()
+    for i in range(args.active):
+        lobby = RealtimeLobby(
+            lobby_id=f"actif{i}", host_sid="host", host_name="Hôte", time_limit=1,
+            scheduler=scheduler, on_expire=on_expire,
+        )
+        lobby.CINEMATIC_DELAY_SECONDS = i % 10 / 10
+        lobby.add_player("sid", "joueur", "sock")
+        lobby.start_game(questions)
+        lobby.launch_question()
+        deadlines[lobby.lobby_id] = lobby.deadline()
+    done.wait(10)
+    scheduler.close()
+    delays.sort()
+    pct = lambda q: delays[min(len(delays) - 1, int(q * len(delays)))] * 1000  # noqa: E731
+    print(
+        f"timers précision   questions={len(delays):<6} retard p50={pct(0.5):.2f} ms "
+        f"p99={pct(0.99):.2f} ms max={delays[-1] * 1000:.2f} ms"
+    )
+
+
+def bench_lobbies(args: argparse.Namespace) -> None:
+    import json
+    import random
+
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobbyManager
+
+    def scan(manager: RealtimeLobbyManager) -> str:
+        # Comportement d'origine : filtre de tous les salons à chaque requête
+        available = []
+        for lobby_id, lobby in manager.all().items():
+            if lobby.phase == "waiting" and len(lobby.players) < lobby.max_players:
+                available.append({
+                    "lobby_id": lobby_id,
+                    "host_name": lobby.host_name,
+                    "players": len(lobby.players),
+                    "max_players": lobby.max_players,
+                    "time_limit": lobby.time_limit,
+                    "question_total": lobby.question_total,
+                })
+        return json.dumps({"ok": True, "lobbies": available}, ensure_ascii=False)
+
+    # 1) Cohérence : après chaque opération aléatoire, l'annuaire = le filtre complet
+    rng = random.Random(11)
+    questions = build_question_bank()
+    manager = RealtimeLobbyManager()
+    lobbies = [manager.create(f"host{i}", f"Hôte{i}", 3, 30) for i in range(20)]
+    for step in range(args.checks):
+        lobby = rng.choice(lobbies)
+        op = rng.random()
+        try:
+            if op < 0.4:
+                lobby.add_player(f"sid{rng.randrange(6)}", "joueur")
+            elif op < 0.6:
+                lobby.remove_player(f"sid{rng.randrange(6)}")
+            elif op < 0.7:
+                lobby.start_game(questions)
+                lobby.launch_question()
+            elif op < 0.8:
+                lobby.validate()
+            elif op < 0.9:
+                lobby.next_question()
+            else:
+                lobbies.append(manager.create("host", "Hôte", 3, 30))
+        except ValueError:
+            pass  # salon plein
+        etag, body = manager.joinable()
+        expected = {e["lobby_id"]: e for e in json.loads(scan(manager))["lobbies"]}
+        actual = {e["lobby_id"]: e for e in json.loads(body)["lobbies"]}
+        if actual != expected or etag != manager.listing_etag():
+            raise SystemExit(f"annuaire incohérent après {step + 1} opérations")
+    print(
+        f"lobbies cohérence: {args.checks} opérations sur {len(lobbies)} salons, "
+        "annuaire identique au filtre"
+    )
+
+    # 2) Coût d'une requête du menu selon le nombre de salons (1 sur 10 joignable)
+    for count in args.lobbies:
+        manager = RealtimeLobbyManager()
+        for i in range(count):
+            lobby = manager.create(f"host{i}", f"Hôte{i}", 10, 30)
+            lobby.add_player("sid", "joueur")
+            if i % 10:
+                lobby.start_game(questions)
+                lobby.launch_question()
+        etag = manager.listing_etag()
+        runs = (
+            ("filtre", lambda: scan(manager)),
+            ("annuaire", manager.joinable),
+            ("304", lambda: manager.listing_etag() == etag),
+        )
+        for label, call in runs:
+            calls = 0
+            started = time.perf_counter()
+            while time.perf_counter() - started < args.seconds:
+                for _ in range(10):
+                    call()
+                calls += 10
+            elapsed = time.perf_counter() - started
+            print(f"lobbies {label:<9} salons={count:<6} µs/requête={elapsed / calls * 1e6:>10.2f}")
+
+
+def bench_reaper(args: argparse.Namespace) -> None:
+    import random
+
+    from moneydrop.reaper import DEFAULT_TTLS, CapacityError, Reaper
+    from moneydrop.realtime import RealtimeLobbyManager
+    from moneydrop.session import SessionManager
+
+    class Obj:
+        __slots__ = ("phase", "last_activity")
+
+        def __init__(self, phase: str, now: float):
+            self.phase = phase
+            self.last_activity = now
+
+    ttls = {"waiting": 600.0, "playing": 1800.0, "finished": 120.0}
+    phases = list(ttls)
+
+    # 1) Cohérence (horloge simulée) : après chaque balayage, vivants = objets non échus
+    rng = random.Random(5)
+    clock = [0.0]
+    present = {}
+    reaper = Reaper(
+        lambda o: o.phase, lambda key, obj: present.pop(key), ttls, clock=lambda: clock[0]
+    )
+    for step in range(args.checks):
+        op = rng.random()
+        key = f"k{rng.randrange(2000)}"
+        if op < 0.3:
+            if key not in present:
+                present[key] = Obj(rng.choice(phases), clock[0])
+                reaper.add(key, present[key])
+        elif op < 0.6 and key in present:
+            present[key].last_activity = clock[0]
+        elif op < 0.7 and key in present:
+            # Changement de phase = activité (comme les sessions et salons)
+            present[key].phase = rng.choice(phases)
+            present[key].last_activity = clock[0]
+        elif op < 0.75 and key in present:
+            del present[key]
+            reaper.discard(key)
+        else:
+            clock[0] += rng.random() * 60
+            reaper.sweep()
+            late = [k for k, o in present.items() if o.last_activity + ttls[o.phase] <= clock[0]]
+            if late or len(reaper) != len(present):
+                raise SystemExit(
+                    f"balayage incohérent après {step + 1} opérations ({len(late)} objets échus)"
+                )
+    print(
+        f"reaper cohérence: {args.checks} opérations, "
+        f"{reaper.expired} expirations conformes aux durées"
+    )
+
+    # 2) Plafond : seules les parties terminées sont évincées, les moins récemment actives d'abord
+    # (horloge remise à 1000 s : aucune partie en cours n'est échue)
+    clock[0] = 1000.0
+    present = {}
+    created = {}
+    reaper = Reaper(
+        lambda o: o.phase,
+        lambda key, obj: present.pop(key),
+        ttls,
+        max_live=2500,
+        clock=lambda: clock[0],
+    )
+    for i in range(3000):
+        # 2500 objets d'activité quelconque, puis des créations plus récentes qui déclenchent
+        # l'éviction
+        activity = rng.random() * 1000 if i < 2500 else 1000.0 + i
+        created[f"k{i}"] = present[f"k{i}"] = Obj("finished" if i % 3 else "playing", activity)
+        reaper.add(f"k{i}", present[f"k{i}"])
+    evicted = [o.last_activity for k, o in created.items() if k not in present]
+    kept = [o.last_activity for o in present.values() if o.phase == "finished"]
+    if (
+        len(present) > 2500
+        or sum(o.phase == "playing" for o in present.values()) != 1000
+        or any(created[k].phase != "finished" for k in created if k not in present)
+        or max(evicted) > min(kept)
+    ):
+        raise SystemExit("éviction incorrecte")
+    print(
+        f"reaper plafond: 3000 créations, {len(present)} vivants, "
+        f"{reaper.evicted} parties terminées évincées (LRU)"
+    )
+
+    # Sans partie terminée, aucune partie en cours n'est coupée : les créations au-delà du plafond
+    # sont refusées, et un refus ne reparcourt pas tout le tas
+    present = {}
+    reaper = Reaper(lambda o: o.phase, lambda key, obj: present.pop(key), ttls, max_live=2500)
+    order = list(range(20000))
+    rng.shuffle(order)
+    admitted = []
+    t0 = time.perf_counter()
+    for i in order:
+        try:
+            reaper.admit()
+        except CapacityError:
+            continue
+        present[f"k{i}"] = Obj("playing", time.time())
+        reaper.add(f"k{i}", present[f"k{i}"])
+        admitted.append(f"k{i}")
+    elapsed = time.perf_counter() - t0
+    if (
+        len(present) != 2500
+        or len(reaper) != len(present)
+        or set(admitted) != set(present)
+        or reaper.refused != 20000 - 2500
+    ):
+        raise SystemExit(f"plafond incorrect : {len(present)} vivants pour 2500")
+    print(
+        f"reaper plafond: 20000 parties en cours, {len(present)} vivants, "
+        f"{reaper.refused} créations refusées, {elapsed / 20000 * 1e6:.1f} µs par création"
+    )
+
+    # 3) Gestionnaires réels : session et salon expirés, annuaire vidé
+    sessions = SessionManager(ttls={"playing": 0.0})
+    sessions.create(type("S", (), {"finished": False, "eliminated": False, "last_activity": 0.0})())
+    rt = RealtimeLobbyManager(ttls={"waiting": 0.0})
+    lobby = rt.create("host", "Hôte", 10, 30)
+    lobby.last_activity = 0.0
+    if (
+        sessions.reaper.sweep() != 1
+        or rt.reaper.sweep() != 1
+        or rt.get(lobby.lobby_id)
+        or '"lobbies": []' not in rt.joinable()[1]
+    ):
+        raise SystemExit("gestionnaires : expiration incomplète")
+    print("reaper gestionnaires: session et salon expirés, annuaire vidé")
+
+    # 4) Coût d'un balayage (rien d'échu) vs parcours complet façon cleanup_inactive
+    for count in args.objects:
+        objs = {f"k{i}": Obj(rng.choice(phases), time.time()) for i in range(count)}
+        reaper = Reaper(lambda o: o.phase, lambda key, obj: None, DEFAULT_TTLS)
+        for key, obj in objs.items():
+            reaper.add(key, obj)
+
+        def scan() -> list:
+            now = time.time()
+            return [k for k, o in objs.items() if now - o.last_activity > 3600]
+
+        for label, call in (("parcours", scan), ("tas", reaper.sweep)):
+            calls = 0
+            started = time.perf_counter()
+            while time.perf_counter() - started < args.seconds:
+                call()
+                calls += 1
+            elapsed = time.perf_counter() - started
+            print(f"reaper {label:<9} objets={count:<7} µs/balayage={elapsed / calls * 1e6:>10.2f}")
+
+
+def bench_sessions(args: argparse.Namespace) -> None:
+    import random
+    import secrets
+    import threading
+
+    from moneydrop.reaper import Reaper
+    from moneydrop.session import SessionManager
+
+    class SingleLock:
+        # Comportement d'origine : un seul verrou pour get/create/delete
+        def __init__(self):
+            self._lock = threading.Lock()
+            self._sessions = {}
+            self.reaper = Reaper(lambda s: "playing", lambda key, obj: None)
+
+        def create(self, session) -> str:
+            session_id = secrets.token_urlsafe(24)
+            with self._lock:
+                self._sessions[session_id] = session
+            self.reaper.add(session_id, session)
+            return session_id
+
+        def get(self, session_id: str):
+            with self._lock:
+                return self._sessions.get(session_id)
+
+    class Session:
+        finished = eliminated = False
+
+        def __init__(self):
+            self.last_activity = time.time()
+
+    def locked_reads() -> SessionManager:
+        manager = SessionManager(stripes=args.stripes)
+        manager.lock_free_reads = False
+        return manager
+
+    variants = (
+        ("1 verrou", SingleLock),
+        (f"{args.stripes} tranches", locked_reads),
+        (f"{args.stripes} tr.+lect.", lambda: SessionManager(stripes=args.stripes)),
+    )
+    for threads in args.threads:
+        for label, factory in variants:
+            manager = factory()
+            ids = [manager.create(Session()) for _ in range(args.sessions)]
+            per_thread = args.ops // threads
+            barrier = threading.Barrier(threads + 1)
+
+            def worker(seed: int) -> None:
+                rng = random.Random(seed)
+                barrier.wait()
+                for _ in range(per_thread):
+                    # Trafic mixte : surtout des lectures (/api/state, /api/bet), quelques créations
+                    if rng.random() < args.create_ratio:
+                        manager.create(Session())
+                    else:
+                        manager.get(ids[rng.randrange(len(ids))])
+
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            for t in workers:
+                t.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for t in workers:
+                t.join()
+            elapsed = time.perf_counter() - started
+            print(
+                f"sessions {label:<13} threads={threads:<4} "
+                f"ops/s={per_thread * threads / elapsed:>12,.0f}"
+            )
+
+
+def bench_resolve(args: argparse.Namespace) -> None:
+    import random
+
+    from moneydrop import resolution
+    from moneydrop.engine import MoneyDropEngine
+    from moneydrop.models import GameConfig
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby
+    from moneydrop.session import Lobby, LobbyPlayer
+
+    if not resolution.VECTORIZE:
+        raise SystemExit(
+            "résolution vectorisée indisponible (NumPy absent ou MONEYDROP_VECTORIZE=0)"
+        )
+    questions = build_question_bank()
+    engine = MoneyDropEngine(questions)
+    config = GameConfig(question_count=3)
+
+    def rt_round(players: int, vectorize: bool, seed: int):
+        rng = random.Random(seed)
+        lobby = RealtimeLobby(
+            lobby_id="bench",
+            host_sid="host",
+            host_name="Hôte",
+            max_players=players,
+            vectorize=vectorize,
+        )
+        for i in range(players):
+            lobby.add_player(f"sid{i}", f"joueur{i}", f"sock{i}", f"10.0.{i // 250}.{i % 250}")
+        lobby.start_game(questions)
+        elapsed = 0.0
+        for _ in range(2):  # deux manches : la seconde part de joueurs déjà éliminés
+            lobby.launch_question()
+            for i in range(players):
+                if rng.random() < 0.9:  # 10 % ne misent pas
+                    a, b = rng.randrange(0, 10001, 100), rng.randrange(0, 10001, 100)
+                    lobby.place_bets(
+                        f"sid{i}", {"A": a, "B": b, "C": 0, "D": rng.randrange(0, 500)}
+                    )
+            started = time.perf_counter()
+            lobby.validate()
+            elapsed += time.perf_counter() - started
+            lobby.next_question()
+        state = [
+            (p.score, p.is_correct, p.eliminated, tuple(p.bets.values()))
+            for p in lobby.players.values()
+        ]
+        return elapsed, (state, sorted(lobby.banned_sids), sorted(lobby.banned_ips))
+
+    def http_round(players: int, vectorize: bool, seed: int):
+        rng = random.Random(seed)
+        engine._rng = random.Random(seed)  # noqa: SLF001 (mêmes questions pour les deux chemins)
+        creator = LobbyPlayer("s0", "joueur0", 10000)
+        lobby = Lobby("bench", engine, config, players, creator, vectorize=vectorize)
+        for i in range(1, players):
+            lobby.join(LobbyPlayer(f"s{i}", f"joueur{i}", 10000))
+        lobby.start()
+        # Tous sauf un soumettent : la manche est résolue explicitement, pour la chronométrer
+        for i in range(players - 1):
+            a = rng.randrange(0, 5001, 100)
+            lobby.submit(f"s{i}", {"A": a, "B": rng.randrange(0, 5001, 100), "C": 0, "D": 0})
+        started = time.perf_counter()
+        with lobby._lock:  # noqa: SLF001
+            lobby._resolve_round()  # noqa: SLF001
+        elapsed = time.perf_counter() - started
+        return elapsed, ([(p.chips, p.correct_answers) for p in lobby.players], lobby.last_results)
+
+    for label, run in (("temps réel", rt_round), ("HTTP", http_round)):
+        for players in args.players:
+            scalar, scalar_state = run(players, False, players)
+            vector, vector_state = run(players, True, players)
+            if scalar_state != vector_state:
+                raise SystemExit(
+                    f"{label} {players} joueurs : résultats différents entre boucle et NumPy"
+                )
+            print(
+                f"resolve {label:<10} joueurs={players:<7} boucle={scalar * 1000:>9.2f} ms "
+                f"numpy={vector * 1000:>9.2f} ms  x{scalar / vector:>5.1f}  résultats identiques"
+            )
+
+
+def _spread(rng, chips: int) -> dict:
+    # Mise répartie sur les 4 réponses, au plus un quart des jetons chacune
+    quarter = chips // 4
+    return {k: quarter - rng.randrange(0, quarter // 4 + 1) for k in "ABCD"}
+
+
+def bench_players(args: argparse.Namespace) -> None:
+    import gc
+    import random
+    from dataclasses import dataclass, field
+    from typing import Optional
+
+    from moneydrop.engine import MoneyDropEngine
+    from moneydrop.models import GameConfig
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby
+    from moneydrop.session import Lobby, LobbyPlayer
+
+    questions = build_question_bank()
+    engine = MoneyDropEngine(questions)
+
+    def realtime(players: int, rng: random.Random):
+        lobby = RealtimeLobby(
+            lobby_id="bench", host_sid="host", host_name="Hôte", max_players=players
+        )
+        for i in range(players):
+            ip = f"10.{i // 62500}.{i // 250 % 250}.{i % 250}"
+            lobby.add_player(f"sid{i}", f"joueur{i}", f"sock{i}", ip)
+        lobby.start_game(questions)
+        revealed = []
+
+        def bet() -> None:
+            # 5 % ne misent pas (éliminés) ; les autres couvrent les 4 réponses et restent en jeu
+            for i in range(players):
+                p = lobby.players[f"sid{i}"]
+                if not p.eliminated and rng.random() < 0.95:
+                    lobby.place_bets(p.sid, _spread(rng, p.score))
+
+        def placed() -> dict:
+            return {sid: p.bets for sid, p in lobby.players.items()}
+
+        def transition() -> None:
+            # Manche complète hors mises : révélation, question suivante, lancement
+            lobby.validate()
+            revealed.append(lobby.correct)
+            lobby.next_question()
+            lobby.launch_question()
+
+        def check(placed: dict) -> None:
+            # Premier tour : score = mise sur la bonne réponse (0, et éliminé, sans mise)
+            for sid, p in lobby.players.items():
+                expected = placed[sid][revealed[0]]
+                if p.score != expected or p.eliminated != (expected <= 0):
+                    raise SystemExit(f"joueurs {sid} : score {p.score} != {expected}")
+
+        lobby.launch_question()
+        return lobby, bet, placed, transition, check
+
+    @dataclass
+    class RTPlayerDataclass:
+        # Comportement d'origine : un objet par joueur et un dictionnaire de mises par manche
+        sid: str
+        name: str
+        score: int = 10000
+        choice: Optional[str] = None
+        is_correct: Optional[bool] = None
+        eliminated: bool = False
+        bets: dict = field(default_factory=lambda: {"A": 0, "B": 0, "C": 0, "D": 0})
+        socket_id: Optional[str] = None
+        ip: Optional[str] = None
+
+    def realtime_dataclass(players: int, rng: random.Random):
+        # Joueurs et index (socket, nom, IP) du salon temps réel d'origine ; manche rejouée
+        # joueur par joueur comme validate / next_question / launch_question d'alors
+        lobby = {}
+        by_socket, by_name, by_ip = {}, {}, {}
+        for i in range(players):
+            ip = f"10.{i // 62500}.{i // 250 % 250}.{i % 250}"
+            p = lobby[f"sid{i}"] = RTPlayerDataclass(
+                f"sid{i}", f"joueur{i}", socket_id=f"sock{i}", ip=ip
+            )
+            by_socket[p.socket_id] = p.sid
+            by_name.setdefault(p.name, {})[p.sid] = None
+            by_ip.setdefault(ip, {})[p.sid] = None
+        revealed = []
+        index = [0]
+
+        def launch() -> None:
+            for p in lobby.values():
+                p.choice = None
+                p.is_correct = None
+                if not p.eliminated:
+                    p.bets = {"A": 0, "B": 0, "C": 0, "D": 0}
+
+        def bet() -> None:
+            for i in range(players):
+                p = lobby[f"sid{i}"]
+                if not p.eliminated and rng.random() < 0.95:
+                    placed = {k: int(v) for k, v in _spread(rng, p.score).items()}
+                    if sum(placed.values()) <= p.score:
+                        p.bets = placed
+
+        def placed() -> dict:
+            return {sid: p.bets for sid, p in lobby.items()}
+
+        def transition() -> None:
+            correct = questions[index[0] % len(questions)].correct
+            revealed.append(correct)
+            for p in lobby.values():
+                if p.eliminated:
+                    p.is_correct = None
+                    continue
+                if sum(p.bets.values()) == 0:
+                    p.score = 0
+                    p.is_correct = False
+                else:
+                    p.score = p.bets.get(correct, 0)
+                    p.is_correct = p.score > 0
+                if p.score <= 0:
+                    p.eliminated = True
+                    p.score = 0
+                    p.bets = {"A": 0, "B": 0, "C": 0, "D": 0}
+            index[0] += 1
+            for p in lobby.values():
+                p.choice = None
+                p.is_correct = None
+                if not p.eliminated:
+                    p.bets = {"A": 0, "B": 0, "C": 0, "D": 0}
+            launch()
+
+        def check(placed: dict) -> None:
+            for sid, p in lobby.items():
+                expected = placed[sid][revealed[0]]
+                if p.score != expected or p.eliminated != (expected <= 0):
+                    raise SystemExit(f"joueurs {sid} : score {p.score} != {expected}")
+
+        launch()
+        return (lobby, by_socket, by_name, by_ip), bet, placed, transition, check
+
+    @dataclass
+    class LobbyPlayerDataclass:
+        session_id: str
+        name: str
+        chips: int
+        correct_answers: int = 0
+
+    def http_dataclass(players: int, rng: random.Random):
+        # Salon HTTP d'origine : mises gardées en dictionnaires, résultats construits pendant la
+        # résolution
+        members = [LobbyPlayerDataclass(f"s{i}", f"joueur{i}", 10000) for i in range(players)]
+        state = {"index": 0, "submissions": {}, "last_results": {}}
+
+        def bet() -> None:
+            for p in members[:-1]:
+                state["submissions"][p.session_id] = _spread(rng, p.chips)
+
+        def placed() -> dict:
+            return dict(state["submissions"])
+
+        def transition() -> None:
+            q = questions[state["index"] % len(questions)]
+            for p in members:
+                bets = state["submissions"].get(p.session_id, {"A": 0, "B": 0, "C": 0, "D": 0})
+                bet_total = sum(bets.values())
+                unbet = max(0, p.chips - bet_total)
+                correct_bet = bets.get(q.correct, 0)
+                p.chips = correct_bet + unbet
+                if correct_bet > 0:
+                    p.correct_answers += 1
+                state["last_results"][p.session_id] = {
+                    "correct": q.correct,
+                    "correct_label": q.answers[q.correct],
+                    "kept": p.chips,
+                    "lost": bet_total - correct_bet,
+                    "bet_total": bet_total,
+                    "unbet": unbet,
+                    "explanation": q.explanation,
+                    "correct_bet": correct_bet,
+                }
+            state["index"] += 1
+            state["submissions"] = {}
+
+        def check(placed: dict) -> None:
+            for p in members:
+                r = state["last_results"][p.session_id]
+                bets = placed.get(p.session_id, {})
+                expected = bets.get(r["correct"], 0) + max(0, 10000 - sum(bets.values()))
+                if p.chips != expected:
+                    raise SystemExit(f"joueurs {p.session_id} : jetons {p.chips} != {expected}")
+
+        return (members, state), bet, placed, transition, check
+
+    def http(players: int, rng: random.Random):
+        engine._rng = random.Random(players)  # noqa: SLF001
+        creator = LobbyPlayer("s0", "joueur0", 10000)
+        lobby = Lobby("bench", engine, GameConfig(question_count=10), players, creator)
+        for i in range(1, players):
+            lobby.join(LobbyPlayer(f"s{i}", f"joueur{i}", 10000))
+        lobby.start()
+
+        def bet() -> None:
+            # Tous sauf un : la manche n'est pas résolue par la dernière soumission
+            for p in lobby.players[:-1]:
+                lobby.submit(p.session_id, _spread(rng, p.chips))
+
+        def placed() -> dict:
+            return dict(lobby.submissions)
+
+        def transition() -> None:
+            with lobby._lock:  # noqa: SLF001
+                lobby._resolve_round()  # noqa: SLF001
+
+        def check(placed: dict) -> None:
+            for p in lobby.players:
+                r = lobby.last_results[p.session_id]
+                bets = placed.get(p.session_id, {})
+                expected = bets.get(r["correct"], 0) + max(0, 10000 - sum(bets.values()))
+                if p.chips != expected:
+                    raise SystemExit(f"joueurs {p.session_id} : jetons {p.chips} != {expected}")
+
+        return lobby, bet, placed, transition, check
+
+    variants = (
+        ("temps réel", "dataclass", realtime_dataclass),
+        ("temps réel", "colonnes", realtime),
+        ("HTTP", "dataclass", http_dataclass),
+        ("HTTP", "colonnes", http),
+    )
+    for label, model, build in variants:
+        for players in args.players:
+            rng = random.Random(players)
+            gc.collect()
+            tracemalloc.start()
+            # Salon en cours de question, mises placées
+            lobby, bet, placed, transition, check = build(players, rng)
+            bet()
+            gc.collect()
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            expected = placed()
+            started = time.perf_counter()
+            transition()
+            first = time.perf_counter() - started
+            check(expected)
+            timings = [first]
+            for _ in range(args.rounds - 1):
+                bet()
+                started = time.perf_counter()
+                transition()
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(
+                f"players {label:<10} {model:<9} joueurs={players:<7} "
+                f"octets/joueur={size / players:>7.0f} "
+                f"transition médiane={timings[len(timings) // 2] * 1000:>8.2f} ms"
+            )
+            del lobby, bet, placed, transition, check, expected
+
+
+def bench_offload(args: argparse.Namespace) -> None:
+    import json
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from moneydrop.offload import LobbyWorkers, encode as encode_json
+    from moneydrop.realtime import RealtimeLobby
+
+    # Boucle simulée par le thread principal : mises des petits salons à heure fixe, pendant qu'un
+    # grand salon renvoie son état complet encodé (travail lourd) ; latence arrivée → émission
+    def build(lobby_id: str, players: int) -> RealtimeLobby:
+        lobby = RealtimeLobby(
+            lobby_id=lobby_id, host_sid="host", host_name="Hôte", max_players=players
+        )
+        for i in range(players):
+            lobby.add_player(
+                f"sid{i}",
+                f"joueur{i}",
+                f"{lobby_id}-sock{i}",
+                f"10.{i // 62500}.{i // 250 % 250}.{i % 250}",
+            )
+        lobby.start_game([])
+        return lobby
+
+    big = build("grand", args.players)
+    small = [build(f"petit{k}", 10) for k in range(args.lobbies)]
+    events = []
+    for k in range(int(args.seconds * 1000 / args.interval)):
+        events.append((k * args.interval / 1000, 0, small[k % len(small)], k // len(small) % 10))
+    for k in range(int(args.seconds * 1000 / args.every)):
+        events.append((k * args.every / 1000, 1, big, k))
+    events.sort(key=lambda e: e[:2])
+
+    def run(offload: bool):
+        pool = ThreadPoolExecutor(args.threads)
+
+        def spawn(fn, *a) -> None:
+            threading.Thread(target=fn, args=a, daemon=True).start()
+
+        workers = LobbyWorkers(
+            lambda fn: pool.submit(fn).result(),
+            spawn,
+            args.players if offload else 0,
+            clock=time.perf_counter,
+        )
+        order: dict = {}
+        pending = [0]
+        idle = threading.Condition()
+        payloads = []
+
+        def done(lobby_id: str, seq: int):
+            def emit(result) -> None:
+                order.setdefault(lobby_id, []).append(seq)
+                if result is not None:
+                    payloads.append(result)
+                with idle:
+                    pending[0] -= 1
+                    idle.notify_all()
+            return emit
+
+        def encode() -> str:
+            # Par tranches (voir `offload.encode`) ; un seul json.dumps garderait le GIL
+            return encode_json(big.current_state())
+
+        started = time.perf_counter()
+        for seq, (at, kind, lobby, i) in enumerate(events):
+            delay = started + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with idle:
+                pending[0] += 1
+            if kind == 0:
+                work = lambda lobby=lobby, i=i: lobby.place_bets(f"sid{i}", {"A": i + 1})  # noqa: E731
+                workers.submit(lobby, work, done(lobby.lobby_id, seq), since=started + at)
+            else:
+                # Un joueur du grand salon change (nouvelle version), puis état complet encodé
+                with idle:
+                    pending[0] += 1
+                work = lambda i=i: big.place_bets(f"sid{i % args.players}", {"B": i + 1})  # noqa: E731
+                workers.submit(big, work, done("grand", seq), since=started + at)
+                workers.submit(big, encode, done("grand", seq), heavy=True, since=started + at)
+        with idle:
+            idle.wait_for(lambda: pending[0] == 0, timeout=60)
+        pool.shutdown()
+        for lobby_id, seqs in order.items():
+            if seqs != sorted(seqs):
+                raise SystemExit(f"offload {lobby_id} : émissions dans le désordre")
+        if json.loads(payloads[-1]) != big.current_state():
+            raise SystemExit("offload : dernier état encodé différent de l'état du salon")
+        return workers
+
+    results = {}
+    for label, offload in (("boucle", False), ("pool", True)):
+        workers = run(offload)
+        stats = workers.stats(top=len(small) + 1)["lobbies"]
+        worst = max((stats[lobby.lobby_id] for lobby in small), key=lambda s: s["p99_ms"])
+        results[label] = worst
+        print(
+            f"offload {label:<6} grand salon={args.players} joueurs "
+            f"p99={stats['grand']['p99_ms']:>8.1f} ms  "
+            f"petits salons (pire) p50={worst['p50_ms']:>7.2f} ms p99={worst['p99_ms']:>7.2f} ms "
+            f"max={worst['max_ms']:>7.1f} ms  déportés={workers.offloaded}"
+        )
+    print(
+        "offload petits salons p99 : "
+        f"x{results['boucle']['p99_ms'] / max(results['pool']['p99_ms'], 1e-3):.1f} "
+        "plus court, émissions dans l'ordre par salon"
+    )
+
+
+def bench_cluster(args: argparse.Namespace) -> None:
+    import json
+    import multiprocessing
+    import random
+    import threading
+
+    from moneydrop.cluster import Broker, BrokerClient, owner_of
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby
+
+    # Mêmes salons répartis sur 1, 2, 4… processus (par lobby_id) ; chaque manche d'un salon
+    # (mises, validation, état) est diffusée par le courtier, comme un emit Socket.IO
+    questions = build_question_bank()
+    ids = [f"salon{k}" for k in range(args.lobbies)]
+    broker = Broker(port=0).start()
+    received: dict = {}
+    lock = threading.Lock()
+
+    def listen() -> None:
+        for message in BrokerClient("127.0.0.1", broker.port).listen("bench"):
+            with lock:
+                received.setdefault(message["lobby"], []).append(
+                    (message["worker"], message["round"])
+                )
+
+    threading.Thread(target=listen, daemon=True).start()
+    while broker.subscribers("bench") == 0:
+        time.sleep(0.01)
+
+    def worker(index: int, count: int, start, out) -> None:
+        rng = random.Random(index)
+        client = BrokerClient("127.0.0.1", broker.port)
+        lobbies = []
+        for lobby_id in ids:
+            if owner_of(lobby_id, count) != index:
+                continue
+            lobby = RealtimeLobby(
+                lobby_id=lobby_id, host_sid="host", host_name="Hôte", max_players=args.players
+            )
+            for i in range(args.players):
+                lobby.add_player(f"sid{i}", f"joueur{i}", f"sock{i}", f"10.0.{i // 250}.{i % 250}")
+            lobby.start_game(questions)
+            lobbies.append(lobby)
+        start.wait()
+        for rnd in range(args.rounds):
+            for lobby in lobbies:
+                lobby.launch_question()
+                for p in list(lobby.players.values()):
+                    if not p.eliminated:
+                        lobby.place_bets(p.sid, _spread(rng, p.score))
+                lobby.validate()
+                state, patch = lobby.publish()
+                data = json.dumps(state if patch is None else patch, separators=(",", ":"))
+                client.publish(
+                    "bench",
+                    f'{{"lobby":"{lobby.lobby_id}","worker":{index},"round":{rnd},"data":{data}}}',
+                )
+                lobby.next_question()
+        out.put((index, len(lobbies), time.perf_counter()))
+
+    ctx = multiprocessing.get_context("fork")
+    cores = os.cpu_count() or 1
+    base = None
+    for count in args.workers:
+        with lock:
+            received.clear()
+        start, out = ctx.Barrier(count + 1), ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(i, count, start, out)) for i in range(count)]
+        for proc in procs:
+            proc.start()
+        start.wait()
+        started = time.perf_counter()
+        results = [out.get(timeout=600) for _ in procs]
+        elapsed = max(end for _, _, end in results) - started
+        for proc in procs:
+            proc.join()
+        expected = args.lobbies * args.rounds
+        deadline = time.monotonic() + 10
+        while sum(len(v) for v in received.values()) < expected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with lock:
+            # Chaque salon : un seul processus propriétaire, ses manches toutes reçues, dans l'ordre
+            for lobby_id in ids:
+                got = received.get(lobby_id, [])
+                if [r for _, r in got] != list(range(args.rounds)):
+                    raise SystemExit(f"cluster {lobby_id} : manches reçues {[r for _, r in got]}")
+                if {w for w, _ in got} != {owner_of(lobby_id, count)}:
+                    raise SystemExit(
+                        f"cluster {lobby_id} : diffusé par {sorted({w for w, _ in got})}"
+                    )
+        rate = expected / elapsed
+        base = base or rate
+        usable = min(count, cores)
+        sizes = sorted(n for _, n, _ in results)
+        print(
+            f"cluster processus={count:<3} salons/processus={sizes[0]}..{sizes[-1]:<5} "
+            f"manches/s={rate:>8.0f}  x{rate / base:>4.2f} (efficacité {rate / base / usable:.0%} "
+            f"sur {usable} cœur{'s' if usable > 1 else ''})  "
+            f"salons tenus à 1 manche/30 s={rate * 30:>7.0f}"
+        )
+    print(
+        f"cluster {cores} cœur(s) ; manches toutes reçues par le courtier, "
+        "un seul processus par salon"
+    )
+
+    # Classement partagé : une partie finie dans un processus est vue par les autres (ETag,
+    # classements glissants, soirée, position poussée) ; base SQLite commune
+    from moneydrop.cluster import LeaderboardRelay
+    from moneydrop.leaderboard import Leaderboard
+
+    with tempfile.TemporaryDirectory() as tmp:
+        boards = [
+            Leaderboard(os.path.join(tmp, "leaderboard.json"), backend="sqlite") for _ in range(2)
+        ]
+        relays = [
+            LeaderboardRelay(BrokerClient("127.0.0.1", broker.port), i, lb)
+            for i, lb in enumerate(boards)
+        ]
+        for relay in relays:
+            threading.Thread(target=relay.listen, daemon=True).start()
+        while broker.subscribers("leaderboard") < 2:
+            time.sleep(0.01)
+        pushed: list = []
+        boards[1].on_rank_change(lambda *change: pushed.append(change))
+        etag = boards[1].etag()
+        boards[1].render(10)
+        relays[0].event("soirée")
+        boards[0].update("alice", 12000, 5)
+        deadline = time.monotonic() + 5
+        while relays[1].received < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        other = boards[1]
+        if (
+            other.etag() == etag
+            or "alice" not in other.render(10)
+            or [e.name for e in other.top(5, "day")] != ["alice"]
+            or [e.name for e in other.top(5, "event")] != ["alice"]
+            or pushed != [("alice", None, 1)]
+        ):
+            raise SystemExit("cluster : amélioration d'un autre processus non vue")
+        for lb in boards:
+            lb.close()
+    print(
+        "cluster classement : ETag, fenêtres, soirée et position poussée vus par l'autre processus"
+    )
+
+
+def _free_ports(count: int) -> int:
+    # `count` ports consécutifs libres : un processus web par port
+    while True:
+        base = _free_port()
+        try:
+            for port in range(base, base + count):
+                with socket.socket() as s:
+                    s.bind(("127.0.0.1", port))
+            return base
+        except OSError:
+            continue
+
+
+def bench_cluster_web(args: argparse.Namespace) -> None:
+    import signal
+    import statistics
+    import threading
+
+    try:
+        import requests
+        import socketio
+    except ImportError:
+        raise SystemExit(
+            "cluster-web : client Socket.IO requis (pip install 'python-socketio[client]')"
+        )
+
+    from moneydrop.cluster import _wait_listening, owner_of
+
+    # Le vrai serveur (web_app.py, superviseur + processus) piloté comme un navigateur : création
+    # des salons en HTTP sur le premier port, puis hôte et joueurs en Socket.IO sur le processus
+    # propriétaire ; manches jouées en parallèle dans tous les salons
+    password = "bench"
+    for count in args.workers:
+        base = _free_ports(count)
+        env = dict(
+            os.environ,
+            MONEYDROP_WORKERS=str(count),
+            MONEYDROP_PORT=str(base),
+            MONEYDROP_BROKER=f"127.0.0.1:{_free_port()}",
+            MONEYDROP_CREATE_PASSWORD=password,
+            MONEYDROP_LOBBY_MAX_PLAYERS=str(args.players),
+            MONEYDROP_LOBBY_JOURNAL="",
+        )
+        proc = subprocess.Popen(
+            [sys.executable, str(ROOT / "web_app.py")],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        clients: list = []
+        try:
+            for index in range(count):
+                _wait_listening(("127.0.0.1", base + index), timeout=30.0)
+
+            tables = []
+            for k in range(args.lobbies):
+                http = requests.Session()
+                r = http.post(
+                    f"http://127.0.0.1:{base}/lobby/create",
+                    data={"name": f"Hôte {k}", "password": password, "size": args.players},
+                )
+                m = re.search(r":(\d+)/lobby/([^/]+)/host$", r.url)
+                if r.status_code != 200 or m is None:
+                    raise SystemExit(f"cluster-web : création refusée ({r.status_code} {r.url})")
+                port, lobby_id = int(m.group(1)), m.group(2)
+                if port - base != owner_of(lobby_id, count):
+                    raise SystemExit(f"cluster-web : salon {lobby_id} servi par le port {port}")
+                tables.append((port, lobby_id, http))
+            owners = [sum(port - base == i for port, _, _ in tables) for i in range(count)]
+            if args.lobbies >= count and min(owners) == 0:
+                raise SystemExit(f"cluster-web : salons mal répartis {owners}")
+
+            latencies: list = []
+            lock = threading.Lock()
+
+            def play(port: int, lobby_id: str, http) -> None:
+                url = f"http://127.0.0.1:{port}"
+                asked, revealed, ended = threading.Event(), threading.Event(), threading.Event()
+                host = socketio.Client(http_session=http)
+                host.on("new_question", lambda *_: asked.set())
+                host.on("reveal_answer", lambda *_: revealed.set())
+                host.on("game_ended", lambda *_: ended.set())
+                host.connect(url)
+                clients.append(host)
+                host.emit("join_lobby", {"lobby_id": lobby_id, "role": "host"})
+                for i in range(args.players):
+                    player = socketio.Client()
+
+                    def bet(*_, player=player) -> None:
+                        bets = {"A": 100, "B": 100, "C": 0, "D": 0}
+                        player.emit("player_bets", {"lobby_id": lobby_id, "bets": bets})
+
+                    player.on("new_question", bet)
+                    player.connect(url)
+                    clients.append(player)
+                    player.emit(
+                        "join_lobby",
+                        {"lobby_id": lobby_id, "role": "player", "player_name": f"joueur{i}"},
+                    )
+                time.sleep(0.5)  # arrivées traitées avant le lancement
+                host.emit("host_start", {"lobby_id": lobby_id})
+                for _ in range(args.rounds):
+                    if not asked.wait(10):
+                        raise SystemExit(f"cluster-web {lobby_id} : question jamais lancée")
+                    asked.clear()
+                    time.sleep(args.bet_window)
+                    started = time.perf_counter()
+                    host.emit("host_force_validate", {"lobby_id": lobby_id})
+                    if not revealed.wait(10):
+                        raise SystemExit(f"cluster-web {lobby_id} : réponse jamais révélée")
+                    revealed.clear()
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                    host.emit("host_next_question", {"lobby_id": lobby_id})
+
+            threads = [threading.Thread(target=play, args=t, daemon=True) for t in tables]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            expected = args.lobbies * args.rounds
+            if len(latencies) != expected:
+                raise SystemExit(f"cluster-web : {len(latencies)} manches sur {expected}")
+            latencies.sort()
+            print(
+                f"cluster-web processus={count:<3} salons/processus={owners} "
+                f"sockets={len(clients):<5} manches/s={expected / elapsed:>7.1f} "
+                f"validation→révélation p50={statistics.median(latencies) * 1000:>7.1f} ms "
+                f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:>7.1f} ms"
+            )
+        finally:
+            for client in clients:
+                try:
+                    client.disconnect()
+                except Exception:
+                    pass
+            # Ctrl+C du superviseur : il arrête le courtier et ses processus
+            proc.send_signal(signal.SIGINT if count > 1 else signal.SIGTERM)
+            try:
+                proc.wait(15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def bench_recover(args: argparse.Namespace) -> None:
+    import random
+
+    from moneydrop.journal import LobbyJournal
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobbyManager
+    from moneydrop.timers import DeadlineScheduler
+
+    # Salons à toutes les phases, instantané à mi-parcours puis transitions dans le journal seul ;
+    # « crash » (rien n'est fermé), puis reconstruction et comparaison des états durables
+    bank = build_question_bank()
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lobbies.json")
+        manager = RealtimeLobbyManager(max_players=args.players, journal=LobbyJournal(path, bank))
+        lobbies = []
+        for k in range(args.lobbies):
+            lobby = manager.create(f"hote{k}", f"Hôte {k}", args.players, 30)
+            for i in range(args.players):
+                lobby.add_player(
+                    f"s{k}-{i}", f"joueur{i}", f"sock{k}-{i}", f"10.{k // 250 % 250}.{k % 250}.{i}"
+                )
+            lobbies.append(lobby)
+
+        def play(lobby) -> None:
+            # Une étape au hasard : mises puis validation, question suivante, pause, exclusion…
+            step = rng.random()
+            if lobby.phase == "waiting" and not lobby.questions:
+                lobby.start_game(rng.sample(bank, 5))
+            elif lobby.phase in ("waiting", "results") and step < 0.5:
+                lobby.next_question() if lobby.phase == "results" else lobby.launch_question()
+            elif lobby.phase == "question":
+                if step < 0.2:
+                    lobby.pause()
+                    return
+                for p in list(lobby.players.values()):
+                    if not p.eliminated and rng.random() < 0.9:
+                        lobby.place_bets(p.sid, _spread(rng, p.score))
+                lobby.validate()
+            elif lobby.phase == "paused":
+                lobby.resume()
+            elif step < 0.1 and lobby.players:
+                lobby.remove_player(next(iter(lobby.players)))
+
+        for _ in range(args.steps // 2):
+            for lobby in lobbies:
+                play(lobby)
+        manager.checkpoint()
+        for _ in range(args.steps - args.steps // 2):
+            for lobby in lobbies:
+                play(lobby)
+        for lobby in lobbies[: args.lobbies // 20]:
+            manager.delete(lobby.lobby_id)
+
+        def durable(state: dict) -> dict:
+            started = state.pop("started")
+            state["questions"] = [q.prompt for q in state["questions"]]
+            state["started"] = None if started is None else round(started, 1)
+            state["banned_sids"], state["banned_ips"] = (
+                sorted(state["banned_sids"]),
+                sorted(state["banned_ips"]),
+            )
+            return state
+
+        expected = {
+            lobby_id: durable(lobby.checkpoint()) for lobby_id, lobby in manager.all().items()
+        }
+        phases: dict = {}
+        for state in expected.values():
+            phases[state["phase"]] = phases.get(state["phase"], 0) + 1
+        with open(f"{path}.journal", "a", encoding="utf-8") as f:
+            f.write('[1,"j","tronquée par le crash",')  # dernière ligne incomplète
+        sizes = {name: os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)}
+        del manager, lobbies
+
+        scheduler = DeadlineScheduler()
+        expired = []
+        started = time.perf_counter()
+        restored = RealtimeLobbyManager(
+            scheduler=scheduler,
+            on_expire=expired.append,
+            max_players=args.players,
+            journal=LobbyJournal(path, bank),
+        )
+        count = restored.recover()
+        elapsed = time.perf_counter() - started
+        scheduler.close()
+
+        got = {lobby_id: durable(lobby.checkpoint()) for lobby_id, lobby in restored.all().items()}
+        if count != len(expected) or got != expected:
+            bad = next((k for k in expected if got.get(k) != expected[k]), None)
+            raise SystemExit(
+                f"recover : {count} salons repris sur {len(expected)} ; écart sur {bad}"
+            )
+        # Reconnexion : même sid, nouveau socket → mêmes jetons ; un éliminé reste banni
+        for lobby in restored.all().values():
+            for sid, p in list(lobby.players.items())[:3]:
+                score, banned = p.score, lobby.is_banned(sid, None)
+                lobby.add_player(sid, p.name, f"nouveau-{sid}")
+                if (
+                    lobby.players[sid].score != score
+                    or lobby.player_by_socket(f"nouveau-{sid}") != sid
+                ):
+                    raise SystemExit(
+                        f"recover {lobby.lobby_id} : reprise du joueur {sid} incorrecte"
+                    )
+                if banned != bool(p.eliminated):
+                    raise SystemExit(f"recover {lobby.lobby_id} : bannissement de {sid} incorrect")
+        print(f"recover salons={count} joueurs/salon={args.players} phases={phases}")
+        print(
+            "recover fichiers "
+            f"{', '.join(f'{k}={v / 1024:.0f} Kio' for k, v in sorted(sizes.items()))} ; "
+            f"reconstruction {elapsed * 1000:.0f} ms ({count / elapsed:,.0f} salons/s), "
+            "états identiques"
+        )
+
+
+def _apply_patch(state: dict, patch: dict):
+    # Même règle que `MD_LOBBY_STATE.apply` (web/static/lobby_state.js) ; None si le patch ne
+    # s'enchaîne pas
+    if state["v"] != patch["base"]:
+        return None
+    nxt = dict(state, **patch.get("set", {}))
+    nxt["v"] = patch["v"]
+    removed, changes = set(patch.get("removed", ())), patch.get("players", {})
+    players, seen = [], set()
+    for p in state["players"]:
+        if p["sid"] in removed:
+            continue
+        seen.add(p["sid"])
+        players.append({**p, **changes[p["sid"]]} if p["sid"] in changes else p)
+    players.extend({"sid": sid, **change} for sid, change in changes.items() if sid not in seen)
+    nxt["players"] = players
+    return nxt
+
+
+def bench_reconnect(args: argparse.Namespace) -> None:
+    import json
+    import random
+
+    from moneydrop.questions import build_question_bank
+    from moneydrop.realtime import RealtimeLobby
+
+    bank = build_question_bank()
+    for players in args.players:
+        rng = random.Random(players)
+        lobby = RealtimeLobby(
+            lobby_id="bench",
+            host_sid="host",
+            host_name="Hôte",
+            max_players=players,
+            history=args.history,
+        )
+        for i in range(players):
+            lobby.add_player(f"sid{i}", f"joueur{i}", f"sock{i}")
+        states = [lobby.publish()[0]]  # états diffusés, dans l'ordre (ce qu'un client a pu garder)
+
+        def publish() -> None:
+            state = lobby.publish()[0]
+            if state["v"] != states[-1]["v"]:
+                states.append(state)
+
+        lobby.start_game(bank[:10])
+        # Diffusions à 10 Hz : ~2 % des joueurs misent entre deux ; validation, question suivante
+        for _ in range(args.rounds):
+            lobby.launch_question()
+            lobby.question_started_at = time.monotonic()
+            publish()
+            lobby.record("new_question", {})
+            for _ in range(args.ticks):
+                for i in rng.sample(range(players), max(1, players // 50)):
+                    p = lobby.players[f"sid{i}"]
+                    if not p.eliminated:
+                        lobby.place_bets(p.sid, _spread(rng, p.score))
+                publish()
+            lobby.validate()
+            publish()
+            lobby.record(
+                "reveal_answer", {"correct": lobby.correct, "question_index": lobby.question_index}
+            )
+            lobby.next_question()
+            publish()
+        # Un client déconnecté de passage : perd la socket, puis revient (nouveau socket)
+        lobby.add_player("sid0", "joueur0", "sock0-bis")
+        current = lobby.publish()[0]
+        full = len(json.dumps(current))
+
+        if (
+            lobby.since(current["v"], lobby.epoch) != []
+            or lobby.since(states[-1]["v"], "autre") is not None
+        ):
+            raise SystemExit("reconnect : client à jour ou d'un autre processus mal servi")
+        for gap in args.gaps:
+            if gap >= len(states):
+                continue
+            old = states[-gap]
+            missed = lobby.since(old["v"], old["epoch"])
+            if missed is None:
+                print(
+                    f"reconnect joueurs={players:<5} manqués={gap:<4} hors fenêtre : état complet "
+                    f"{full:>10,} octets"
+                )
+                continue
+            state, sent, events = old, 0, 0
+            for event, payload in missed:
+                sent += len(json.dumps(payload))
+                if event != "state_delta":
+                    events += 1
+                    continue
+                state = _apply_patch(state, payload)
+                if state is None:
+                    raise SystemExit(f"reconnect : patch hors séquence (écart {gap})")
+            if state != current:
+                raise SystemExit(f"reconnect : état reconstruit différent (écart {gap})")
+            print(
+                f"reconnect joueurs={players:<5} manqués={gap:<4} "
+                f"{len(missed) - events} patchs + {events} événements : "
+                f"{sent:>10,} octets au lieu de {full:>10,} ({full / max(1, sent):.1f}x moins), "
+                "état identique"
+            )
+        # Tempête : tous les joueurs reviennent, chacun quelques états en retard
+        behind = [states[-rng.randint(1, min(10, len(states) - 1))] for _ in range(players)]
+        started = time.perf_counter()
+        replayed = [lobby.since(old["v"], old["epoch"]) for old in behind]
+        octets = sum(len(json.dumps(p)) for missed in replayed for _, p in missed or ())
+        elapsed = time.perf_counter() - started
+        print(
+            f"reconnect joueurs={players:<5} tempête : {players} reconnexions en "
+            f"{elapsed * 1000:.1f} ms, {octets:,} octets au lieu de {full * players:,} ; "
+            f"fenêtre {len(lobby._history)} entrées"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Money Drop - benchmarks")
+    sub = parser.add_subparsers(dest="scenario", required=True)
+
+    p = sub.add_parser("server", help="Serveur console: connexions/s et mémoire par joueur")
+    p.add_argument("--players", type=int, default=500)
+    p.add_argument("--modes", nargs="+", default=["threads", "asyncio"])
+    p.add_argument("--timeout", type=float, default=30.0, help="Attente max (s)")
+    p.set_defaults(func=bench_server)
+
+    p = sub.add_parser("engine", help="Moteur pas à pas: transcripts et étapes/s")
+    p.add_argument("--games", type=int, default=20000)
+    p.set_defaults(func=bench_engine)
+
+    p = sub.add_parser("leaderboard", help="Classement: mises à jour/s selon le nombre d'entrées")
+    p.add_argument("--entries", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--modes", nargs="+", default=["json", "journal", "sqlite"])
+    p.add_argument("--updates", type=int, default=20000, help="Mises à jour max par mesure")
+    p.add_argument("--seconds", type=float, default=3.0, help="Durée max par mesure")
+    p.set_defaults(func=bench_leaderboard)
+
+    p = sub.add_parser("ranking", help="Classement: sondages top(10)+rank par seconde")
+    p.add_argument("--entries", type=int, default=1_000_000)
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--update-every", type=int, default=10)
+    p.set_defaults(func=bench_ranking)
+
+    p = sub.add_parser(
+        "lobby", help="Salon temps réel: octets diffusés par manche (état complet vs patch)"
+    )
+    p.add_argument("--players", type=int, nargs="+", default=[50, 500])
+    p.add_argument("--bets", type=int, default=3, help="Mises envoyées par joueur et par manche")
+    p.add_argument(
+        "--bet-window", type=float, default=20.0, help="Durée (s) sur laquelle arrivent les mises"
+    )
+    p.add_argument("--hz", type=float, default=10.0, help="Diffusions max par seconde et par salon")
+    p.set_defaults(func=bench_lobby)
+
+    p = sub.add_parser(
+        "snapshot", help="Salon temps réel: coût de snapshot()/publish() selon le nombre de joueurs"
+    )
+    p.add_argument("--players", type=int, nargs="+", default=[10, 50, 500, 5000])
+    p.add_argument("--seconds", type=float, default=1.0, help="Durée par mesure")
+    p.set_defaults(func=bench_snapshot)
+
+    p = sub.add_parser("lobby-index", help="Salon temps réel: mises/s, index contre balayage")
+    p.add_argument("--players", type=int, default=5000)
+    p.add_argument("--seconds", type=float, default=2.0)
+    p.set_defaults(func=bench_lobby_index)
+
+    p = sub.add_parser("timers", help="Échéances: CPU des salons inactifs et retard de validation")
+    p.add_argument("--lobbies", type=int, default=10_000, help="Salons inactifs")
+    p.add_argument(
+        "--active", type=int, default=1000, help="Questions chronométrées pour la précision"
+    )
+    p.add_argument("--seconds", type=float, default=5.0, help="Durée de la mesure CPU")
+    p.set_defaults(func=bench_timers)
+
+    p = sub.add_parser(
+        "lobbies", help="Annuaire des salons joignables: cohérence et coût par requête"
+    )
+    p.add_argument("--lobbies", type=int, nargs="+", default=[100, 1000, 10_000])
+    p.add_argument("--checks", type=int, default=5000, help="Opérations aléatoires vérifiées")
+    p.add_argument("--seconds", type=float, default=0.5, help="Durée par mesure")
+    p.set_defaults(func=bench_lobbies)
+
+    p = sub.add_parser(
+        "reaper", help="Expiration des sessions/salons: cohérence, plafond et coût d'un balayage"
+    )
+    p.add_argument("--objects", type=int, nargs="+", default=[10_000, 100_000])
+    p.add_argument("--checks", type=int, default=20000, help="Opérations aléatoires vérifiées")
+    p.add_argument("--seconds", type=float, default=0.5, help="Durée par mesure")
+    p.set_defaults(func=bench_reaper)
+
+    p = sub.add_parser(
+        "sessions", help="Sessions solo: contention get/create selon le nombre de threads"
+    )
+    p.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 64])
+    p.add_argument("--sessions", type=int, default=10_000, help="Sessions existantes")
+    p.add_argument("--ops", type=int, default=400_000, help="Opérations par mesure (tous threads)")
+    p.add_argument("--create-ratio", type=float, default=0.1)
+    p.add_argument("--stripes", type=int, default=16)
+    p.set_defaults(func=bench_sessions)
+
+    p = sub.add_parser(
+        "resolve", help="Résolution d'une manche: boucle Python vs NumPy (résultats comparés)"
+    )
+    p.add_argument("--players", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    p.set_defaults(func=bench_resolve)
+
+    p = sub.add_parser(
+        "players", help="Joueurs d'un salon: octets par joueur et temps d'une transition"
+    )
+    p.add_argument("--players", type=int, nargs="+", default=[1000, 50000])
+    p.add_argument("--rounds", type=int, default=5, help="Transitions mesurées (médiane)")
+    p.set_defaults(func=bench_players)
+
+    p = sub.add_parser(
+        "offload",
+        help="Travail lourd d'un grand salon: sur la boucle vs sur le pool (latence des petits)",
+    )
+    p.add_argument("--players", type=int, default=20000, help="joueurs du grand salon")
+    p.add_argument("--lobbies", type=int, default=20, help="petits salons (10 joueurs)")
+    p.add_argument(
+        "--interval", type=float, default=2.0, help="ms entre deux mises des petits salons"
+    )
+    p.add_argument(
+        "--every", type=float, default=250.0, help="ms entre deux états complets du grand salon"
+    )
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.set_defaults(func=bench_offload)
+
+    p = sub.add_parser(
+        "cluster",
+        help="Plusieurs processus: salons répartis par lobby_id, manches/s selon le nombre "
+        "de processus",
+    )
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--lobbies", type=int, default=400)
+    p.add_argument("--players", type=int, default=50, help="joueurs par salon")
+    p.add_argument("--rounds", type=int, default=3)
+    p.set_defaults(func=bench_cluster)
+
+    p = sub.add_parser(
+        "cluster-web",
+        help="Plusieurs processus, vrai serveur: salons créés en HTTP, joués en Socket.IO",
+    )
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--lobbies", type=int, default=16)
+    p.add_argument("--players", type=int, default=10, help="joueurs par salon")
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument("--bet-window", type=float, default=0.2, help="s entre question et validation")
+    p.set_defaults(func=bench_cluster_web)
+
+    p = sub.add_parser(
+        "recover", help="Reprise après crash: reconstruction des salons depuis instantané + journal"
+    )
+    p.add_argument("--lobbies", type=int, default=3000)
+    p.add_argument("--players", type=int, default=20, help="joueurs par salon")
+    p.add_argument(
+        "--steps", type=int, default=12, help="étapes de jeu par salon (moitié avant l'instantané)"
+    )
+    p.set_defaults(func=bench_recover)
+
+    p = sub.add_parser(
+        "reconnect", help="Reconnexion: patchs manqués rejoués vs état complet (états comparés)"
+    )
+    p.add_argument("--players", type=int, nargs="+", default=[50, 500])
+    p.add_argument("--history", type=int, default=64, help="entrées gardées par salon")
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument("--ticks", type=int, default=50, help="diffusions pendant une question")
+    p.add_argument("--gaps", type=int, nargs="+", default=[1, 5, 20, 60, 200], help="états manqués")
+    p.set_defaults(func=bench_reconnect)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
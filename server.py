@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import socket
 import threading
 from typing import Tuple
 
-from moneydrop.engine import IO, MoneyDropEngine
+from moneydrop.engine import IO, BufferedIO, GameStepper, IOCounters, MoneyDropEngine
 from moneydrop.leaderboard import Leaderboard
 from moneydrop.models import GameConfig
 from moneydrop.questions import build_question_bank
@@ -15,8 +16,7 @@ def _safe_send(conn: socket.socket, text: str) -> None:
     conn.sendall(text.encode("utf-8", errors="replace"))
 
 
-def _readline(conn: socket.socket, prompt: str) -> str:
-    _safe_send(conn, prompt)
+def _recv_line(conn: socket.socket) -> str:
     buf = bytearray()
     while True:
         chunk = conn.recv(1)
@@ -30,6 +30,15 @@ def _readline(conn: socket.socket, prompt: str) -> str:
     return buf.decode("utf-8", errors="replace").strip()
 
 
+def _log_counters(addr: Tuple[str, int], out: BufferedIO, counters: IOCounters) -> None:
+    # Compteurs de cette connexion, puis cumul de toutes les connexions du processus
+    print(
+        f"[server] Déconnexion: {addr[0]}:{addr[1]} | écritures: {out.writes}, "
+        f"envois: {out.sends} (économisés: {out.saved}) | cumul serveur: écritures: "
+        f"{counters.writes}, envois: {counters.sends} (économisés: {counters.saved})"
+    )
+
+
 class PlayerSession(threading.Thread):
     def __init__(
         self,
@@ -38,6 +47,8 @@ class PlayerSession(threading.Thread):
         engine: MoneyDropEngine,
         leaderboard: Leaderboard,
         config: GameConfig,
+        counters: IOCounters,
+        buffer_size: int = 16 * 1024,
     ):
         super().__init__(daemon=True)
         self._conn = conn
@@ -45,33 +56,151 @@ class PlayerSession(threading.Thread):
         self._engine = engine
         self._leaderboard = leaderboard
         self._config = config
+        self._counters = counters
+        self._buffer_size = buffer_size
 
     def run(self) -> None:
+        out = BufferedIO(
+            send=lambda s: _safe_send(self._conn, s),
+            recv_line=lambda: _recv_line(self._conn),
+            max_buffer=self._buffer_size,
+            counters=self._counters,
+        )
         try:
-            _safe_send(self._conn, "Bienvenue sur Money Drop (serveur).\n")
-            name = _readline(self._conn, "Entrez votre nom: ")
+            out.write("Bienvenue sur Money Drop (serveur).\n")
+            name = out.read_line("Entrez votre nom: ")
             if not name:
                 return
 
-            io = IO(
-                write=lambda s: _safe_send(self._conn, s),
-                read_line=lambda p: _readline(self._conn, p),
-            )
+            io = IO(write=out.write, read_line=out.read_line)
             result = self._engine.run_game(name, io, self._config)
             self._leaderboard.update(result.player_name, result.final_chips, result.correct_answers)
 
-            _safe_send(self._conn, "\n" + self._leaderboard.render(10) + "\n")
-            _safe_send(self._conn, "\nMerci d'avoir joué !\n")
+            out.write("\n" + self._leaderboard.render(10) + "\n")
+            out.write("\nMerci d'avoir joué !\n")
         except Exception as e:
             try:
-                _safe_send(self._conn, f"\nErreur serveur: {e}\n")
+                out.write(f"\nErreur serveur: {e}\n")
             except Exception:
                 pass
         finally:
+            try:
+                out.close()
+            except Exception:
+                pass
             try:
                 self._conn.close()
             except Exception:
                 pass
+            _log_counters(self._addr, out, self._counters)
+
+
+# --- Mode asyncio : un seul thread, lecture bufferisée ligne par ligne ---
+
+async def _aread_line(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, out: BufferedIO, prompt: str
+) -> str:
+    out.write(prompt)
+    out.flush()
+    await writer.drain()
+    try:
+        line = await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError):
+        # Ligne démesurée: on coupe la connexion plutôt que de bufferiser sans fin
+        raise ConnectionError("ligne trop longue")
+    if not line:
+        # Déconnexion
+        raise ConnectionError("déconnexion")
+    return line.decode("utf-8", errors="replace").strip()
+
+
+async def _handle_client(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    engine: MoneyDropEngine,
+    leaderboard: Leaderboard,
+    config: GameConfig,
+    counters: IOCounters,
+    buffer_size: int,
+) -> None:
+    out = BufferedIO(
+        send=lambda s: writer.write(s.encode("utf-8", errors="replace")),
+        max_buffer=buffer_size,
+        counters=counters,
+    )
+    try:
+        out.write("Bienvenue sur Money Drop (serveur).\n")
+        name = await _aread_line(reader, writer, out, "Entrez votre nom: ")
+        if not name:
+            return
+
+        game = GameStepper(engine, name, out.write, config)
+        while not game.finished:
+            game.feed(await _aread_line(reader, writer, out, game.prompt))
+        result = game.result
+        # Sauvegarde (fichier JSON réécrit…) et rendu hors de la boucle, qui sert tout le monde
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, leaderboard.update, result.player_name, result.final_chips, result.correct_answers
+        )
+        board = await loop.run_in_executor(None, leaderboard.render, 10)
+
+        out.write("\n" + board + "\n")
+        out.write("\nMerci d'avoir joué !\n")
+    except ConnectionError:
+        pass
+    except Exception as e:
+        out.write(f"\nErreur serveur: {e}\n")
+    finally:
+        try:
+            out.close()
+            await writer.drain()
+        except Exception:
+            pass
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+        _log_counters(writer.get_extra_info("peername") or ("?", 0), out, counters)
+
+
+async def serve_async(
+    host: str,
+    port: int,
+    engine: MoneyDropEngine,
+    leaderboard: Leaderboard,
+    config: GameConfig,
+    buffer_size: int = 16 * 1024,
+) -> None:
+    counters = IOCounters()
+
+    async def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await _handle_client(reader, writer, engine, leaderboard, config, counters, buffer_size)
+
+    server = await asyncio.start_server(on_connect, host, port, backlog=1024, reuse_address=True)
+    async with server:
+        await server.serve_forever()
+
+
+def serve_threads(
+    host: str,
+    port: int,
+    engine: MoneyDropEngine,
+    leaderboard: Leaderboard,
+    config: GameConfig,
+    buffer_size: int = 16 * 1024,
+) -> None:
+    counters = IOCounters()
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((host, port))
+        s.listen()
+
+        while True:
+            conn, addr = s.accept()
+            print(f"[server] Connexion: {addr[0]}:{addr[1]}")
+            PlayerSession(conn, addr, engine, leaderboard, config, counters, buffer_size).start()
 
 
 def main() -> None:
@@ -85,22 +214,52 @@ def main() -> None:
         default="data/leaderboard.json",
         help="Fichier JSON de classement",
     )
+    parser.add_argument(
+        "--leaderboard-backend",
+        choices=["json", "journal", "sqlite"],
+        default="json",
+        help=(
+            "Stockage du classement: json (réécrit), journal (ajouts + compaction), "
+            "sqlite (WAL)"
+        ),
+    )
+    parser.add_argument(
+        "--write-behind",
+        action="store_true",
+        help="Sauvegarde JSON différée et regroupée dans un thread de fond",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["threads", "asyncio"],
+        default="threads",
+        help="threads: 1 client = 1 thread ; asyncio: tous les clients sur une boucle unique",
+    )
+    parser.add_argument(
+        "--buffer",
+        type=int,
+        default=16 * 1024,
+        help="Taille max du tampon d'envoi (caractères), vidé à chaque prompt ; 1 = sans tampon",
+    )
     args = parser.parse_args()
 
-    leaderboard = Leaderboard(args.leaderboard)
+    leaderboard = Leaderboard(
+        args.leaderboard, backend=args.leaderboard_backend, write_behind=args.write_behind
+    )
     engine = MoneyDropEngine(build_question_bank())
     config = GameConfig(starting_chips=args.start, question_count=args.questions)
 
-    print(f"[server] Listening on {args.host}:{args.port}")
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((args.host, args.port))
-        s.listen()
-
-        while True:
-            conn, addr = s.accept()
-            print(f"[server] Connexion: {addr[0]}:{addr[1]}")
-            PlayerSession(conn, addr, engine, leaderboard, config).start()
+    print(f"[server] Listening on {args.host}:{args.port} (mode {args.mode})")
+    try:
+        if args.mode == "asyncio":
+            asyncio.run(
+                serve_async(args.host, args.port, engine, leaderboard, config, args.buffer)
+            )
+        else:
+            serve_threads(args.host, args.port, engine, leaderboard, config, args.buffer)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        leaderboard.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+from moneydrop.cluster import Cluster, owner_of
+from moneydrop.realtime import RealtimeLobbyManager
+
+
+def test_creations_are_spread_over_every_worker():
+    workers = 4
+    clusters = [Cluster(i, workers, 8000, ("127.0.0.1", 5070)) for i in range(workers)]
+    managers = [RealtimeLobbyManager(owns=c.owns) for c in clusters]
+    # Toutes les créations arrivent sur le processus 0, qui les confie à tour de rôle
+    placed = [0] * workers
+    for k in range(40):
+        owner = clusters[0].place()
+        lobby = managers[owner].create(f"hote{k}", "Hôte", 10, 30)
+        assert owner_of(lobby.lobby_id, workers) == owner
+        placed[owner] += 1
+    assert placed == [10, 10, 10, 10]
+
+
+def test_worker_url_keeps_host_and_path():
+    cluster = Cluster(0, 2, 8000, ("127.0.0.1", 5070))
+    url = cluster.worker_url(1, "http://jeu.local:8000/", "/lobby/create?placed=1")
+    assert url == "http://jeu.local:8001/lobby/create?placed=1"
@@ -0,0 +1,106 @@
+import dataclasses
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+from moneydrop.engine import IO, BufferedIO, GameStepper, IOCounters, MoneyDropEngine
+from moneydrop.models import GameConfig
+from moneydrop.questions import build_question_bank
+
+# Transcripts produits par la boucle bloquante d'origine (`run_game` avant `GameStepper`), avec
+# les mêmes joueurs scriptés : mêmes textes, mêmes relances, même résultat attendus
+GOLDEN = json.loads(
+    (Path(__file__).parent / "data" / "engine_transcripts.json").read_text(encoding="utf-8")
+)
+
+_SCRIPT = ["", "Z=5", "A=x", "A=-1", "A=999999", "A 10 B", "A=100 B=200 C=300 D=400", "ALL"]
+_CHIPS_RE = re.compile(r"(?:disponibles:|exactement) (\d+)")
+_QUESTION_RE = re.compile(r"Question (\d+)/")
+
+
+def _chips(transcript):
+    return int(_CHIPS_RE.findall("".join(transcript[-12:]))[-1])
+
+
+def _scripted(step, transcript, bank):
+    # Mélange d'entrées invalides (relances) et de mises valides ; "ALL" mise tout sur B
+    line = _SCRIPT[step % len(_SCRIPT)]
+    if line == "ALL":
+        return f"B={_chips(transcript)}"
+    return line
+
+
+def _informed(step, transcript, bank):
+    # Connaît la bonne réponse : tout dessus, une mise partielle (refusée si tout doit être misé)
+    # ou moitié sur une mauvaise réponse
+    question = bank[int(_QUESTION_RE.findall("".join(transcript[-40:]))[-1]) - 1]
+    chips = _chips(transcript)
+    wrong = next(key for key in "ABCD" if key != question.correct)
+    if step % 4 == 0:
+        return f"{question.correct}=1"
+    if step % 4 == 2:
+        return f"{question.correct}={chips // 2} {wrong}={chips - chips // 2}"
+    return f"{question.correct}={chips}"
+
+
+BANK = build_question_bank()
+PLAYERS = {"scripted": _scripted, "informed": _informed}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return MoneyDropEngine(BANK)
+
+
+def _ids(game):
+    return f"{game['player']}-{'strict' if game['config'] else 'defaut'}-{game['seed']}"
+
+
+@pytest.mark.parametrize("game", GOLDEN, ids=_ids)
+def test_run_game_matches_original_transcript(engine, game):
+    reply = PLAYERS[game["player"]]
+    out = []
+    step = [game["seed"]]
+
+    def read_line(prompt):
+        out.append(prompt)
+        step[0] += 1
+        return reply(step[0], out, BANK)
+
+    io = IO(write=out.append, read_line=read_line)
+    result = engine.run_game(f"p{game['seed']}", io, GameConfig(**game["config"]))
+    assert "".join(out) == game["transcript"]
+    assert dataclasses.asdict(result) == game["result"]
+
+
+@pytest.mark.parametrize("game", GOLDEN, ids=_ids)
+def test_stepper_matches_original_transcript(engine, game):
+    reply = PLAYERS[game["player"]]
+    out = []
+    step = game["seed"]
+    stepper = GameStepper(engine, f"p{game['seed']}", out.append, GameConfig(**game["config"]))
+    while not stepper.finished:
+        out.append(stepper.prompt)
+        step += 1
+        stepper.feed(reply(step, out, BANK))
+    assert stepper.prompt is None
+    assert "".join(out) == game["transcript"]
+    assert dataclasses.asdict(stepper.result) == game["result"]
+    with pytest.raises(ValueError):
+        stepper.feed("A=1")
+
+
+def test_buffered_io_keeps_its_own_counts_and_reports_once():
+    counters = IOCounters()
+    sent = []
+    sessions = [BufferedIO(send=sent.append, counters=counters) for _ in range(2)]
+    for out, lines in zip(sessions, (3, 5)):
+        for i in range(lines):
+            out.write(f"ligne {i}\n")
+        out.close()
+        out.close()
+    # Chaque connexion garde son bilan ; le cumul partagé compte chaque session une fois
+    assert [(out.writes, out.sends) for out in sessions] == [(3, 1), (5, 1)]
+    assert (counters.writes, counters.sends, counters.saved) == (8, 2, 6)
@@ -0,0 +1,42 @@
+from moneydrop.journal import LobbyJournal
+from moneydrop.questions import build_question_bank
+from moneydrop.realtime import RealtimeLobbyManager
+
+
+def _manager(path, bank):
+    return RealtimeLobbyManager(max_players=10, journal=LobbyJournal(str(path), bank))
+
+
+def test_recover_skips_torn_multibyte_tail(tmp_path):
+    bank = build_question_bank()
+    path = tmp_path / "lobbies.json"
+    manager = _manager(path, bank)
+    lobby = manager.create("hote", "Hôte", 10, 30)
+    lobby.add_player("s1", "Zoé", "sock1", "10.0.0.1")
+    lobby_id = lobby.lobby_id
+    # Crash au milieu d'un « é » : la dernière ligne s'arrête sur un octet isolé
+    with open(f"{path}.journal", "ab") as f:
+        f.write(f'[9,"j","{lobby_id}","s2","Andr'.encode("utf-8") + "é".encode("utf-8")[:1])
+
+    restored = _manager(path, bank)
+    assert restored.recover() == 1
+    assert [p.name for p in restored.get(lobby_id).players.values()] == ["Zoé"]
+
+    # Le journal rouvert termine la ligne tronquée : la transition suivante survit
+    restored.get(lobby_id).add_player("s3", "Léa", "sock3", "10.0.0.3")
+    again = _manager(path, bank)
+    assert again.recover() == 1
+    assert [p.name for p in again.get(lobby_id).players.values()] == ["Zoé", "Léa"]
+
+
+def test_deleted_lobby_stays_deleted_after_compaction(tmp_path):
+    bank = build_question_bank()
+    path = tmp_path / "lobbies.json"
+    manager = _manager(path, bank)
+    lobby = manager.create("hote", "Hôte", 10, 30)
+    manager.checkpoint()
+    manager.delete(lobby.lobby_id)
+
+    restored = _manager(path, bank)
+    assert restored.recover() == 0
+    assert restored.get(lobby.lobby_id) is None
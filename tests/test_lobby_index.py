@@ -0,0 +1,182 @@
+import json
+import random
+
+import pytest
+
+from moneydrop.journal import LobbyJournal
+from moneydrop.questions import build_question_bank
+from moneydrop.realtime import RealtimeLobby, RealtimeLobbyManager
+
+
+def _scan_players(lobby):
+    # Parcours complet de `players`, comme avant les index
+    by_socket, by_name, by_ip = {}, {}, {}
+    for sid, p in lobby.players.items():
+        if p.socket_id:
+            by_socket[p.socket_id] = sid
+        if p.name:
+            by_name.setdefault(p.name, []).append(sid)
+        if p.ip:
+            by_ip.setdefault(p.ip, []).append(sid)
+    return by_socket, by_name, by_ip
+
+
+def _assert_players_indexed(lobby):
+    assert lobby._check_indexes() == []
+    by_socket, by_name, by_ip = _scan_players(lobby)
+    for socket_sid, sid in by_socket.items():
+        assert lobby.player_by_socket(socket_sid) == sid
+    for name, sids in by_name.items():
+        # Premier arrivé sous ce nom : pas forcément le premier de `players` (renommages)
+        assert lobby.player_by_name(name) in sids
+    for ip, sids in by_ip.items():
+        assert sorted(lobby.players_by_ip(ip)) == sorted(sids)
+    assert lobby.player_by_socket("inconnu") is None
+    assert lobby.player_by_name("inconnu") is None
+
+
+def _scan_listing(manager):
+    # Filtre de tous les salons, comme avant l'annuaire tenu à jour
+    return {
+        lobby_id: {
+            "lobby_id": lobby_id,
+            "host_name": lobby.host_name,
+            "players": len(lobby.players),
+            "max_players": lobby.max_players,
+            "time_limit": lobby.time_limit,
+            "question_total": lobby.question_total,
+        }
+        for lobby_id, lobby in manager.all().items()
+        if lobby.phase == "waiting" and len(lobby.players) < lobby.max_players
+    }
+
+
+def _assert_listed(manager):
+    etag, body = manager.joinable()
+    assert etag == manager.listing_etag()
+    assert {e["lobby_id"]: e for e in json.loads(body)["lobbies"]} == _scan_listing(manager)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_player_indexes_follow_random_operations(seed):
+    rng = random.Random(seed)
+    questions = build_question_bank()
+    lobby = RealtimeLobby(lobby_id="check", host_sid="host", host_name="Hôte", max_players=24)
+    for _ in range(3000):
+        sid = f"sid{rng.randrange(30)}"
+        op = rng.random()
+        try:
+            if op < 0.35:
+                # Arrivée, ou retour sous un autre nom / socket / IP
+                lobby.add_player(
+                    sid,
+                    f"nom{rng.randrange(10)}",
+                    f"sock{rng.randrange(40)}",
+                    f"10.0.0.{rng.randrange(5)}",
+                )
+            elif op < 0.5:
+                lobby.remove_player(sid)
+            elif op < 0.6:
+                lobby.detach_socket(f"sock{rng.randrange(40)}")
+            elif op < 0.7:
+                lobby.set_socket(sid, f"sock{rng.randrange(40)}")
+            elif op < 0.8:
+                kicked = lobby.player_by_name(f"nom{rng.randrange(10)}")
+                if kicked:
+                    lobby.remove_player(kicked)
+            elif op < 0.87:
+                lobby.start_game(questions)
+                lobby.launch_question()
+            elif op < 0.94:
+                lobby.validate()
+            else:
+                lobby.next_question()
+        except ValueError:
+            pass  # salon plein
+        _assert_players_indexed(lobby)
+
+
+def test_socket_taken_over_by_another_player():
+    lobby = RealtimeLobby(lobby_id="check", host_sid="host", host_name="Hôte", max_players=10)
+    lobby.add_player("s1", "Zoé", "sock", "10.0.0.1")
+    lobby.add_player("s2", "Zoé", "sock", "10.0.0.1")
+    assert lobby.player_by_socket("sock") == "s2"
+    assert lobby.players["s1"].socket_id is None
+    assert lobby.player_by_name("Zoé") == "s1"
+    _assert_players_indexed(lobby)
+
+    assert lobby.detach_socket("sock") == "s2"
+    lobby.remove_player("s1")
+    assert lobby.player_by_name("Zoé") == "s2"
+    assert lobby.players_by_ip("10.0.0.1") == ["s2"]
+    _assert_players_indexed(lobby)
+
+
+def test_player_indexes_rebuilt_on_recover(tmp_path):
+    bank = build_question_bank()
+    path = str(tmp_path / "lobbies.json")
+    manager = RealtimeLobbyManager(journal=LobbyJournal(path, bank))
+    lobby = manager.create("hote", "Hôte", 10, 30)
+    for i in range(6):
+        lobby.add_player(f"s{i}", f"nom{i % 3}", f"sock{i}", f"10.0.0.{i % 2}")
+    lobby.remove_player("s2")
+    lobby.start_game(bank)
+    lobby.launch_question()
+
+    restored = RealtimeLobbyManager(journal=LobbyJournal(path, bank))
+    assert restored.recover() == 1
+    again = restored.get(lobby.lobby_id)
+    # Sockets perdus au redémarrage : seuls les index nom et IP sont reconstruits
+    assert again.player_by_socket("sock1") is None
+    assert again.player_by_name("nom2") == "s5"
+    assert sorted(again.players_by_ip("10.0.0.0")) == ["s0", "s4"]
+    _assert_players_indexed(again)
+    again.add_player("s1", "nom1", "sock9", "10.0.0.1")
+    assert again.player_by_socket("sock9") == "s1"
+    _assert_players_indexed(again)
+
+
+def test_listing_follows_joins_leaves_phases_and_reaps():
+    rng = random.Random(11)
+    questions = build_question_bank()
+    manager = RealtimeLobbyManager()
+    lobbies = [manager.create(f"host{i}", f"Hôte{i}", 3, 30) for i in range(10)]
+    for _ in range(3000):
+        lobby = rng.choice(lobbies)
+        op = rng.random()
+        try:
+            if op < 0.35:
+                lobby.add_player(f"sid{rng.randrange(6)}", "joueur")
+            elif op < 0.55:
+                lobby.remove_player(f"sid{rng.randrange(6)}")
+            elif op < 0.65:
+                lobby.start_game(questions)
+                lobby.launch_question()
+            elif op < 0.75:
+                lobby.validate()
+            elif op < 0.85:
+                lobby.next_question()
+            elif op < 0.92:
+                lobbies.append(manager.create("host", "Hôte", 3, 30))
+            else:
+                # Même chemin que le balayage (`_reap`), sans attendre l'échéance
+                assert manager.delete(lobby.lobby_id) is lobby
+                lobbies.remove(lobby)
+                if not lobbies:
+                    lobbies.append(manager.create("host", "Hôte", 3, 30))
+        except ValueError:
+            pass  # salon plein
+        _assert_listed(manager)
+
+
+def test_reaped_lobby_leaves_listing_for_good():
+    manager = RealtimeLobbyManager(ttls={"waiting": 0.0})
+    lobby = manager.create("hote", "Hôte", 3, 30)
+    etag = manager.listing_etag()
+    assert manager.reaper.sweep() == 1
+    assert manager.get(lobby.lobby_id) is None
+    assert manager.listing_etag() != etag
+    # Un salon retiré ne se réinscrit plus, même s'il change encore
+    lobby.add_player("s1", "Zoé")
+    _assert_listed(manager)
+    assert json.loads(manager.joinable()[1])["lobbies"] == []
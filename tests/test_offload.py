@@ -0,0 +1,113 @@
+import logging
+import threading
+
+from moneydrop.offload import LobbyWorkers
+from moneydrop.questions import build_question_bank
+from moneydrop.realtime import RealtimeLobbyManager
+from moneydrop.timers import DeadlineScheduler
+
+
+def _without_blocking(fn):
+    # Appel depuis un autre thread : s'il attendait le verrou du salon, il serait encore en vie
+    thread = threading.Thread(target=fn, daemon=True)
+    thread.start()
+    thread.join(2.0)
+    assert not thread.is_alive(), "la boucle a attendu le verrou du salon"
+
+
+def _busy_lobby(manager):
+    lobby = manager.create("hote", "Hôte", 10, 30)
+    lobby.add_player("s1", "Zoé", "sock1")
+    lobby.start_game(build_question_bank())
+    lobby.launch_question()
+    return lobby
+
+
+def test_deadline_goes_through_dispatch_while_lobby_is_busy():
+    clock = [0.0]
+    scheduler = DeadlineScheduler(clock=lambda: clock[0])
+    expired, pending = [], []
+    manager = RealtimeLobbyManager(
+        scheduler=scheduler,
+        on_expire=expired.append,
+        dispatch=lambda lobby, work: pending.append(work),
+    )
+    lobby = _busy_lobby(manager)
+    clock[0] += 3600.0
+
+    # Salon travaillé sur le pool : le rappel du tas ne fait que mettre l'échéance dans sa file
+    with lobby.lock:
+        _without_blocking(scheduler.run_due)
+    assert len(pending) == 1 and expired == []
+    pending.pop()()
+    assert expired == [lobby]
+
+
+def test_reap_goes_through_dispatch_while_lobby_is_busy():
+    pending = []
+    manager = RealtimeLobbyManager(
+        ttls={"question": 0.0, "waiting": 0.0},
+        dispatch=lambda lobby, work: pending.append(work),
+    )
+    lobby = _busy_lobby(manager)
+
+    with lobby.lock:
+        _without_blocking(manager.reaper.sweep)
+    assert manager.get(lobby.lobby_id) is lobby
+    pending.pop()()
+    assert manager.get(lobby.lobby_id) is None
+
+
+def test_checkpoint_uses_capture(tmp_path):
+    from moneydrop.journal import LobbyJournal
+
+    bank = build_question_bank()
+    path = str(tmp_path / "lobbies.json")
+    manager = RealtimeLobbyManager(journal=LobbyJournal(path, bank))
+    lobby = _busy_lobby(manager)
+    captured = []
+
+    def capture(lobby):
+        captured.append(lobby)
+        return lobby.checkpoint()
+
+    assert manager.checkpoint(capture)
+    assert captured == [lobby]
+    restored = RealtimeLobbyManager(journal=LobbyJournal(path, bank))
+    assert restored.recover() == 1
+    assert restored.get(lobby.lobby_id).phase == "question"
+
+
+def test_forget_during_drain_drops_queue_once_empty():
+    spawned = []
+    workers = LobbyWorkers(
+        run_blocking=lambda fn: fn(),
+        spawn=lambda fn, *args: spawned.append((fn, args)),
+        min_players=1,
+    )
+    manager = RealtimeLobbyManager()
+    lobby = _busy_lobby(manager)
+
+    # Retrait soumis derrière un travail lourd : la file est vidée par `_drain`, qui la supprime
+    workers.submit(lobby, lambda: None, heavy=True)
+    workers.submit(lobby, lambda: workers.forget(lobby.lobby_id))
+    fn, args = spawned.pop()
+    fn(*args)
+    assert workers.stats()["lobbies"] == {}
+
+
+def test_failing_deadline_is_logged(caplog):
+    clock = [0.0]
+    scheduler = DeadlineScheduler(clock=lambda: clock[0])
+    fired = []
+
+    def boom():
+        raise RuntimeError("boum")
+
+    scheduler.call_at(1.0, boom)
+    scheduler.call_at(2.0, fired.append, "suivante")
+    clock[0] = 5.0
+    with caplog.at_level(logging.ERROR, logger="moneydrop.timers"):
+        assert scheduler.run_due() == 2
+    assert fired == ["suivante"]
+    assert "boum" in caplog.text
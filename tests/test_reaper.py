@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from moneydrop.reaper import CapacityError, Reaper
+from moneydrop.session import SessionManager
+
+TTLS = {"waiting": 600.0, "playing": 1800.0, "finished": 120.0}
+
+
+class Obj:
+    def __init__(self, phase, now):
+        self.phase = phase
+        self.last_activity = now
+
+
+def _reaper(present, clock, max_live):
+    return Reaper(
+        lambda o: o.phase,
+        lambda key, obj: present.pop(key),
+        TTLS,
+        max_live=max_live,
+        clock=lambda: clock[0],
+    )
+
+
+def _create(reaper, present, key, phase, now):
+    reaper.admit()
+    present[key] = Obj(phase, now)
+    reaper.add(key, present[key])
+
+
+def test_cap_evicts_finished_games_only():
+    clock = [100.0]
+    present = {}
+    reaper = _reaper(present, clock, max_live=4)
+    _create(reaper, present, "old-playing", "playing", 1.0)
+    _create(reaper, present, "finished", "finished", 50.0)
+    _create(reaper, present, "playing", "playing", 60.0)
+    _create(reaper, present, "recent-finished", "finished", 90.0)
+
+    # La partie en cours la plus ancienne reste : seule la partie terminée la plus ancienne part
+    _create(reaper, present, "new", "waiting", 100.0)
+    assert set(present) == {"old-playing", "playing", "recent-finished", "new"}
+    assert reaper.evicted == 1
+
+
+def test_cap_refuses_creation_instead_of_evicting_live_games():
+    clock = [100.0]
+    present = {}
+    reaper = _reaper(present, clock, max_live=3)
+    for i in range(3):
+        _create(reaper, present, f"k{i}", "playing", 100.0)
+
+    with pytest.raises(CapacityError):
+        reaper.admit()
+    assert set(present) == {"k0", "k1", "k2"}
+    assert reaper.stats()["refused"] == 1
+
+    # Une partie qui se termine libère une place à la création suivante (après la pause d'1 s)
+    present["k1"].phase = "finished"
+    clock[0] += 1.0
+    _create(reaper, present, "k3", "playing", clock[0])
+    assert set(present) == {"k0", "k2", "k3"}
+
+
+def test_cap_evicts_expired_live_games():
+    clock = [100.0]
+    present = {}
+    reaper = _reaper(present, clock, max_live=2)
+    _create(reaper, present, "stale", "playing", 100.0)
+    _create(reaper, present, "fresh", "playing", 100.0)
+    present["fresh"].last_activity = 1000.0
+
+    # Échue sans que le balayage soit encore passé : elle peut laisser sa place
+    clock[0] = 100.0 + TTLS["playing"] + 1
+    _create(reaper, present, "new", "waiting", clock[0])
+    assert set(present) == {"fresh", "new"}
+
+
+def test_session_manager_refuses_when_full():
+    class Session:
+        finished = eliminated = False
+
+        def __init__(self):
+            self.last_activity = time.time()
+
+    sessions = SessionManager(max_live=1)
+    sessions.create(Session())
+    with pytest.raises(CapacityError):
+        sessions.create(Session())
+    assert len(sessions.reaper) == 1
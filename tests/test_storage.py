@@ -0,0 +1,29 @@
+from moneydrop.storage import JournalStorage
+
+
+def test_journal_torn_multibyte_tail(tmp_path):
+    path = tmp_path / "leaderboard.json"
+    board = JournalStorage(str(path))
+    board.update("Zoé", 1200, 3)
+    board.close()
+    # Crash au milieu de l'écriture d'un « é » (2 octets en UTF-8) : seul le premier est écrit
+    with open(f"{path}.journal", "ab") as f:
+        f.write('["Andr'.encode("utf-8") + "é".encode("utf-8")[:1])
+
+    board = JournalStorage(str(path))
+    assert [(e.name, e.best_chips) for e in board.top(10)] == [("Zoé", 1200)]
+    # La ligne suivante ne se colle pas au reste tronqué
+    board.update("Léa", 900, 2)
+    board.close()
+    board = JournalStorage(str(path))
+    assert [(e.name, e.best_chips) for e in board.top(10)] == [("Zoé", 1200), ("Léa", 900)]
+    board.close()
+
+
+def test_journal_malformed_lines_are_skipped(tmp_path):
+    path = tmp_path / "leaderboard.json"
+    with open(f"{path}.journal", "w", encoding="utf-8") as f:
+        f.write('["Ana", 500, 1]\n["Bob", "abc", 1]\n[null]\n["Eve", 300, "z"]\n')
+    board = JournalStorage(str(path))
+    assert [e.name for e in board.top(10)] == ["Ana"]
+    board.close()
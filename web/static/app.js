@@ -234,8 +234,29 @@ function renderLeaderboard(state){
     container.appendChild(row);
   });
 
+  lastEntriesCount = entries.length;
+  renderRankFooter(state?.rank);
+}
+
+// Position poussée par le serveur (Socket.IO `rank_changed`) entre deux rafraîchissements
+let lastEntriesCount = 0;
+
+function renderRankFooter(value){
   const footer = $('leaderboardFooter');
-  if(footer) footer.textContent = `${entries.length} joueurs connectés`;
+  if(!footer) return;
+  const rank = Number(value ?? 0);
+  footer.textContent = rank > 0
+    ? `${lastEntriesCount} joueurs connectés — votre position : #${rank.toLocaleString('fr-FR')}`
+    : `${lastEntriesCount} joueurs connectés`;
+}
+
+function watchRank(){
+  if(typeof io === 'undefined') return;
+  const socket = io();
+  socket.on('connect', () => socket.emit('watch_rank', {}));
+  socket.on('rank_changed', (data) => {
+    if(lastEntriesCount > 0) renderRankFooter(data?.rank);
+  });
 }
 
 function escapeHtml(str){
@@ -474,6 +495,7 @@ function bindPlay(){
   }
 
   refresh().catch(() => { window.location.href = '/'; });
+  watchRank();
 }
 
 bindPlay();
@@ -7,7 +7,8 @@
     phase: 'waiting',
     question_index: 0,
     question_total: 0,
-    time_remaining: 0,
+    time_remaining: null,
+    question_deadline: null,
     question: null,
     players: [],
     correct: null
@@ -21,16 +22,18 @@
 
   // Socket connection
   const socket = io(window.location.origin, { transports: ['websocket','polling'] });
+  const clock = window.MD_LOBBY_STATE.clock(socket);
 
   // ========================================
   // SOCKET EVENTS
   // ========================================
   socket.on('connect', () => {
-    socket.emit('join_lobby', { lobby_id: lobbyId, role: 'host', player_name: playerName });
+    // Reconnexion : dernière version vue, le serveur ne renvoie que ce qui a été manqué
+    socket.emit('join_lobby', { lobby_id: lobbyId, role: 'host', player_name: playerName, since: lobbyState.since() });
   });
 
   socket.on('error_msg', (p) => setMessage(p?.error || 'Erreur'));
-  socket.on('state', (state) => {
+  const lobbyState = window.MD_LOBBY_STATE.bind(socket, lobbyId, (state) => {
     currentState = state;
     render(state);
   });
@@ -42,8 +45,9 @@
     }, 1500);
   });
 
-  socket.on('tick', (p) => {
-    const timeRemaining = p?.time_remaining ?? 0;
+  // Compte à rebours local, recalé sur l'horloge serveur (plus de `tick` réseau)
+  setInterval(() => {
+    const timeRemaining = clock.remaining(currentState) ?? 0;
     const el = document.getElementById('timeRemaining');
     if(el) el.textContent = String(timeRemaining);
 
@@ -56,7 +60,7 @@
       countdownMusic.currentTime = 0;
       musicPlaying = false;
     }
-  });
+  }, 250);
 
   // ========================================
   // RENDER FUNCTION
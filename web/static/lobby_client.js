@@ -19,13 +19,16 @@
 
   // Connexion SocketIO sur le même host que la page
   const socket = io(window.location.origin, { transports: ['websocket','polling'] });
+  const clock = window.MD_LOBBY_STATE.clock(socket);
 
   socket.on('connect', () => {
-    // Rejoindre le lobby avec le nom du joueur
+    // Rejoindre le lobby avec le nom du joueur ; à une reconnexion, avec la dernière version vue
+    // (le serveur ne renvoie que ce qui a été manqué)
     socket.emit('join_lobby', { 
       lobby_id: lobbyId, 
       role: 'player',
-      player_name: playerName
+      player_name: playerName,
+      since: lobbyState.since()
     });
   });
 
@@ -96,7 +99,7 @@
     }
   });
   
-  socket.on('state', (state) => {
+  const lobbyState = window.MD_LOBBY_STATE.bind(socket, lobbyId, (state) => {
     currentState = state;
     
     // Récupérer mes informations
@@ -231,7 +234,7 @@
     document.getElementById('qCounter').textContent = String(qIndex);
     document.getElementById('category').textContent = state.question?.category ?? '';
     document.getElementById('prompt').textContent = state.question?.prompt ?? '';
-    document.getElementById('timerValue').textContent = String(state.time_remaining ?? 60);
+    document.getElementById('timerValue').textContent = String(clock.remaining(state) ?? state.time_limit ?? 60);
 
     // Ne pas déclencher l'animation cinématique ici, elle est gérée par l'événement new_question
     renderAnswers(state);
@@ -528,13 +531,14 @@
     input.addEventListener('change', (e) => handleBetInput(e, true));
   });
 
-  // Gestion du timeout
-  socket.on('tick', (p) => {
+  // Compte à rebours local : échéance absolue de l'état + décalage d'horloge (aucun message réseau)
+  setInterval(() => {
     if(!timerActive) return;
-    const remaining = p?.time_remaining ?? 0;
-    document.getElementById('timerValue').textContent = Math.max(0, remaining);
+    const remaining = clock.remaining(currentState);
+    if(remaining === null) return;
+    document.getElementById('timerValue').textContent = remaining;
     updateTimerProgress(remaining);
-  });
+  }, 250);
 
   function enableBetting(){
     if(isSpectator) return; // prevent enabling for spectators
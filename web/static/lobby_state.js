@@ -0,0 +1,100 @@
+// État de salon versionné : application des patchs `state_delta` envoyés par le serveur.
+// Patch : {v, base, set?: {champ: valeur}, players?: {sid: {champs modifiés}}, removed?: [sid]}
+(function(){
+  // Renvoie le nouvel état, ou null si le patch ne s'applique pas (trou de version → resynchroniser)
+  function apply(state, patch){
+    if(!state || !patch || state.v !== patch.base) return null;
+    const next = Object.assign({}, state, patch.set || {});
+    next.v = patch.v;
+
+    const removed = new Set(patch.removed || []);
+    const changes = patch.players || {};
+    const seen = new Set();
+    const players = [];
+    for(const p of (state.players || [])){
+      if(removed.has(p.sid)) continue;
+      seen.add(p.sid);
+      players.push(changes[p.sid] ? Object.assign({}, p, changes[p.sid]) : p);
+    }
+    // Nouveaux joueurs : ajoutés en fin de liste, comme côté serveur
+    for(const sid of Object.keys(changes)){
+      if(!seen.has(sid)) players.push(Object.assign({sid}, changes[sid]));
+    }
+    next.players = players;
+    return next;
+  }
+
+  // Branche `state` et `state_delta` sur `onState(state)` ; redemande l'état complet en cas de trou.
+  // Renvoie `since()` : dernière version reçue ({v, epoch}, null avant le premier état), à joindre
+  // à `join_lobby` pour qu'une reconnexion ne reçoive que les patchs manqués
+  function bind(socket, lobbyId, onState){
+    let current = null;
+    let resyncing = false;
+    socket.on('state', (state) => {
+      current = state;
+      resyncing = false;
+      onState(state);
+    });
+    socket.on('state_delta', (patch) => {
+      // Patch déjà couvert par l'état courant (arrivé après une resynchronisation)
+      if(current && patch.v <= current.v) return;
+      const next = apply(current, patch);
+      if(!next){
+        if(!resyncing){
+          resyncing = true;
+          socket.emit('request_state', { lobby_id: lobbyId });
+        }
+        return;
+      }
+      // Patch qui s'enchaîne (p. ex. rejoué après une reconnexion) : plus rien à resynchroniser
+      resyncing = false;
+      current = next;
+      onState(next);
+    });
+    return {
+      since(){
+        return current && current.epoch ? { v: current.v, epoch: current.epoch } : null;
+      }
+    };
+  }
+
+  // Horloge serveur : à chaque connexion, quelques échanges `clock_sync` (type NTP) ; on garde
+  // l'échantillon au plus court aller-retour : décalage = heure serveur − milieu de l'aller-retour
+  function clock(socket, samples){
+    let offset = null;
+    let best = Infinity;
+    function sample(left){
+      const t0 = performance.now();
+      socket.emit('clock_sync', { t0 }, (resp) => {
+        const t1 = performance.now();
+        if(resp && typeof resp.server === 'number' && t1 - t0 <= best){
+          best = t1 - t0;
+          offset = resp.server - (t0 + t1) / 2;
+        }
+        if(left > 1) sample(left - 1);
+      });
+    }
+    socket.on('connect', () => {
+      best = Infinity;
+      sample(samples || 5);
+    });
+
+    function now(){
+      return offset === null ? null : performance.now() + offset;
+    }
+
+    // Secondes restantes d'après l'échéance absolue de l'état (null hors question/pause ou avant synchro)
+    function remaining(state){
+      if(!state) return null;
+      if(state.phase === 'paused') return state.time_remaining ?? null;
+      const t = now();
+      if(state.phase !== 'question' || state.question_deadline == null || t === null) return null;
+      const left = Math.floor((state.question_deadline - t) / 1000);
+      return Math.max(0, Math.min(state.time_limit ?? left, left));
+    }
+
+    return { now, remaining };
+  }
+
+  window.MD_LOBBY_STATE = { apply, bind, clock };
+})();
@@ -3,22 +3,45 @@ from __future__ import annotations
 import eventlet
 eventlet.monkey_patch()
 
+import atexit
+import json
 import os
 import secrets
+import sys
 import threading
-import time
-from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Dict, Optional
 
+from eventlet import tpool
+from eventlet.event import Event
 from flask import Flask, jsonify, redirect, render_template, request, session, url_for
-from flask_socketio import SocketIO, emit, join_room
-
+from flask_socketio import SocketIO, emit
+
+from moneydrop.cluster import (
+    BrokerManager,
+    Cluster,
+    LeaderboardRelay,
+    LobbyRegistry,
+    parse_address,
+    supervise,
+)
 from moneydrop.engine import MoneyDropEngine
+from moneydrop.journal import LobbyJournal
 from moneydrop.leaderboard import Leaderboard
 from moneydrop.models import GameConfig
+from moneydrop.offload import LobbyWorkers, PreEncodedJSON, encode
 from moneydrop.questions import build_question_bank
+from moneydrop.ranking import RankWatchers
+from moneydrop.reaper import CapacityError, parse_ttls
+from moneydrop.realtime import (
+    BroadcastScheduler,
+    RealtimeLobby,
+    RealtimeLobbyManager,
+    server_time_ms,
+)
 from moneydrop.session import GameSession, SessionManager, LobbyManager, LobbyPlayer
+from moneydrop.timers import DeadlineScheduler
+from moneydrop.windows import WINDOWS
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -32,6 +55,19 @@ def create_app() -> Flask:
     )
     app.secret_key = os.environ.get("MONEYDROP_SECRET", "dev-secret-change-me")
 
+    # Salons d'au moins MONEYDROP_OFFLOAD_MIN_PLAYERS joueurs : validation et état (encodé en JSON)
+    # calculés sur le pool de threads d'eventlet, dans l'ordre par salon ; 0 = tout sur la boucle
+    offload_min_players = int(os.environ.get("MONEYDROP_OFFLOAD_MIN_PLAYERS", "0"))
+    # Plusieurs processus (MONEYDROP_WORKERS, lancés par ce script) : salons répartis par lobby_id,
+    # émissions Socket.IO relayées entre processus par le courtier (MONEYDROP_BROKER)
+    cluster = Cluster.from_env()
+    socket_options = {}
+    if offload_min_players > 0:
+        # Charges déjà encodées hors de la boucle (RawJSON) insérées telles quelles
+        socket_options["json"] = PreEncodedJSON
+    if cluster is not None:
+        socket_options["client_manager"] = BrokerManager(cluster.client)
+
     socketio = SocketIO(
         app,
         cors_allowed_origins="*",
@@ -39,13 +75,38 @@ def create_app() -> Flask:
         engineio_logger=False,
         socketio_logger=False,
         ping_timeout=60,
-        ping_interval=25
+        ping_interval=25,
+        **socket_options,
     )
 
-    leaderboard = Leaderboard(str(BASE_DIR / "data" / "leaderboard.json"))
+    leaderboard = Leaderboard(
+        str(BASE_DIR / "data" / "leaderboard.json"),
+        # Plusieurs processus : une base SQLite partagée plutôt qu'un fichier JSON réécrit par
+        # chacun
+        backend=os.environ.get(
+            "MONEYDROP_LEADERBOARD_BACKEND", "json" if cluster is None else "sqlite"
+        ),
+        # Sous eventlet, la sauvegarde synchrone bloquerait le hub pendant l'écriture du fichier
+        write_behind=os.environ.get("MONEYDROP_LEADERBOARD_WRITE_BEHIND", "1") == "1",
+    )
+    atexit.register(leaderboard.close)
+    # Plusieurs processus : améliorations et soirées relayées par le courtier (classements
+    # glissants, ETag de /api/leaderboard et positions poussées identiques partout)
+    leaderboard_relay: Optional[LeaderboardRelay] = None
+    if cluster is not None:
+        leaderboard_relay = LeaderboardRelay(cluster.client, cluster.index, leaderboard)
+        socketio.start_background_task(leaderboard_relay.listen)
     engine = MoneyDropEngine(build_question_bank())
-    sessions = SessionManager()
-    lobbies = LobbyManager()
+    # Sessions et salons inactifs expirés par phase (MONEYDROP_TTLS="finished=600,waiting=3600"),
+    # parties terminées évincées au-delà de MONEYDROP_MAX_LIVE objets par gestionnaire
+    ttls = parse_ttls(os.environ.get("MONEYDROP_TTLS", ""))
+    max_live = int(os.environ.get("MONEYDROP_MAX_LIVE", "10000"))
+    sessions = SessionManager(ttls=ttls, max_live=max_live)
+    # Échéances des questions (salons temps réel et HTTP) : un tas de minuteries, pas de sondage
+    scheduler = DeadlineScheduler()
+    socketio.start_background_task(scheduler.run)
+    atexit.register(scheduler.close)
+    lobbies = LobbyManager(scheduler=scheduler, ttls=ttls, max_live=max_live)
     config = GameConfig(starting_chips=10000, question_count=7, allow_unbet_chips=True)
 
     create_lobby_password = os.environ.get("MONEYDROP_CREATE_PASSWORD", "Droit_Terrasse2026")
@@ -58,284 +119,91 @@ def create_app() -> Flask:
             session["sid"] = sid
         return sid
 
-    @dataclass
-    class RTPlayer:
-        sid: str
-        name: str
-        score: int = 10000  # capital à miser (jetons)
-        choice: Optional[str] = None
-        is_correct: Optional[bool] = None
-        eliminated: bool = False  # Défaite totale (capital=0)
-        bets: Dict[str, int] = field(default_factory=lambda: {"A": 0, "B": 0, "C": 0, "D": 0})
-        socket_id: Optional[str] = None  # SocketIO session ID
-        ip: Optional[str] = None  # last known IP address
-
-    @dataclass
-    class RealtimeLobby:
-        lobby_id: str
-        host_sid: str
-        host_name: str
-        max_players: int = 50
-        time_limit: int = 30
-        question_total: int = 10
-        created_at: float = field(default_factory=time.time)
-        lock: threading.Lock = field(default_factory=threading.Lock)
-
-        phase: str = "waiting"  # waiting|question|paused|results|finished
-        question_index: int = 0
-        question_started_at: Optional[float] = None
-        paused_remaining: Optional[int] = None
-
-        questions: list = field(default_factory=list)
-        correct: Optional[str] = None
-        players: Dict[str, RTPlayer] = field(default_factory=dict)
-        # SIDs of players who were eliminated and must not rejoin as active players
-        banned_sids: set = field(default_factory=set)
-
-        # Durée de la cinématique côté client avant affichage du plateau (voir web/static/cinematic.js)
-        CINEMATIC_DELAY_SECONDS = 4.5  # 4s animation + 0.5s transition
-
-        def add_player(self, sid: str, name: str, socket_sid: str = None, ip: Optional[str] = None) -> None:
-            with self.lock:
-                if sid in self.players:
-                    self.players[sid].name = name
-                    if socket_sid:
-                        self.players[sid].socket_id = socket_sid
-                    if ip:
-                        self.players[sid].ip = ip
-                    return
-                if len(self.players) >= self.max_players:
-                    raise ValueError("Lobby plein")
-                self.players[sid] = RTPlayer(sid=sid, name=name, score=10000, socket_id=socket_sid, ip=ip)
-
-        def time_remaining(self) -> Optional[int]:
-            if self.phase == "question" and self.question_started_at is not None:
-                elapsed = max(0.0, time.time() - self.question_started_at)
-                return max(0, int(self.time_limit - elapsed))
-            if self.phase == "paused" and self.paused_remaining is not None:
-                return int(self.paused_remaining)
+    # Tout travail sur un salon temps réel passe par `workers` (ordre garanti par salon) ; le
+    # travail lourd des grands salons part sur le pool, `done` émet ensuite depuis la boucle
+    workers = LobbyWorkers(tpool.execute, socketio.start_background_task, offload_min_players)
+    if workers.min_players > 0:
+        # Retard de la boucle : mesuré seulement quand du travail peut la quitter
+        socketio.start_background_task(workers.probe, socketio.sleep)
+
+    def _event(lobby: RealtimeLobby, event: str, payload: dict) -> None:
+        # Événement du salon, gardé dans sa fenêtre de reconnexion (rejoué à qui l'a manqué)
+        lobby.record(event, payload)
+        socketio.emit(event, payload, room=lobby.lobby_id)
+
+    def _validate(lobby: RealtimeLobby) -> None:
+        # Validation, révélation de la réponse puis état
+        def reveal(_) -> None:
+            payload = {"correct": lobby.correct, "question_index": lobby.question_index}
+            _event(lobby, "reveal_answer", payload)
+
+        workers.submit(lobby, lobby.validate, reveal, heavy=True)
+        broadcaster.now(lobby)
+
+    def _on_expire(lobby: RealtimeLobby) -> None:
+        # Temps écoulé
+        _validate(lobby)
+
+    def _forget(lobby: RealtimeLobby) -> None:
+        broadcaster.forget(lobby.lobby_id)
+        workers.forget(lobby.lobby_id)
+
+    # Un salon travaillé sur le pool a besoin d'un vrai verrou (les verrous verts ne valent
+    # qu'entre tâches de la boucle)
+    lock_factory = threading.Lock
+    if offload_min_players > 0:
+        lock_factory = eventlet.patcher.original("threading").Lock
+    # Reprise après crash : transitions des salons journalisées (MONEYDROP_LOBBY_JOURNAL, vide pour
+    # couper), instantané toutes les MONEYDROP_LOBBY_SNAPSHOT s ; salons reconstruits au démarrage
+    journal_path = os.environ.get(
+        "MONEYDROP_LOBBY_JOURNAL", str(BASE_DIR / "data" / "lobbies.json")
+    )
+    journal = None
+    if journal_path:
+        if cluster is not None:
+            journal_path = f"{journal_path}.{cluster.index}"  # salons de ce processus seulement
+        journal = LobbyJournal(journal_path, engine.questions, lock_factory=lock_factory)
+        atexit.register(journal.close)
+
+    rt_lobbies = RealtimeLobbyManager(
+        scheduler=scheduler,
+        on_expire=_on_expire,
+        ttls=ttls,
+        max_live=max_live,
+        on_remove=_forget,
+        max_players=int(os.environ.get("MONEYDROP_LOBBY_MAX_PLAYERS", "50")),
+        lock_factory=lock_factory,
+        owns=cluster.owns if cluster is not None else None,
+        journal=journal,
+        # Reconnexion : patchs et événements récents gardés par salon (rejoués au lieu de l'état)
+        history=int(os.environ.get("MONEYDROP_LOBBY_HISTORY", "64")),
+        # Échéances et retraits dans l'ordre du salon : jamais son verrou pris depuis la boucle
+        # pendant qu'il travaille sur le pool
+        dispatch=lambda lobby, work: workers.submit(lobby, work),
+    )
+    # Annuaire des salons joignables : celui de ce processus, ou fusionné avec ceux des autres
+    listing = rt_lobbies
+    registry: Optional[LobbyRegistry] = None
+    if cluster is not None:
+        listing = registry = LobbyRegistry(cluster.client, cluster.index, rt_lobbies)
+        socketio.start_background_task(registry.listen)
+
+        def _relay() -> None:
+            registry.publish()
+            scheduler.call_later(1.0, _relay)
+
+        scheduler.call_later(0.0, _relay)
+
+    def _elsewhere(lobby_id: str):
+        # Salon d'un autre processus : redirection vers son propriétaire (307 : méthode et corps
+        # gardés)
+        if cluster is None or cluster.owns(lobby_id):
             return None
+        url = cluster.url(lobby_id, request.host_url, request.full_path.rstrip("?"))
+        return redirect(url, code=307)
 
-        def current_question(self) -> Optional[Dict[str, Any]]:
-            if not self.questions or self.question_index >= len(self.questions):
-                return None
-            q = self.questions[self.question_index]
-            return {
-                "category": q.category,
-                "prompt": q.prompt,
-                "answers": q.answers,
-            }
-
-        def start_game(self, questions: list) -> None:
-            with self.lock:
-                if self.phase != "waiting":
-                    # idempotent: on n'écrase pas une partie en cours
-                    return
-                self.questions = list(questions)[: self.question_total]
-                self.question_index = 0
-                self.correct = None
-                self.question_started_at = None
-                self.paused_remaining = None
-                for p in self.players.values():
-                    p.score = 10000  # Reset jetons
-                    p.eliminated = False  # Reset statut éliminé
-                    p.choice = None
-                    p.is_correct = None
-                    p.bets = {"A": 0, "B": 0, "C": 0, "D": 0}
-                # Le host déclenche explicitement le lancement de question
-                self.phase = "waiting"
-
-        def launch_question(self) -> None:
-            with self.lock:
-                if self.phase not in ("waiting", "results"):
-                    return
-                if self.question_index >= len(self.questions):
-                    self.phase = "finished"
-                    return
-                self.correct = None
-                for p in self.players.values():
-                    p.choice = None
-                    p.is_correct = None
-                    # Ne réinitialiser les mises que si le joueur n'est pas éliminé
-                    if not p.eliminated:
-                        p.bets = {"A": 0, "B": 0, "C": 0, "D": 0}
-                self.phase = "question"
-                # Le chrono démarre après la cinématique (plateau visible)
-                self.question_started_at = time.time() + self.CINEMATIC_DELAY_SECONDS
-                self.paused_remaining = None
-
-        def pause(self) -> None:
-            with self.lock:
-                if self.phase != "question":
-                    return
-                self.paused_remaining = self.time_remaining()
-                self.phase = "paused"
-
-        def resume(self) -> None:
-            with self.lock:
-                if self.phase != "paused":
-                    return
-                remaining = int(self.paused_remaining or 0)
-                self.question_started_at = time.time() - (self.time_limit - remaining)
-                self.paused_remaining = None
-                self.phase = "question"
-
-        def answer(self, sid: str, choice: str) -> None:
-            with self.lock:
-                if self.phase != "question":
-                    return
-                if sid not in self.players:
-                    return
-                c = (choice or "").strip().upper()[:1]
-                if c not in ("A", "B", "C", "D"):
-                    return
-                self.players[sid].choice = c
-
-        def place_bets(self, sid: str, bets: Dict[str, int]) -> None:
-            """Place les mises d'un joueur"""
-            with self.lock:
-                if self.phase != "question":
-                    return
-                if sid not in self.players:
-                    return
-                p = self.players[sid]
-                # Valider les mises jetons
-                total_bet = sum(bets.get(k, 0) for k in ["A", "B", "C", "D"])
-                if total_bet > p.score:
-                    return  # Mise invalide
-                
-                p.bets = {k: bets.get(k, 0) for k in ["A", "B", "C", "D"]} 
-
-
-        def all_players_bet(self) -> bool:
-            """Vérifie si tous les joueurs ont misé"""
-            with self.lock:
-                if self.phase != "question":
-                    return False
-                for p in self.players.values():
-                    # Si p.bets est vide ou toutes les mises sont à 0, le joueur n'a pas misé
-                    if not p.bets or sum(p.bets.values()) == 0:
-                        return False
-                return len(self.players) > 0  # Au moins un joueur et tous ont misé
-
-        def validate(self) -> None:
-            with self.lock:
-                if self.phase not in ("question", "paused"):
-                    return
-                if self.question_index >= len(self.questions):
-                    self.phase = "finished"
-                    return
-                q = self.questions[self.question_index]
-                self.correct = q.correct
-
-                # Calculer les gains/pertes pour chaque joueur
-                for p in self.players.values():
-                    # Ignorer les joueurs déjà éliminés
-                    if p.eliminated:
-                        p.is_correct = None
-                        continue
-                    
-                    # Si le joueur n'a pas misé (p.bets vide ou tout à 0), il perd tout son capital
-                    if not p.bets or sum(p.bets.values()) == 0:
-                        p.score = 0
-                        p.is_correct = False
-                    else:
-                        correct_bet = p.bets.get(self.correct, 0)
-                        # Le joueur garde UNIQUEMENT sa mise correcte (les jetons non misés sont perdus)
-                        p.score = correct_bet
-                        p.is_correct = correct_bet > 0
-
-                    # Si capital = 0 → défaite totale
-                    if p.score <= 0:
-                        p.eliminated = True
-                        p.score = 0
-                        p.bets = {"A": 0, "B": 0, "C": 0, "D": 0}
-                                # Prevent the eliminated player from re-joining as an active player (ban sid and ip if available)
-                        try:
-                            if p.sid:
-                                self.banned_sids.add(p.sid)
-                            if getattr(p, 'ip', None):
-                                self.banned_sids.add(p.ip)
-                        except Exception:
-                            pass 
-
-                self.phase = "results"
-
-        def next_question(self) -> None:
-            with self.lock:
-                if self.phase != "results":
-                    return
-                self.question_index += 1
-                if self.question_index >= len(self.questions):
-                    self.phase = "finished"
-                    return
-                self.correct = None
-                self.question_started_at = None
-                self.paused_remaining = None
-                for p in self.players.values():
-                    p.choice = None
-                    p.is_correct = None
-                    # Ne réinitialiser les mises que si le joueur n'est pas éliminé
-                    if not p.eliminated:
-                        p.bets = {"A": 0, "B": 0, "C": 0, "D": 0}
-                self.phase = "waiting"
-
-        def snapshot(self) -> Dict[str, Any]:
-            with self.lock:
-                return {
-                    "lobby_id": self.lobby_id,
-                    "phase": self.phase,
-                    "time_remaining": self.time_remaining(),
-                    "question_index": self.question_index,
-                    "question_total": len(self.questions) if self.questions else self.question_total,
-                    "question": self.current_question() if self.phase in ("question", "paused", "results") else None,
-                    "correct": self.correct if self.phase == "results" else None,
-                    "host_sid": self.host_sid,
-                    "host_name": self.host_name,
-                    "players": [
-                        {
-                            "sid": p.sid,
-                            "name": p.name,
-                            "score": p.score,
-                            "eliminated": p.eliminated,
-                            "choice": p.choice,
-                            "is_correct": p.is_correct if self.phase == "results" else None,
-                            "socket_id": p.socket_id,
-                        }
-                        for p in self.players.values()
-                    ],
-                }
-
-    class RealtimeLobbyManager:
-        def __init__(self):
-            self._lock = threading.Lock()
-            self._lobbies: Dict[str, RealtimeLobby] = {}
-
-        def create(self, host_sid: str, host_name: str, max_players: int, time_limit: int) -> RealtimeLobby:
-            lobby_id = secrets.token_urlsafe(8)
-            lobby = RealtimeLobby(
-                lobby_id=lobby_id,
-                host_sid=host_sid,
-                host_name=host_name,
-                max_players=max(2, min(int(max_players), 50)),
-                time_limit=max(5, min(int(time_limit), 120)),
-                question_total=10,
-            )
-            # Ne pas ajouter automatiquement le host comme joueur
-            # lobby.add_player(host_sid, host_name)
-            with self._lock:
-                self._lobbies[lobby_id] = lobby
-            return lobby
-
-        def get(self, lobby_id: str) -> Optional[RealtimeLobby]:
-            with self._lock:
-                return self._lobbies.get(lobby_id)
-
-        def all(self) -> Dict[str, RealtimeLobby]:
-            with self._lock:
-                return dict(self._lobbies)
-
-    rt_lobbies = RealtimeLobbyManager()
+    for reaper in (sessions.reaper, lobbies.reaper, rt_lobbies.reaper):
+        reaper.start(scheduler, float(os.environ.get("MONEYDROP_REAP_INTERVAL", "30")))
 
     def _require_session() -> tuple[str, GameSession]:
         sid = session.get("sid")
@@ -353,23 +221,22 @@ def create_app() -> Flask:
 
     @app.get("/menu")
     def menu():
-        return render_template("menu.html")
+        return render_template("menu.html", max_size=rt_lobbies.max_players)
 
     @app.get("/api/lobbies")
     def list_lobbies():
         """Liste tous les salons disponibles (en attente de joueurs)"""
-        available = []
-        for lobby_id, lobby in rt_lobbies._lobbies.items():
-            if lobby.phase == "waiting" and len(lobby.players) < lobby.max_players:
-                available.append({
-                    "lobby_id": lobby_id,
-                    "host_name": lobby.host_name,
-                    "players": len(lobby.players),
-                    "max_players": lobby.max_players,
-                    "time_limit": lobby.time_limit,
-                    "question_total": lobby.question_total,
-                })
-        return jsonify({"ok": True, "lobbies": available})
+        # Annuaire tenu à jour par le gestionnaire : le menu qui sonde reçoit 304 tant que rien ne
+        # change
+        etag = listing.listing_etag()
+        if request.if_none_match.contains(etag):
+            resp = app.response_class(status=304)
+        else:
+            etag, body = listing.joinable()
+            resp = app.response_class(body, mimetype="application/json")
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
 
     @app.post("/start")
     def start():
@@ -378,7 +245,12 @@ def create_app() -> Flask:
             return render_template("index.html", error="Veuillez entrer un nom."), 400
 
         game = GameSession(engine=engine, player_name=name, config=config)
-        sid = sessions.create(game)
+        try:
+            sid = sessions.create(game)
+        except CapacityError:
+            # Plafond atteint sans partie terminée à évincer : on refuse plutôt que d'en couper une
+            error = "Serveur complet, réessayez dans quelques instants."
+            return render_template("index.html", error=error), 503, {"Retry-After": "30"}
         session["sid"] = sid
         return redirect(url_for("play"))
 
@@ -404,9 +276,42 @@ def create_app() -> Flask:
             if request.is_json:
                 return jsonify({"ok": False, "error": "invalid password"}), 403
             # On renvoie une erreur pour affichage sous le champ
-            return render_template("menu.html", host_error="MTP incorrect", host_name=name, host_size=size, host_time_limit=time_limit)
+            return render_template(
+                "menu.html",
+                host_error="MTP incorrect",
+                host_name=name,
+                host_size=size,
+                host_time_limit=time_limit,
+                max_size=rt_lobbies.max_players,
+            )
+
+        if cluster is not None and not request.args.get("placed"):
+            # Plusieurs processus : création confiée à tour de rôle à chacun (307 : méthode et
+            # formulaire gardés ; `placed` évite un second tirage chez le processus choisi)
+            owner = cluster.place()
+            if owner != cluster.index:
+                path = url_for("lobby_create", placed=1)
+                return redirect(cluster.worker_url(owner, request.host_url, path), code=307)
 
-        lobby = rt_lobbies.create(host_sid=sid, host_name=name, max_players=size, time_limit=time_limit)
+        try:
+            lobby = rt_lobbies.create(
+                host_sid=sid, host_name=name, max_players=size, time_limit=time_limit
+            )
+        except CapacityError:
+            if request.is_json:
+                return jsonify({"ok": False, "error": "server full"}), 503, {"Retry-After": "30"}
+            return (
+                render_template(
+                    "menu.html",
+                    host_error="Serveur complet, réessayez plus tard",
+                    host_name=name,
+                    host_size=size,
+                    host_time_limit=time_limit,
+                    max_size=rt_lobbies.max_players,
+                ),
+                503,
+                {"Retry-After": "30"},
+            )
         # Stocker le nom de l'hôte en session
         session[f"player_name_{lobby.lobby_id}"] = name
         return redirect(url_for("lobby_host", lobby_id=lobby.lobby_id))
@@ -423,7 +328,8 @@ def create_app() -> Flask:
         name = (data.get("name") or "Joueur").strip()[:24]
 
         lobby = rt_lobbies.get(lobby_id)
-        if not lobby:
+        # Salon d'un autre processus : connu par l'annuaire partagé, sa page redirige vers lui
+        if not lobby and not (registry is not None and registry.knows(lobby_id)):
             if request.is_json:
                 return jsonify({"ok": False, "error": "unknown-lobby"}), 404
             return redirect(url_for("menu", error="unknown-lobby"))
@@ -440,6 +346,9 @@ def create_app() -> Flask:
 
     @app.get("/lobby/<lobby_id>/host")
     def lobby_host(lobby_id: str):
+        forward = _elsewhere(lobby_id)
+        if forward is not None:
+            return forward
         _ensure_sid()
         lobby = rt_lobbies.get(lobby_id)
         if not lobby:
@@ -452,6 +361,9 @@ def create_app() -> Flask:
 
     @app.get("/lobby/<lobby_id>/client")
     def lobby_client(lobby_id: str):
+        forward = _elsewhere(lobby_id)
+        if forward is not None:
+            return forward
         _ensure_sid()
         lobby = rt_lobbies.get(lobby_id)
         if not lobby:
@@ -463,6 +375,9 @@ def create_app() -> Flask:
     @app.get("/lobby/<lobby_id>/podium")
     def lobby_podium(lobby_id: str):
         """Page du podium final"""
+        forward = _elsewhere(lobby_id)
+        if forward is not None:
+            return forward
         _ensure_sid()
         lobby = rt_lobbies.get(lobby_id)
         if not lobby:
@@ -476,12 +391,142 @@ def create_app() -> Flask:
         return render_template("podium_final.html", lobby_id=lobby_id)
 
     # Socket.IO events
-    def _emit_state(lobby: RealtimeLobby) -> None:
-        socketio.emit("state", lobby.snapshot(), room=lobby.lobby_id)
+    def _encoded(payload: dict):
+        # En mode déporté, l'encodage JSON fait partie du travail lourd (hors de la boucle)
+        return encode(payload) if workers.min_players > 0 else payload
+
+    def _publish(lobby: RealtimeLobby) -> tuple:
+        # Patch versionné (champs modifiés seulement) ; état complet au premier envoi
+        state, patch = lobby.publish()
+        if patch is None:
+            return "state", _encoded(state)
+        if patch:
+            return "state_delta", _encoded(patch)
+        return None, None
+
+    def _emit_state(lobby: RealtimeLobby, skip_sid: Optional[str] = None) -> None:
+        def send(result: tuple) -> None:
+            event, payload = result
+            if event is not None:
+                socketio.emit(event, payload, room=lobby.lobby_id, skip_sid=skip_sid)
+
+        workers.submit(lobby, lambda: _publish(lobby), send, heavy=True)
+
+    def _send_state(lobby: RealtimeLobby, socket_sid: str) -> None:
+        # État complet à un seul client (arrivée, resynchronisation)
+        workers.submit(
+            lobby,
+            lambda: _encoded(lobby.current_state()),
+            lambda state: socketio.emit("state", state, to=socket_sid),
+            heavy=True,
+        )
+
+    # Reconnexions servies par la fenêtre de patchs du salon, ou par l'état complet
+    resumes = {"replayed": 0, "full": 0, "messages": 0}
+
+    def _resume(lobby: RealtimeLobby, socket_sid: str, since: dict) -> None:
+        # Arrivée ou reconnexion : ce que le client a manqué depuis sa version `since` (patchs et
+        # événements, dans l'ordre), l'état complet sinon. Le socket n'entre dans la room qu'après :
+        # les diffusions suivantes s'enchaînent sur ce qu'il vient de recevoir.
+        version, epoch = since.get("v"), since.get("epoch")
+
+        def work() -> list:
+            missed = lobby.since(version, epoch) if isinstance(version, int) else None
+            if missed is None:
+                return [("state", _encoded(lobby.current_state()))]
+            return [(e, _encoded(p) if e == "state_delta" else p) for e, p in missed]
+
+        def send(messages: list) -> None:
+            full = bool(messages) and messages[0][0] == "state"
+            resumes["full" if full else "replayed"] += 1
+            resumes["messages"] += len(messages)
+            for event, payload in messages:
+                socketio.emit(event, payload, to=socket_sid)
+            socketio.server.enter_room(socket_sid, lobby.lobby_id, namespace="/")
+
+        workers.submit(lobby, work, send, heavy=True)
+
+    def _then(lobby: RealtimeLobby, fn) -> None:
+        # Après tout ce qui est déjà soumis pour ce salon : garde l'ordre des événements
+        workers.submit(lobby, lambda: None, lambda _: fn())
+
+    # Mises et réponses : diffusions regroupées (MONEYDROP_BROADCAST_HZ par salon, 0 = immédiat),
+    # l'envoi différé d'un salon sale étant une échéance du tas de minuteries (pas de sondage) ;
+    # actions de l'hôte : diffusion immédiate
+    broadcaster = BroadcastScheduler(
+        _emit_state,
+        rate=float(os.environ.get("MONEYDROP_BROADCAST_HZ", "10")),
+        scheduler=scheduler,
+    )
+    if journal is not None:
+        # Après `broadcaster` et `workers` : un salon repris dont l'échéance est passée est
+        # validé aussitôt
+        restored = rt_lobbies.recover()
+        if restored:
+            app.logger.info("%d salon(s) repris du journal %s", restored, journal_path)
+        snapshot_every = float(os.environ.get("MONEYDROP_LOBBY_SNAPSHOT", "60"))
+
+        def _capture(lobby: RealtimeLobby) -> dict:
+            # État pris dans l'ordre du salon, derrière son travail sur le pool : c'est cette tâche
+            # qui attend, pas la boucle
+            captured = Event()
+            workers.submit(lobby, lobby.checkpoint, captured.send, heavy=True)
+            return captured.wait()
+
+        def _checkpoints() -> None:
+            while True:
+                socketio.sleep(snapshot_every)
+                try:
+                    rt_lobbies.checkpoint(_capture)
+                except Exception:
+                    app.logger.exception("instantané des salons en échec")
+
+        socketio.start_background_task(_checkpoints)
+        # Arrêt propre : instantané final, le redémarrage n'aura rien à rejouer
+        atexit.register(rt_lobbies.checkpoint)
 
     def _is_host(lobby: RealtimeLobby) -> bool:
         return session.get("sid") == lobby.host_sid
 
+    # Positions poussées aux joueurs connectés : seuls ceux que l'amélioration a dépassés sont
+    # notifiés
+    rank_watchers = RankWatchers()
+
+    def _push_rank_changes(name: str, old: Optional[int], new: int) -> None:
+        for sockets, rank, prev in rank_watchers.apply(name, old, new):
+            payload = {"rank": rank, "prev": prev}
+            for socket_id in sockets:
+                socketio.emit("rank_changed", payload, to=socket_id)
+
+    leaderboard.on_rank_change(_push_rank_changes)
+
+    @socketio.on("watch_rank")
+    def _ws_watch_rank(payload):
+        """Abonne ce socket aux changements de position du joueur solo de la session."""
+        game = sessions.get(session.get("sid") or "")
+        if game is None:
+            emit("error_msg", {"error": "unknown-session"})
+            return
+        name = game.player.name
+        rank = leaderboard.rank(name)
+        rank_watchers.watch(name, request.sid, rank)
+        emit("rank_changed", {"rank": rank, "prev": rank})
+
+    # Salon de chaque socket connecté : à la déconnexion, le joueur est détaché de son socket
+    socket_lobbies: Dict[str, str] = {}
+
+    @socketio.on("disconnect")
+    def _ws_disconnect():
+        rank_watchers.unwatch(request.sid)
+        socket_sid = request.sid
+        lobby = rt_lobbies.get(socket_lobbies.pop(socket_sid, ""))
+        if lobby is not None:
+            workers.submit(
+                lobby,
+                lambda: lobby.detach_socket(socket_sid),
+                lambda sid: sid and broadcaster.mark(lobby),
+            )
+
     @socketio.on("join_lobby")
     def _ws_join(payload):
         data = payload or {}
@@ -489,6 +534,8 @@ def create_app() -> Flask:
         role = (data.get("role") or "player").strip()
         player_name = (data.get("player_name") or "Joueur").strip()[:24]
         socket_sid = request.sid  # SocketIO session ID unique
+        # Reconnexion : dernière version vue ({v, epoch}), seuls les patchs manqués sont renvoyés
+        since = data.get("since") if isinstance(data.get("since"), dict) else {}
         
         lobby = rt_lobbies.get(lobby_id)
         if not lobby:
@@ -503,36 +550,61 @@ def create_app() -> Flask:
 
             # Si ce SID est banni (éliminé), forcer le spectateur
             # Check if the player is banned by sid or IP
-            banned_ip = request.remote_addr
-            if sid in lobby.banned_sids or (banned_ip and banned_ip in lobby.banned_sids):
+            if lobby.is_banned(sid, request.remote_addr):
                 # Joindre la room mais ne pas ajouter comme joueur actif
-                join_room(lobby_id)
                 emit("force_spectator", {"message": "Vous êtes éliminé — mode spectateur"})
-                # Envoyer l'état courant
-                emit("state", lobby.snapshot())
+                # Envoyer l'état courant (ou les patchs manqués), puis la room
+                _resume(lobby, socket_sid, since)
                 # Ne pas ajouter le joueur
                 return
 
-            try:
-                lobby.add_player(sid, player_name, socket_sid)
-            except ValueError as e:
-                emit("error_msg", {"error": str(e)})
-                return
+            def enter():
+                try:
+                    lobby.add_player(sid, player_name, socket_sid)
+                except ValueError as e:
+                    return str(e)
+                return None
         else:
             # Host
             sid = session.get("sid")
             if not sid or sid != lobby.host_sid:
                 emit("error_msg", {"error": "Host uniquement"})
                 return
-            # Mettre à jour le socket_id du host
-            if sid in lobby.players:
-                lobby.players[sid].socket_id = socket_sid
-            
-        join_room(lobby_id)
-        # Envoyer l'état actuel du lobby au client
-        emit("state", lobby.snapshot())
-        # Notifier tous les autres clients du lobby
-        socketio.emit("state", lobby.snapshot(), room=lobby_id, skip_sid=request.sid)
+
+            def enter():
+                # Mettre à jour le socket_id du host
+                lobby.set_socket(sid, socket_sid)
+                return None
+
+        def joined(error: Optional[str]) -> None:
+            # Hors du contexte de la requête si le salon avait du travail en attente
+            if error:
+                socketio.emit("error_msg", {"error": error}, to=socket_sid)
+                return
+            socket_lobbies[socket_sid] = lobby_id
+            # Notifier tous les autres clients du lobby (patch), puis au nouveau venu l'état complet
+            # ou, s'il revient, ce qu'il a manqué
+            broadcaster.now(lobby)
+            _resume(lobby, socket_sid, since)
+
+        workers.submit(lobby, enter, joined)
+
+    @socketio.on("request_state")
+    def _ws_request_state(payload):
+        """Resynchronisation : un client qui a manqué un patch redemande l'état complet."""
+        data = payload or {}
+        lobby = rt_lobbies.get((data.get("lobby_id") or "").strip())
+        if not lobby:
+            emit("error_msg", {"error": "unknown-lobby"})
+            return
+        _send_state(lobby, request.sid)
+
+    @socketio.on("clock_sync")
+    def _ws_clock_sync(payload):
+        """Synchro d'horloge (type NTP) : renvoie l'heure serveur, le client en déduit son
+        décalage."""
+        data = payload or {}
+        return {"t0": data.get("t0"), "server": server_time_ms()}
 
     @socketio.on("player_answer")
     def _ws_player_answer(payload):
@@ -544,8 +616,11 @@ def create_app() -> Flask:
         if not sid or not lobby:
             emit("error_msg", {"error": "Lobby ou session invalide"})
             return
-        lobby.answer(sid, choice)
-        _emit_state(lobby)
+        workers.submit(
+            lobby,
+            lambda: lobby.answer(lobby.player_by_socket(sid) or sid, choice),
+            lambda _: broadcaster.mark(lobby),
+        )
 
     @socketio.on("player_bets")
     def _ws_player_bets(payload):
@@ -559,23 +634,20 @@ def create_app() -> Flask:
             emit("error_msg", {"error": "Lobby ou session invalide"})
             return
             
-        # Trouver le joueur par son socket_id dans lobby.players (clé peut être autre chose que socket_id)
-        target_sid = None
-        for pid, p in lobby.players.items():
-            if p.socket_id == sid:
-                target_sid = pid
-                break
-        
-        if target_sid:
-            lobby.place_bets(target_sid, bets)
-        else:
-            # Fallback (devrait pas arriver si logique de connection OK)
-            lobby.place_bets(sid, bets)
+        def place() -> None:
+            # Trouver le joueur par son socket_id (index du salon ; la clé peut être autre chose
+            # que socket_id)
+            target_sid = lobby.player_by_socket(sid)
+
+            if target_sid:
+                lobby.place_bets(target_sid, bets)
+            else:
+                # Fallback (devrait pas arriver si logique de connection OK)
+                lobby.place_bets(sid, bets)
 
         # Ne pas valider automatiquement pour laisser le temps aux joueurs de modifier leurs mises
-        # La validation se fera à la fin du timer (_ticker) ou par forcage hote
-        
-        _emit_state(lobby)
+        # La validation se fera à l'échéance de la question ou par forcage hote
+        workers.submit(lobby, place, lambda _: broadcaster.mark(lobby))
 
     @socketio.on("host_start")
     def _ws_host_start(payload):
@@ -590,13 +662,19 @@ def create_app() -> Flask:
             return
         
         # Initialiser le jeu ET lancer automatiquement la première question
-        lobby.start_game(list(engine._questions)[:lobby.question_total])
-        lobby.launch_question()
-        
-        # Émettre les événements dans le bon ordre : 1. game_started, 2. state, 3. new_question
-        socketio.emit("game_started", {}, room=lobby_id)
-        _emit_state(lobby)  # Envoyer l'état AVANT l'animation
-        socketio.emit("new_question", {}, room=lobby_id)
+        questions = list(engine.questions)[:lobby.question_total]
+
+        def start() -> None:
+            lobby.start_game(questions)
+            lobby.launch_question()
+
+        def started(_) -> None:
+            # Émettre les événements dans le bon ordre : 1. game_started, 2. state, 3. new_question
+            _event(lobby, "game_started", {})
+            broadcaster.now(lobby)  # Envoyer l'état AVANT l'animation
+            _then(lobby, lambda: _event(lobby, "new_question", {}))
+
+        workers.submit(lobby, start, started)
 
     @socketio.on("host_launch_question")
     def _ws_host_launch(payload):
@@ -609,10 +687,12 @@ def create_app() -> Flask:
         if not _is_host(lobby):
             emit("error_msg", {"error": "Host uniquement"})
             return
-        lobby.launch_question()
-        # Émettre dans le bon ordre : état puis animation
-        _emit_state(lobby)
-        socketio.emit("new_question", {}, room=lobby_id)
+        def launched(_) -> None:
+            # Émettre dans le bon ordre : état puis animation
+            broadcaster.now(lobby)
+            _then(lobby, lambda: _event(lobby, "new_question", {}))
+
+        workers.submit(lobby, lobby.launch_question, launched)
 
     @socketio.on("host_pause")
     def _ws_host_pause(payload):
@@ -625,8 +705,7 @@ def create_app() -> Flask:
         if not _is_host(lobby):
             emit("error_msg", {"error": "Host uniquement"})
             return
-        lobby.pause()
-        _emit_state(lobby)
+        workers.submit(lobby, lobby.pause, lambda _: broadcaster.now(lobby))
 
     @socketio.on("host_resume")
     def _ws_host_resume(payload):
@@ -639,8 +718,7 @@ def create_app() -> Flask:
         if not _is_host(lobby):
             emit("error_msg", {"error": "Host uniquement"})
             return
-        lobby.resume()
-        _emit_state(lobby)
+        workers.submit(lobby, lobby.resume, lambda _: broadcaster.now(lobby))
 
     @socketio.on("host_force_validate")
     def _ws_host_validate(payload):
@@ -653,14 +731,8 @@ def create_app() -> Flask:
         if not _is_host(lobby):
             emit("error_msg", {"error": "Host uniquement"})
             return
-        lobby.validate()
-        # Émettre l'événement de révélation de la réponse
-        socketio.emit(
-            "reveal_answer",
-            {"correct": lobby.correct, "question_index": lobby.question_index},
-            room=lobby_id,
-        )
-        _emit_state(lobby)
+        # Valider, émettre l'événement de révélation de la réponse puis l'état
+        _validate(lobby)
 
     @socketio.on("host_reveal_answer")
     def _ws_host_reveal(payload):
@@ -676,13 +748,7 @@ def create_app() -> Flask:
             return
         # Si le jeu est toujours en cours, valider et révéler
         if lobby.phase == "question":
-            lobby.validate()
-            socketio.emit(
-                "reveal_answer",
-                {"correct": lobby.correct, "question_index": lobby.question_index},
-                room=lobby_id,
-            )
-            _emit_state(lobby)
+            _validate(lobby)
 
     @socketio.on("host_next_question")
     def _ws_host_next(payload):
@@ -696,17 +762,21 @@ def create_app() -> Flask:
             emit("error_msg", {"error": "Host uniquement"})
             return
         
-        lobby.next_question()
-        
-        # Si on a une nouvelle question, la lancer automatiquement avec animation
-        if lobby.phase != "finished":
-            lobby.launch_question()
-            _emit_state(lobby)
-            socketio.emit("new_question", {}, room=lobby_id)
-        else:
-            # Jeu terminé - émettre l'événement de fin
-            _emit_state(lobby)
-            socketio.emit("game_ended", {"lobby_id": lobby_id}, room=lobby_id)
+        def advance() -> None:
+            lobby.next_question()
+            # Si on a une nouvelle question, la lancer automatiquement avec animation
+            if lobby.phase != "finished":
+                lobby.launch_question()
+
+        def advanced(_) -> None:
+            broadcaster.now(lobby)
+            if lobby.phase != "finished":
+                _then(lobby, lambda: _event(lobby, "new_question", {}))
+            else:
+                # Jeu terminé - émettre l'événement de fin
+                _then(lobby, lambda: _event(lobby, "game_ended", {"lobby_id": lobby_id}))
+
+        workers.submit(lobby, advance, advanced)
 
     @socketio.on("host_kick_player")
     def _ws_host_kick(payload):
@@ -723,37 +793,17 @@ def create_app() -> Flask:
             emit("error_msg", {"error": "Host uniquement"})
             return
         
-        # Trouver et supprimer le joueur
-        player_to_kick = None
-        for sid, player in list(lobby.players.items()):
-            if player.name == player_name:
-                player_to_kick = sid
-                break
-        
-        if player_to_kick:
-            del lobby.players[player_to_kick]
-            _emit_state(lobby)
-            socketio.emit("player_kicked", {"player_name": player_name}, room=lobby_id)
+        def kick() -> bool:
+            # Trouver et supprimer le joueur
+            player_to_kick = lobby.player_by_name(player_name)
+            return bool(player_to_kick) and lobby.remove_player(player_to_kick)
 
-    def _ticker() -> None:
-        while True:
-            try:
-                for lobby in rt_lobbies.all().values():
-                    if lobby.phase == "question" and (lobby.time_remaining() or 0) <= 0:
-                        lobby.validate()
-                        # Émettre l'événement de révélation de la réponse
-                        socketio.emit(
-                            "reveal_answer",
-                            {"correct": lobby.correct, "question_index": lobby.question_index},
-                            room=lobby.lobby_id,
-                        )
-                        _emit_state(lobby)
-                    socketio.emit("tick", {"time_remaining": lobby.time_remaining()}, room=lobby.lobby_id)
-            except Exception:
-                pass
-            socketio.sleep(1)
+        def kicked(removed: bool) -> None:
+            if removed:
+                broadcaster.now(lobby)
+                _then(lobby, lambda: _event(lobby, "player_kicked", {"player_name": player_name}))
 
-    socketio.start_background_task(_ticker)
+        workers.submit(lobby, kick, kicked)
 
     @app.post("/lobby/start")
     def lobby_start():
@@ -820,7 +870,8 @@ def create_app() -> Flask:
             "progress": {"index": game.index, "total": len(game.questions)},
             "finished": bool(game.finished),
             "eliminated": bool(game.eliminated),
-            "leaderboard": leaderboard.top(10),
+            "leaderboard": leaderboard.top_payload(10),
+            "rank": leaderboard.rank(game.player.name),
         }
 
         if q is None:
@@ -832,6 +883,7 @@ def create_app() -> Flask:
                 "questions_played": result.questions_played,
             }
             payload["leaderboard_text"] = leaderboard.render(10)
+            payload["rank"] = leaderboard.rank(result.player_name)
             return jsonify(payload)
 
         payload["question"] = {
@@ -886,12 +938,99 @@ def create_app() -> Flask:
                 "finished": bool(game.finished),
                 "eliminated": bool(game.eliminated),
                 "leaderboard_text": leaderboard.render(10),
+                "rank": leaderboard.rank(game.player.name),
             }
         )
 
     @app.get("/api/leaderboard")
     def api_leaderboard():
-        return jsonify({"text": leaderboard.render(10)})
+        # ?window=day|week|event (défaut : global) ; ?bucket= pour un seau précis (ex. 2026-10-17)
+        window = (request.args.get("window") or "").strip() or None
+        bucket = (request.args.get("bucket") or "").strip() or None
+        if window is not None and window not in WINDOWS:
+            return jsonify({"ok": False, "error": "invalid window"}), 400
+        if window is None and bucket is not None:
+            return jsonify({"ok": False, "error": "bucket requires window"}), 400
+        # ETag = version du classement : un navigateur qui sonde reçoit 304 tant que rien ne change
+        etag = leaderboard.etag(window, bucket)
+        if request.if_none_match.contains(etag):
+            resp = app.response_class(status=304)
+        else:
+            body = leaderboard.memo(
+                "api",
+                10,
+                lambda: json.dumps(
+                    {
+                        "text": leaderboard.render(10, window, bucket),
+                        "leaderboard": leaderboard.top_payload(10, window, bucket),
+                        "window": window,
+                        "bucket": (
+                            leaderboard.windows.resolve(window, bucket)[0] if window else None
+                        ),
+                    },
+                    ensure_ascii=False,
+                ),
+                window,
+                bucket,
+            )
+            resp = app.response_class(body, mimetype="application/json")
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    @app.post("/api/leaderboard/event")
+    def api_leaderboard_event():
+        """Ouvre (`name`) ou ferme (`name` vide) le classement de soirée."""
+        data = request.get_json(silent=True) or request.form or {}
+        if (data.get("password") or "").strip() != create_lobby_password:
+            return jsonify({"ok": False, "error": "invalid password"}), 403
+        name = (data.get("name") or "").strip()[:48]
+        if leaderboard_relay is not None:
+            leaderboard_relay.event(name or None)
+        elif name:
+            leaderboard.windows.start_event(name)
+        else:
+            leaderboard.windows.end_event()
+        return jsonify({"ok": True, "event": leaderboard.windows.event})
+
+    @app.get("/api/leaderboard/stats")
+    def api_leaderboard_stats():
+        """Métriques de persistance du classement (dont le délai sale → durable)."""
+        return jsonify({"ok": True, "version": leaderboard.version, **leaderboard.stats()})
+
+    @app.get("/api/stats")
+    def api_stats():
+        """Objets vivants (sessions, salons) et compteurs d'expiration / d'éviction."""
+        return jsonify(
+            {
+                "ok": True,
+                "sessions": sessions.reaper.stats(),
+                "lobbies": lobbies.reaper.stats(),
+                "rt_lobbies": rt_lobbies.reaper.stats(),
+                # Latences par salon (soumission → émission) et retard de la boucle
+                "workers": workers.stats(),
+                # Plusieurs processus : salons joignables connus des autres processus
+                "cluster": registry.stats() if registry is not None else None,
+                "leaderboard_relay": (
+                    leaderboard_relay.stats() if leaderboard_relay is not None else None
+                ),
+                # Lignes et octets du journal des salons depuis le dernier instantané
+                "journal": journal.stats() if journal is not None else None,
+                # Reconnexions : patchs manqués rejoués, ou état complet (client hors fenêtre)
+                "resumes": dict(resumes),
+            }
+        )
+
+    @app.get("/api/rank")
+    def api_rank():
+        """Position globale d'un joueur (par défaut, celui de la session solo)."""
+        name = (request.args.get("name") or "").strip()
+        if not name:
+            game = sessions.get(session.get("sid") or "")
+            if game is None:
+                return jsonify({"ok": False, "error": "missing name"}), 400
+            name = game.player.name
+        return jsonify({"ok": True, "name": name, "rank": leaderboard.rank(name)})
 
     # Expose socketio for __main__
     app.socketio = socketio  # type: ignore[attr-defined]
@@ -899,6 +1038,17 @@ def create_app() -> Flask:
 
 
 if __name__ == "__main__":
+    cluster_size = int(os.environ.get("MONEYDROP_WORKERS", "1"))
+    if cluster_size > 1 and "MONEYDROP_WORKER_INDEX" not in os.environ:
+        # Superviseur : courtier puis un processus web par port (MONEYDROP_PORT, +1, ...)
+        raise SystemExit(
+            supervise(
+                [sys.executable, os.path.abspath(__file__)],
+                cluster_size,
+                int(os.environ.get("MONEYDROP_PORT", "8000")),
+                parse_address(os.environ.get("MONEYDROP_BROKER", "")),
+            )
+        )
     app = create_app()
     host = os.environ.get("MONEYDROP_HOST", "127.0.0.1")
     port = int(os.environ.get("MONEYDROP_PORT", "8000"))